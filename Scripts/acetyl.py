@@ -4,23 +4,32 @@
 ###################################################################
 ##         Extracting protein level acetylation info             ##
 ###################################################################
-##  - reshape peptide level information to protein level         ## 
+##  - reshape peptide level information to protein level         ##
 ###################################################################
 
-""" 
+"""
 Requires: filteredData.tsv (generated with filter.py)
-Output: acetylation.tsv
+Options:
+    --format: read and write .tsv files (tsv, default) or .parquet files (parquet)
+Output: acetylation.tsv or acetylation.parquet
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 
-data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
-uniqueID = data['Protein'].unique()
-dfP = pd.DataFrame(data=uniqueID,columns=["uniprotID"])
+parser = argparse.ArgumentParser(description='Reshape the peptide level acetylation data to protein level.')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the input and output files (default: tsv)')
+args = parser.parse_args()
+
+if args.format == 'parquet':
+    from columnar import readParquet, writeParquet
+    data = readParquet('filteredData')
+else:
+    data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
 
 
-##Functions on the original (filtered) data: 
+##Functions on the original (filtered) data:
 
 """
 Function to find out if this acetylation site was detected in both conditions, or one of both.
@@ -32,17 +41,11 @@ Arguments:
 """
 
 def acWhichConditions(df):
-    i = 0
-    for x in df['Intensity.L.']:
-        if (x == 0) and (df.iloc[i]['Intensity.H.'] != 0):
-            result = 'gp13'
-        elif (x != 0) and (df.iloc[i]['Intensity.H.'] == 0):
-            result = 'control'
-        else:
-            result = 'both'
-        df.at[i,'Condition'] = result
-        i = i + 1
-        
+    light = df['Intensity.L.']
+    heavy = df['Intensity.H.']
+    df['Condition'] = np.select([(light == 0) & (heavy != 0), (light != 0) & (heavy == 0)],
+                                ['gp13', 'control'], default='both')
+
 """
 Function that applies a logarithm of base 2 of the Ratio.H.L column (providing a log fold change)
 Effect: returns this information in a new column
@@ -53,159 +56,100 @@ Arguments:
     df: DataFrame containing the filtered data (generated with filter.py)
 """
 def acLogFold(df):
-    i = 0
-    for x in df['Ratio.H.L.Normalized']:
-        if np.isnan(x):
-            df.at[i,'logFoldChange'] = np.NaN
-        else:
-            df.at[i,'logFoldChange'] = np.log2(x)
-        i = i + 1
-        
-##Functions to generate acetylation.tsv: 
+    df['logFoldChange'] = np.log2(df['Ratio.H.L.Normalized'])
 
-"""
-Function that returns all rows of the filtered data that have as protein name the specified input string
+##Functions to generate acetylation.tsv:
 
-Arguments:
-    descripString: UniProt identifier for which one wants to fetch information
-"""
-def findRowsByProt(descripString):
-    rowsWithProt = data[data['Protein']==descripString]
-    return rowsWithProt
-        
 """
-Function to get the number of acetylated peptides for a specified input protein ID.
-Reasoning: Row per acetylated peptide + only 1 acetylation site at each peptide detected --> #rows = #aectylation sites
+Function to join the values of one column per protein into a single string.
+Every value gets a "peptide i: " prefix (numbered within its protein) and values are seperated by //
 
 Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
+    groups: GroupBy object of the filtered data, grouped on protein
+    values: list of strings (one per peptide, in the same order as the filtered data)
 """
-def calcAcSites(protId):
-    protDat = findRowsByProt(protId)
-    return protDat.shape[0]    
-        
+def joinPeptides(groups, values):
+    numbers = groups.cumcount() + 1
+    labelled = pd.Series(["peptide " + str(i) + ": " + v for i, v in zip(numbers, values)], index=numbers.index)
+    return labelled.groupby(groups.ngroup()).agg(' // '.join).values
+
 """
-Function to extract the gene names based on a specified input protein ID, by making use of REGEX
+Function to extract the gene names of all proteins, by making use of REGEX on the description of their first peptide
 Reasoning: if mulitple possibilities for gene name are given, the first one is assumed to be correct
+When no gene name is found, the gene name of the previous protein is kept (as was done in the per-protein implementation)
 
 Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
-"""
-def findGeneName(protId):
-    import re
-    global result
-    
-    protDat = findRowsByProt(protId)
-    regionToSearch = protDat.iloc[0]['Protein.Descriptions']
-    gene = re.search('GN=(.+?) PE',regionToSearch)
-    
-    if gene:
-        result = gene.group(1)
-    return result
-
-"""
-Function to check in which conditions the peptides of 1 protein are detected
+    first: DataFrame containing the first peptide row of every protein
+"""
+def findGeneNames(first):
+    return first['Protein.Descriptions'].str.extract('GN=(.+?) PE', expand=False).ffill().values
+
+"""
+Function to check in which conditions the peptides of each protein are detected
 Conditions: 'control', 'both' ('gp13' is never observed)
 Effect: returns string stating either what the condition is for all peptides
 
 Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
+    df: DataFrame containing the filtered data, with Condition column
+    groups: GroupBy object of df, grouped on protein
 """
-def acCondProt(protId):
-    protDat = findRowsByProt(protId)
-    result = pd.unique(protDat['Condition'])
-    if result.shape[0] == 1:
-        return "all peptides: " + result[0]
-    else:
-        result = np.array(protDat['Condition'])
-        peptString = ""
-        for i in range(0,result.shape[0]):
-            pept = "peptide " + str(i+1) + ": " + result[i] + " // "
-            peptString = peptString + pept
-        return peptString[:-4]
+def acCondProt(df, groups):
+    nCond = groups['Condition'].nunique().values
+    firstCond = groups['Condition'].first().values
+    perPeptide = joinPeptides(groups, df['Condition'].tolist())
+    return np.where(nCond == 1, ["all peptides: " + c for c in firstCond], perPeptide)
 
 """
-Funtion to return the peptide sequences for a given protein ID
-Effect: returns a string with all the peptides and their sequence, seperated by //
+Function to see global picture in terms of increase/decrease of logFoldChange of peptides of each protein.
 
 Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
+    df: DataFrame containing the filtered data, with logFoldChange column
+    groups: GroupBy object of df, grouped on protein
 """
-def getDetectedPeptides(protId):
-    protDat = findRowsByProt(protId)
-    result = pd.DataFrame(data=protDat['Modified.Sequence'])
-    peptString = ""
-    for i in range(0,result.shape[0]):
-        pept = "peptide " + str(i+1) + ": " + result.iloc[i]['Modified.Sequence'] + " // "
-        peptString = peptString + pept
-    return peptString[:-4]
- 
-"""
-Function to return the logFoldChanges for all peptides for a given protein ID.
-Effect: returns a string with all the peptides and their log fold change, seperated by //
+def logFCProt(df, groups):
+    sign = np.sign(df['logFoldChange'])
+    counts = pd.DataFrame({'nan': sign.isna(), 'neg': sign < 0, 'zero': sign == 0, 'pos': sign > 0})
+    counts = counts.groupby(groups.ngroup()).sum()
+    numSigns = (counts[['neg', 'zero', 'pos']] > 0).sum(axis=1).values
+    numValid = counts[['neg', 'zero', 'pos']].sum(axis=1).values
 
-Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
-"""
-def getLogFoldPeptides(protId):
-    protDat = findRowsByProt(protId)
-    result = pd.DataFrame(data=protDat['logFoldChange'])
-    peptString = ""
-    for i in range(0,result.shape[0]):
-        pept = "peptide " + str(i+1) + ": " + str(result.iloc[i]['logFoldChange']) + " // "
-        peptString = peptString + pept
-    return peptString[:-4]
-    
-"""
-Function to see global picture in terms of increase/decrease of logFoldChange of peptides of a given protein.
+    result = np.select([numSigns == 1, numValid > 0],
+                       [np.where(counts['neg'].values > 0, 'negative', 'positive'), 'depends on peptide'],
+                       default='')
+    appendage = np.where(counts['nan'].values > 0, ' !NaN in peptide(s)', '')
+    return np.char.add(result.astype(str), appendage.astype(str))
 
-Arguments:
-    protId: UniProt identifier for protein of which one wants to calculate the number of acetylation sites
-"""
-def logFCProt(protId):
-    protDat = findRowsByProt(protId)
-    arr = np.array(protDat['logFoldChange'])
-    arrNoNa = arr[np.logical_not(np.isnan(arr))]
-    sign = np.sign(arrNoNa)
-    
-    appendage = ""
-    if arr.shape[0] != arrNoNa.shape[0]:
-        appendage = ' !NaN in peptide(s)'
-    if np.unique(sign).shape[0] == 1:
-        if "-" in str(sign[0]):
-            result = 'negative'
-        else:
-            result = 'positive'
-    else:
-        if arrNoNa.shape[0] > 0:
-            result = 'depends on peptide'
-        if arrNoNa.shape[0] == 0:
-            result =''
-    return result+appendage
-    
-"""
-Create extra columns in dataframe where you assign these values:
+"""
+Create the protein level dataframe in a single pass over the filtered data, with these columns:
     gene name, number of acetylation sites, peptides, condition in which the peptide/protein was detected, peptide and protein level log fold change
-    
+Proteins appear in the order in which they are first seen in the filtered data.
+
+Reasoning: Row per acetylated peptide + only 1 acetylation site at each peptide detected --> #rows = #aectylation sites
+
 Arguments:
-    df: DataFrame containing the UniProt ID's (pandas DataFrame)
-    descripCol: name of column in df that contains all UniProt ID's
-"""
-def makeExtraCol(df,descripCol):
-    i = 0
-    for x in df[descripCol]:
-        df.at[i,"geneName"] = findGeneName(x)
-        df.at[i,"numAcSites"] = calcAcSites(x)
-        df.at[i,"peptides"] = getDetectedPeptides(x)
-        df.at[i,"detectCondition"] = acCondProt(x)
-        df.at[i,"peptLogFC"] = getLogFoldPeptides(x)
-        df.at[i,"protLogFC"] = logFCProt(x)
-        i = i+1   
-    
+    df: DataFrame containing the filtered data, with Condition and logFoldChange columns
+    protCol: name of column in df that contains all UniProt ID's
+"""
+def makeProtDf(df, protCol):
+    groups = df.groupby(protCol, sort=False)
+    first = groups.head(1)
+
+    dfP = pd.DataFrame({"uniprotID": first[protCol].values})
+    dfP["geneName"] = findGeneNames(first)
+    dfP["numAcSites"] = groups.size().values.astype(float)
+    dfP["peptides"] = joinPeptides(groups, df['Modified.Sequence'].tolist())
+    dfP["detectCondition"] = acCondProt(df, groups)
+    dfP["peptLogFC"] = joinPeptides(groups, [str(x) for x in df['logFoldChange'].values])
+    dfP["protLogFC"] = logFCProt(df, groups)
+    return dfP
+
 ##Applying functions to the filtered dataframe:
 acWhichConditions(data)
 acLogFold(data)
 
 ##Creating the new dataframe wchich contains acetylation information on protein level:
-makeExtraCol(dfP,'uniprotID')
-dfP.to_csv('../Output/acetylation.tsv',sep='\t')
\ No newline at end of file
+dfP = makeProtDf(data,'Protein')
+if args.format == 'parquet':
+    writeParquet(dfP, 'acetylation')
+else:
+    dfP.to_csv('../Output/acetylation.tsv',sep='\t')
@@ -18,30 +18,70 @@ Requires:
 Output: 
     nodeDf.tsv
     ackegg.tsv
+    elements.json (nodes and edges for the Cytoscape graph of the visualisation)
+Options:
+    --format: read and write the files in Output as .tsv (tsv, default) or .parquet (parquet)
+    --chunksize: number of lines of 287.protein.actions.v11.0.txt.gz that are read at once (default 500000)
+    --cutoffs: minimal combined_score values for which the Cytoscape elements are listed in elements.json (default 0.15 0.4 0.7 0.9)
 """
 
+import argparse
+import json
 import pandas as pd
 import numpy as np
 
+parser = argparse.ArgumentParser(description='Aggregate all data into the files used by the visualisation.')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the files in Output (default: tsv)')
+parser.add_argument('--chunksize', type=int, default=500000, help='lines of the STRING actions file read at once (default: 500000)')
+parser.add_argument('--cutoffs', type=float, nargs='+', default=[0.15, 0.4, 0.7, 0.9],
+                    help='score cut-offs of the Cytoscape elements (default: the STRING confidence levels 0.15 0.4 0.7 0.9)')
+args = parser.parse_args()
+
+if args.format == 'parquet':
+    from columnar import readParquet, writeParquet
+
 # nodeDf = node dataframe
 # This will be used to make nodes and edges for the graph-table, and to make the interaction table
 # Data in this dataframe will be set as attributes of nodes and edges, to color the nodes, give labels, etc.
 nodeDf = pd.read_csv('../String_man/string_interactions.tsv', sep='\t')
 
-# Read in file with reactions information
-interactions = pd.read_csv('../287.protein.actions.v11.0.txt.gz', sep='\t')
-
 # Remove unnecessary columns from nodeDf
 drop = ['neighborhood_on_chromosome', 'gene_fusion', 'phylogenetic_cooccurrence', 'homology', 'coexpression', 
                         'experimentally_determined_interaction', 'database_annotated', 'automated_textmining']
 for col in drop:
     del nodeDf[col]
 
+"""
+Function to read the reactions information of the protein pairs in the network.
+The file with all reactions of the organism is read in chunks, and of every chunk only the (unique) rows of the pairs that are
+in the network are kept, so the memory that is needed depends on the size of the network and not on the size of the file.
+
+Arguments:
+    path: path to the STRING actions file (string)
+    pairs: MultiIndex with (node1_string_id, node2_string_id) of all edges in the network
+    chunksize: number of lines read at once (int)
+"""
+def readActions(path, pairs, chunksize):
+    ids = set(pairs.get_level_values(0))
+    kept = []
+    for chunk in pd.read_csv(path, sep='\t', usecols=['item_id_a', 'item_id_b', 'mode'], dtype=str, chunksize=chunksize):
+        # cheap test on the first ID, then the test on the pair
+        chunk = chunk[chunk['item_id_a'].isin(ids)]
+        chunk = chunk[pd.MultiIndex.from_frame(chunk[['item_id_a', 'item_id_b']]).isin(pairs)]
+        kept.append(chunk.drop_duplicates())
+    if not kept:
+        return pd.DataFrame(columns=['item_id_a', 'item_id_b', 'mode'])
+    return pd.concat(kept, ignore_index=True).drop_duplicates()
+
+# Read in the reactions information of the edges in the network
+interactions = readActions('../287.protein.actions.v11.0.txt.gz',
+                           pd.MultiIndex.from_frame(nodeDf[['node1_string_id', 'node2_string_id']].dropna()), args.chunksize)
+
 # merge nodeDf and interactions dataframes by common string id
 merged_df = nodeDf.merge(interactions, how='left', left_on=['node1_string_id', 'node2_string_id'], right_on=['item_id_a', 'item_id_b'])
 
 # Remove unnecessary columns from merged_df
-drop = ['action', 'is_directional', 'a_is_acting', 'score', 'item_id_a', 'item_id_b']
+drop = ['item_id_a', 'item_id_b']
 for col in drop:
     del merged_df[col]
 
@@ -55,8 +95,7 @@ merged_df.drop_duplicates(inplace=True)             # 13971 --> 11077
 merged_df.interaction.replace(np.NaN, 'unknown', inplace=True)
 
 """
-The merged_df has almost identical rows where the only difference is the interaction, since two proteins can have multiple ways of interacting. In the following step, these different rows are merged together by grouping using all columns except for the interaction type, making this interaction into a set (= list with unique values).
-This is then concatenated into a string, comma seperated.
+The merged_df has almost identical rows where the only difference is the interaction, since two proteins can have multiple ways of interacting. In the following step, these different rows are merged together by grouping using all columns except for the interaction type, joining the unique interactions (sorted alphabetically) into a string, comma seperated.
 
 Illustration:
 The first dataframe will be transformed into the second one.
@@ -77,15 +116,18 @@ The first dataframe will be transformed into the second one.
 | ycgB	      ygaU	      287.DR97_3555	      287.DR97_2546	      0.590	              unknown           |
 ---------------------------------------------------------------------------------------------------------
 """
-merged_df_ag = merged_df.groupby(['node1', 'node2', 'node1_string_id', 'node2_string_id', 'combined_score'])['interaction'].apply(set).reset_index()
-merged_df_ag['interaction'] = [', '.join(map(str, s)) for s in merged_df_ag['interaction']]
+# the rows are already unique (drop_duplicates above), so sorting them makes every group a sorted list of unique interactions
+merged_df_ag = merged_df.sort_values('interaction').groupby(['node1', 'node2', 'node1_string_id', 'node2_string_id', 'combined_score'])['interaction'].agg(', '.join).reset_index()
 
 ## Making dictionaries
 # Making uniprotID dictionary --> 0(1)
 uniprot_info = pd.read_csv('../String_man/string_mapping.tsv', sep='\t')
 uniprot_dict = dict(zip(uniprot_info['stringId'], uniprot_info['queryItem'].str.extract(r'(?<=\|)(.*)(?=\|)', expand=False)))
 # Making kegg_id dictionary --> 0(1)
-kegg_info = pd.read_csv('../Output/pathways.tsv',sep='\t')
+if args.format == 'parquet':
+    kegg_info = readParquet('pathways')
+else:
+    kegg_info = pd.read_csv('../Output/pathways.tsv',sep='\t')
 kegg_dict = dict(zip(kegg_info['uniprotID'], kegg_info['keggID']))
 
 
@@ -98,7 +140,10 @@ merged_df_ag['node1_kegg'] = merged_df_ag['node1_uniprot'].apply(lambda x: kegg_
 merged_df_ag['node2_kegg'] = merged_df_ag['node2_uniprot'].apply(lambda x: kegg_dict.get(x))
 
 # write nodeDf (merged_df_ag) dataframe to file
-merged_df_ag.to_csv('../Output/nodeDf.tsv', sep='\t', index = False)
+if args.format == 'parquet':
+    writeParquet(merged_df_ag, 'nodeDf')
+else:
+    merged_df_ag.to_csv('../Output/nodeDf.tsv', sep='\t', index = False)
 
 
 ######################################################################################
@@ -109,14 +154,88 @@ merged_df_ag.to_csv('../Output/nodeDf.tsv', sep='\t', index = False)
 ######################################################################################
 
 # Read in acetylation data
-acetylation_pre = pd.read_csv('../Output/acetylation.tsv', sep='\t')
+if args.format == 'parquet':
+    acetylation_pre = readParquet('acetylation')
+else:
+    acetylation_pre = pd.read_csv('../Output/acetylation.tsv', sep='\t')
 
 # Add KEGG pathway data by merging
 acetylation = acetylation_pre.merge(kegg_info, how='left', left_on='uniprotID', right_on='uniprotID')
 
-# removing rows with indexes
-del acetylation['Unnamed: 0_x']
-del acetylation['Unnamed: 0_y']
-
 # write to file
-acetylation.to_csv('../Output/ackegg.tsv', sep='\t', index=False)
\ No newline at end of file
+if args.format == 'parquet':
+    writeParquet(acetylation, 'ackegg')
+else:
+    # removing rows with indexes (the .parquet files have none)
+    del acetylation['Unnamed: 0_x']
+    del acetylation['Unnamed: 0_y']
+    acetylation.to_csv('../Output/ackegg.tsv', sep='\t', index=False)
+
+
+######################################################################################
+##  Making the Cytoscape elements for the visualisation                             ##
+######################################################################################
+##  - nodes and edges with all their attributes, as used by Visualisation/main.py  ##
+##  - the visualisation only has to read this file instead of building them itself ##
+######################################################################################
+
+"""
+Function to shorten the logFC annotation of proteins to 'positive', 'negative' or 'similar' (same as get_logFC_as_strings in main.py,
+tests/test_build_elements.py checks that they agree).
+Something like "negative !NaN in peptide(s)" becomes "negative", proteins without annotation become "similar".
+
+Arguments:
+    uniprot: UniProt IDs (Series)
+    logfc_dict: dictionary with UniProt ID as key and protLogFC as value
+"""
+def logFCString(uniprot, logfc_dict):
+    text = uniprot.map(logfc_dict).astype(str)
+    return np.select([text.str.contains('positive'), text.str.contains('negative')], ['positive', 'negative'], 'similar')
+
+"""
+Function to turn a dataframe into a list of Cytoscape elements ({'data': {...}}), with None instead of NaN (which is not valid JSON).
+
+Arguments:
+    df: dataframe with one column per attribute
+"""
+def toElements(df):
+    return [{'data': row} for row in df.astype(object).where(df.notna(), None).to_dict('records')]
+
+"""
+Function to make the element bundle: the nodes and edges of the whole network, and for every cut-off the number of edges
+with combined_score >= cut-off and the number of their nodes.
+Edges are sorted from the highest to the lowest combined_score (rows with the same score stay in the order of nodeDf), and nodes in
+the order in which they are first found in these edges, so the elements of a cut-off are always the first edges and the first nodes:
+edges[:number of edges] + nodes[:number of nodes].
+
+Arguments:
+    df: nodeDf (merged_df_ag)
+    logfc_dict: dictionary with UniProt ID as key and protLogFC as value
+    cutoffs: minimal combined_score values (list of floats)
+"""
+def makeElements(df, logfc_dict, cutoffs):
+    df = df.iloc[np.argsort(-df['combined_score'].to_numpy(), kind='stable')].reset_index(drop=True)
+    source_logFC = logFCString(df['node1_uniprot'], logfc_dict)
+    target_logFC = logFCString(df['node2_uniprot'], logfc_dict)
+
+    edges = pd.DataFrame({'id': df['node1'] + df['node2'], 'source': df['node1'], 'target': df['node2'], 'score': df['combined_score'],
+                          'interaction': df['interaction'], 'source_logFC': source_logFC, 'target_logFC': target_logFC})
+
+    # source and target of every row, in the order: source of row 0, target of row 0, source of row 1, ...
+    ends = []
+    for end, logFC in [('1', source_logFC), ('2', target_logFC)]:
+        ends.append(pd.DataFrame({'id': df['node' + end], 'label': df['node' + end], 'stringid': df['node{}_string_id'.format(end)],
+                                  'UniprotID': df['node{}_uniprot'.format(end)], 'KEGG_ID': df['node{}_kegg'.format(end)], 'logFC': logFC,
+                                  'row': df.index, 'end': int(end)}))
+    nodes = pd.concat(ends).sort_values(['row', 'end'], kind='mergesort').drop_duplicates('id')
+
+    bundle = {'version': 2, 'nodes': toElements(nodes.drop(columns=['row', 'end'])), 'edges': toElements(edges), 'cutoffs': {}}
+    for cutoff in cutoffs:
+        # scores are sorted from high to low, and nodes by the row of their first edge
+        numEdges = int(np.searchsorted(-df['combined_score'].to_numpy(), -cutoff, side='right'))
+        bundle['cutoffs']['{:g}'.format(cutoff)] = {'edges': numEdges, 'nodes': int(np.searchsorted(nodes['row'].to_numpy(), numEdges))}
+    return bundle
+
+logfc_dict = dict(zip(acetylation_pre['uniprotID'], acetylation_pre['protLogFC']))
+with open('../Output/elements.json', 'w') as f:
+    json.dump(makeElements(merged_df_ag, logfc_dict, args.cutoffs), f, separators=(',', ':'), allow_nan=False)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+###################################################################
+##        Parquet versions of the intermediate files             ##
+###################################################################
+##  - fixed schema for every file in Output                      ##
+##  - pathways and peptides stored as lists instead of strings   ##
+###################################################################
+
+"""
+Used by: filter.py, kegg.py, acetyl.py, interaction.py, string_check.py, aggregate.py (when run with --format parquet)
+Requires: pyarrow
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+outputDir = '../Output/'
+
+textList = pa.list_(pa.string())
+
+schemas = {
+    'filteredData': pa.schema([
+        ('Protein', pa.string()),
+        ('Protein.Descriptions', pa.string()),
+        ('PEP', pa.float64()),
+        ('Modified.Sequence', pa.string()),
+        ('Intensity.', pa.float64()),
+        ('Intensity.L.', pa.float64()),
+        ('Intensity.H.', pa.float64()),
+        ('Ratio.H.L.Normalized', pa.float64()),
+    ]),
+    'pathways': pa.schema([
+        ('uniprotID', pa.string()),
+        ('keggID', pa.string()),
+        ('keggPathways', textList),
+    ]),
+    'acetylation': pa.schema([
+        ('uniprotID', pa.string()),
+        ('geneName', pa.string()),
+        ('numAcSites', pa.int32()),
+        ('peptides', textList),
+        ('detectCondition', pa.string()),
+        ('peptLogFC', pa.string()),
+        ('protLogFC', pa.string()),
+    ]),
+    'nodeDf': pa.schema([
+        ('node1', pa.string()),
+        ('node2', pa.string()),
+        ('node1_string_id', pa.string()),
+        ('node2_string_id', pa.string()),
+        ('combined_score', pa.float64()),
+        ('interaction', pa.string()),
+        ('node1_uniprot', pa.string()),
+        ('node2_uniprot', pa.string()),
+        ('node1_kegg', pa.string()),
+        ('node2_kegg', pa.string()),
+    ]),
+}
+schemas['ackegg'] = pa.schema(list(schemas['acetylation']) + list(schemas['pathways'])[1:])
+
+"""
+Functions to convert the text version of a list column (as written to the .tsv files) into a list and back.
+keggPathways: "path1:name1 // path2:name2", or "No pathways" when there are none
+peptides: "peptide 1: SEQ1 // peptide 2: SEQ2"
+
+Arguments:
+    text: value of the column in the .tsv file (string)
+    values: value of the column in the .parquet file (list of strings)
+"""
+def splitPathways(text):
+    if not isinstance(text, str) or text == "No pathways":
+        return []
+    return text.split(' // ')
+
+def joinPathways(values):
+    if len(values) == 0:
+        return "No pathways"
+    return ' // '.join(values)
+
+def splitPeptides(text):
+    return [pept.partition(': ')[2] for pept in text.split(' // ')]
+
+def joinPeptides(values):
+    return ' // '.join("peptide " + str(i+1) + ": " + v for i, v in enumerate(values))
+
+listColumns = {
+    'keggPathways': (splitPathways, joinPathways),
+    'peptides': (splitPeptides, joinPeptides),
+}
+
+"""
+Function to convert a DataFrame into an arrow table with the schema of the given intermediate file.
+Columns that are not part of the schema are dropped; list columns that are still text are split.
+
+Arguments:
+    df: DataFrame with (at least) the columns of the schema
+    name: name of the intermediate file (key of schemas)
+"""
+def toArrow(df, name):
+    schema = schemas[name]
+    df = df[schema.names].copy()
+    for col, (split, join) in listColumns.items():
+        if col in df.columns:
+            df[col] = [split(x) if not isinstance(x, list) else x for x in df[col]]
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+"""
+Function to write a DataFrame to Output/<name>.parquet
+
+Arguments:
+    df: DataFrame with (at least) the columns of the schema
+    name: name of the intermediate file (key of schemas)
+"""
+def writeParquet(df, name):
+    pq.write_table(toArrow(df, name), outputDir + name + '.parquet')
+
+"""
+Function to open a writer to Output/<name>.parquet, so a file can be written in several parts (see filter.py --stream).
+Every part is written with writer.write_table(toArrow(part, name)); the writer has to be closed afterwards.
+
+Arguments:
+    name: name of the intermediate file (key of schemas)
+"""
+def openParquetWriter(name):
+    return pq.ParquetWriter(outputDir + name + '.parquet', schemas[name])
+
+"""
+Function to read Output/<name>.parquet (memory mapped) into a DataFrame.
+List columns are returned as lists, unless asText is set, then they are joined back into the .tsv text format.
+
+Arguments:
+    name: name of the intermediate file (key of schemas)
+    columns: list of columns to read, default all columns
+    asText: convert list columns back into strings (boolean)
+"""
+def readParquet(name, columns=None, asText=False):
+    df = pq.read_table(outputDir + name + '.parquet', columns=columns, memory_map=True).to_pandas()
+    for col, (split, join) in listColumns.items():
+        if col in df.columns:
+            df[col] = [join(x) if asText else list(x) for x in df[col]]
+    return df
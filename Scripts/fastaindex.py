@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+###################################################################
+##               Index of a multifasta file                      ##
+###################################################################
+##  - byte offset of every sequence, in the samtools .fai format ##
+##  - read one sequence without reading the whole file           ##
+###################################################################
+
+"""
+Used by: string_check.py (and anything that needs the sequence of a single protein)
+
+The index is written next to the multifasta file (filteredDataSeq.fasta --> filteredDataSeq.fasta.fai),
+with one tab seperated line per record, as in samtools faidx:
+    NAME: UniProt ID (between the first two | of the header)
+    LENGTH: number of residues
+    OFFSET: byte offset of the first residue
+    LINEBASES: number of residues per line
+    LINEWIDTH: number of bytes per line (residues + newline)
+The index is rebuilt automatically when the multifasta file is newer than the index.
+"""
+
+import os
+import re
+
+"""
+Function to extract the UniProt ID from a FASTA header line (e.g. ">sp|P12345|NAME_PSEAE ..." --> "P12345").
+When the header has no |, the first word of the header is used.
+
+Arguments:
+    header: header line, with or without > (string)
+"""
+def headerID(header):
+    found = re.search(r'\|(.+?)\|', header)
+    if found:
+        return found.group(1)
+    return header.lstrip('>').split(None, 1)[0] if header.strip('>\r\n ') else ''
+
+"""
+Function to write the .fai index of a multifasta file.
+Every line of a record (except the last one, which can be shorter) should have the same length, as samtools requires; else a ValueError is raised.
+Returns the index (see readIndex).
+
+Arguments:
+    fastaPath: path to the multifasta file (string)
+"""
+def buildIndex(fastaPath):
+    index = {}
+    entry = None
+
+    def finish(entry):
+        if entry is not None:
+            name, length, offset, lineBases, lineWidth, lines = entry
+            index[name] = (length, offset, lineBases, lineWidth)
+
+    with open(fastaPath, 'rb') as f:
+        pos = 0
+        for line in f:
+            if line.startswith(b'>'):
+                finish(entry)
+                entry = [headerID(line.decode()), 0, pos + len(line), 0, 0, []]
+            elif entry is not None and line.strip():
+                bases = len(line.rstrip(b'\r\n'))
+                if entry[3] == 0:
+                    entry[3], entry[4] = bases, len(line)
+                elif (entry[5] and entry[5][-1] != entry[3]) or bases > entry[3]:
+                    # only the last line of a record can be shorter than the others, no line can be longer
+                    raise ValueError("{}: lines of record {} do not all have the same length".format(fastaPath, entry[0]))
+                entry[5].append(bases)
+                entry[1] += bases
+            pos += len(line)
+        finish(entry)
+
+    with open(fastaPath + '.fai', 'w') as fai:
+        for name, (length, offset, lineBases, lineWidth) in index.items():
+            fai.write("{}\t{}\t{}\t{}\t{}\n".format(name, length, offset, lineBases, lineWidth))
+    return index
+
+"""
+Function to read the .fai index of a multifasta file (building it first when it is missing or older than the multifasta file).
+Returns a dictionary with the UniProt ID as key and (LENGTH, OFFSET, LINEBASES, LINEWIDTH) as value.
+
+Arguments:
+    fastaPath: path to the multifasta file (string)
+"""
+def readIndex(fastaPath):
+    faiPath = fastaPath + '.fai'
+    if not os.path.exists(faiPath) or os.path.getmtime(faiPath) < os.path.getmtime(fastaPath):
+        return buildIndex(fastaPath)
+    index = {}
+    with open(faiPath) as fai:
+        for line in fai:
+            name, length, offset, lineBases, lineWidth = line.rstrip('\n').split('\t')
+            index[name] = (int(length), int(offset), int(lineBases), int(lineWidth))
+    return index
+
+"""
+Function to get the sequence of one protein from a multifasta file, by reading only the bytes of that sequence.
+Returns None when the protein is not in the file.
+
+Arguments:
+    fastaPath: path to the multifasta file (string)
+    protId: UniProt ID (string)
+    index: index of the multifasta file (from readIndex), read when not given
+"""
+def getSequence(fastaPath, protId, index=None):
+    if index is None:
+        index = readIndex(fastaPath)
+    if protId not in index:
+        return None
+    length, offset, lineBases, lineWidth = index[protId]
+    if length == 0:
+        return ''
+    # full lines before the last line, plus the residues on the last line
+    fullLines, rest = divmod(length, lineBases)
+    size = fullLines * lineWidth + rest if rest else (fullLines - 1) * lineWidth + lineBases
+    with open(fastaPath, 'rb') as f:
+        f.seek(offset)
+        return f.read(size).decode().replace('\r', '').replace('\n', '')
+
+"""
+Function to check which proteins are missing from a multifasta file.
+Returns a set with the UniProt IDs that are not in the file.
+
+Arguments:
+    fastaPath: path to the multifasta file (string)
+    ids: UniProt IDs (list)
+"""
+def missingProteins(fastaPath, ids):
+    index = readIndex(fastaPath)
+    return set(x for x in ids if x not in index)
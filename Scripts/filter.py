@@ -4,19 +4,90 @@
 ###################################################################
 ##                    Filtering the input data                   ##
 ###################################################################
-##  - remove peptides with no measured intensity, or PEP >= 0.05 ## 
+##  - remove peptides with no measured intensity, or PEP >= 0.05 ##
 ###################################################################
 
-""" 
+"""
 Arguments: acetylation data (as tab seperated textfile)
-Output: filteredData.tsv
+Options:
+    --max-pep: keep peptides with a PEP strictly below this value (default 0.05)
+    --min-intensity: keep peptides with an intensity strictly above this value (default 0)
+    --stream: read the input in chunks, only parsing the columns used by the later scripts
+    --chunksize: number of rows per chunk in streaming mode (default 100000)
+    --format: write filteredData.tsv (tsv, default) or filteredData.parquet (parquet)
+Output: filteredData.tsv or filteredData.parquet
 """
 
-import sys
+import argparse
 import pandas as pd
 
-allData = pd.read_csv(str(sys.argv[1]),sep='\t',decimal=',')
-filtData = allData[allData["PEP"] < 0.05]
-filtData = filtData[filtData["Intensity."]!=0]
-filtData.to_csv('../Output/filteredData.tsv', sep = '\t')
+output = '../Output/filteredData.tsv'
+
+# Columns (and their types) that are used by the scripts further down the pipeline
+streamColumns = {
+    'Protein': str,
+    'Protein.Descriptions': str,
+    'PEP': float,
+    'Modified.Sequence': str,
+    'Intensity.': float,
+    'Intensity.L.': float,
+    'Intensity.H.': float,
+    'Ratio.H.L.Normalized': float,
+}
+
+"""
+Function to keep only the peptides that pass the PEP and intensity thresholds.
+Peptides without a measured intensity value are kept, as they were with the original "!= 0" filter.
+
+Arguments:
+    df: DataFrame containing (a chunk of) the acetylation data
+    maxPep: PEP threshold (float)
+    minIntensity: intensity threshold (float)
+"""
+def filterRows(df, maxPep, minIntensity):
+    return df[(df["PEP"] < maxPep) & ~(df["Intensity."] <= minIntensity)]
+
+"""
+Function to filter the input file in chunks of a fixed number of rows, appending every filtered chunk to the output file.
+Only the columns in streamColumns are parsed, so memory use does not depend on the size of the input file.
+
+Arguments:
+    path: path to the acetylation data (string)
+    maxPep: PEP threshold (float)
+    minIntensity: intensity threshold (float)
+    chunksize: number of rows per chunk (int)
+    fmt: output format, 'tsv' or 'parquet' (string)
+"""
+def filterStream(path, maxPep, minIntensity, chunksize, fmt):
+    reader = pd.read_csv(path, sep='\t', decimal=',', usecols=list(streamColumns), dtype=streamColumns, chunksize=chunksize)
+    if fmt == 'parquet':
+        from columnar import openParquetWriter, toArrow
+        writer = openParquetWriter('filteredData')
+        for chunk in reader:
+            writer.write_table(toArrow(filterRows(chunk, maxPep, minIntensity), 'filteredData'))
+        writer.close()
+    else:
+        header = True
+        for chunk in reader:
+            filterRows(chunk, maxPep, minIntensity)[list(streamColumns)].to_csv(output, sep='\t', mode='w' if header else 'a', header=header)
+            header = False
+
+parser = argparse.ArgumentParser(description='Filter the acetylation data on PEP and intensity.')
+parser.add_argument('input', help='acetylation data (as tab seperated textfile)')
+parser.add_argument('--max-pep', type=float, default=0.05, help='keep peptides with PEP < MAX_PEP (default: 0.05)')
+parser.add_argument('--min-intensity', type=float, default=0, help='keep peptides with Intensity. > MIN_INTENSITY (default: 0)')
+parser.add_argument('--stream', action='store_true', help='read the input in chunks, parsing only the columns needed later on')
+parser.add_argument('--chunksize', type=int, default=100000, help='rows per chunk in streaming mode (default: 100000)')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the output file (default: tsv)')
+args = parser.parse_args()
 
+if args.stream:
+    filterStream(args.input, args.max_pep, args.min_intensity, args.chunksize, args.format)
+else:
+    allData = pd.read_csv(args.input,sep='\t',decimal=',')
+    filtData = filterRows(allData, args.max_pep, args.min_intensity)
+    if args.format == 'parquet':
+        from columnar import writeParquet
+        writeParquet(filtData, 'filteredData')
+    else:
+        filtData.to_csv(output, sep = '\t')
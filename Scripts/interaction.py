@@ -9,30 +9,226 @@
 
 """ 
 Requires: filteredData.tsv (generated with filter.py)
-Output: acetylation.tsv
+Options:
+    --format: read filteredData.tsv (tsv, default) or filteredData.parquet (parquet)
+    --workers: number of requests to UniProt that are sent at the same time (default 4)
+    --batch-size: number of UniProt IDs fetched per request (default 100)
+    --retries: number of times a failed request is retried (default 3)
+    --timeout: seconds to wait for an answer of UniProt (default 60)
+    --uniprot-url: UniProt stream endpoint (default https://rest.uniprot.org/uniprotkb/stream)
+    --uniprot-entry-url: UniProt endpoint of single entries, used for IDs that are not found by the stream query (default https://rest.uniprot.org/uniprotkb)
+    --cache-dir: directory of the local sequence cache (default ../Cache)
+    --cache-ttl: fetch records again when they are older than this number of days (default: never)
+    --cache-max-size: maximum size of the cache in MB, least recently used records are removed first (default: no limit)
+    --no-cache: do not use the local sequence cache
+Output: filteredDataSeq.fasta & filteredDataSeq.fasta.fai (index, see fastaindex.py)
 """
 
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import requests
+import seqcache
+from fastaindex import buildIndex, headerID
 
-data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
+parser = argparse.ArgumentParser(description='Fetch the FASTA sequences of all proteins from UniProt.')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the input file (default: tsv)')
+parser.add_argument('--workers', type=int, default=4, help='number of simultaneous requests (default: 4)')
+parser.add_argument('--batch-size', type=int, default=100, help='UniProt IDs per request (default: 100)')
+parser.add_argument('--retries', type=int, default=3, help='retries per failed request (default: 3)')
+parser.add_argument('--timeout', type=float, default=60, help='timeout per request in seconds (default: 60)')
+parser.add_argument('--uniprot-url', default='https://rest.uniprot.org/uniprotkb/stream', help='UniProt stream endpoint')
+parser.add_argument('--uniprot-entry-url', default='https://rest.uniprot.org/uniprotkb', help='UniProt endpoint of single entries')
+parser.add_argument('--cache-dir', default='../Cache', help='directory of the local sequence cache (default: ../Cache)')
+parser.add_argument('--cache-ttl', type=float, default=None, help='maximum age of cached records in days (default: no limit)')
+parser.add_argument('--cache-max-size', type=float, default=None, help='maximum size of the cache in MB (default: no limit)')
+parser.add_argument('--no-cache', action='store_true', help='always fetch all records from UniProt')
+args = parser.parse_args()
+
+if args.format == 'parquet':
+    from columnar import readParquet
+    data = readParquet('filteredData', columns=['Protein'])
+else:
+    data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
 uniqueID = data['Protein'].unique()
 
+# HTTP status codes for which a request is tried again (too many requests, server errors)
+retryStatus = {429, 500, 502, 503, 504}
+
+"""
+Function to make a session that keeps its connections to UniProt open, so they can be reused by all requests.
+
+Arguments:
+    workers: number of threads that use the session at the same time (int)
+"""
+def makeSession(workers):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+"""
+Function to split a multifasta text into its records.
+Returns a dictionary with the UniProt ID (between the first two | of the header) as key and the fasta record as value.
+
+Arguments:
+    text: multifasta text (string)
+"""
+def splitFasta(text):
+    records = {}
+    for record in re.split(r'\n(?=>)', text.strip()):
+        header = re.search(r'\|(.+?)\|', record.partition('\n')[0])
+        if header:
+            records[header.group(1)] = record + '\n'
+    return records
+
+"""
+Function to send a request to UniProt, returns the response.
+Failed requests (connection errors, timeouts and the status codes in retryStatus) are retried, waiting 1, 2, 4, ... seconds in between.
+When the last retry fails as well, the error is raised (requests.RequestException).
+
+Arguments:
+    session: session used for the request (made with makeSession)
+    url: URL of the request (string)
+    params: parameters of the request (dictionary)
+"""
+def request(session, url, params=None):
+    for attempt in range(args.retries + 1):
+        if attempt > 0:
+            time.sleep(2 ** (attempt - 1))
+        try:
+            response = session.get(url, params=params, timeout=args.timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == args.retries:
+                raise
+            continue
+        if response.status_code not in retryStatus:
+            break
+    if response.status_code in retryStatus:
+        response.raise_for_status()
+    return response
+
+"""
+Function to fetch the fasta records of a batch of UniProt IDs with a single request to the UniProt stream endpoint.
+Returns a dictionary with the UniProt ID in the header of the record as key (see splitFasta).
+Isoform IDs (e.g. P12345-2) are only found when isoforms is True, so they are fetched in batches of their own.
+UniProt rejects the whole query when one of the IDs is not a valid accession, in that case the batch is split in two until that ID is found and left out.
+
+Arguments:
+    session: session used for the request (made with makeSession)
+    batch: list of UniProt IDs
+    isoforms: True for a batch of isoform IDs (bool)
+"""
+def fetchBatch(session, batch, isoforms=False):
+    params = {'query': ' OR '.join('accession:' + x for x in batch), 'format': 'fasta'}
+    if isoforms:
+        params['includeIsoform'] = 'true'
+    response = request(session, args.uniprot_url, params)
+    if response.status_code == 400:
+        if len(batch) == 1:
+            return {}
+        half = len(batch) // 2
+        return {**fetchBatch(session, batch[:half], isoforms), **fetchBatch(session, batch[half:], isoforms)}
+    response.raise_for_status()
+    return splitFasta(response.text)
+
+"""
+Function to fetch the fasta record of a single UniProt ID from the entry endpoint of UniProt, which redirects secondary accessions
+to the entry of their primary accession. Returns the record (string), or None when UniProt does not know the ID.
+
+Arguments:
+    session: session used for the request (made with makeSession)
+    x: UniProt ID (string)
+"""
+def fetchEntry(session, x):
+    response = request(session, '{}/{}.fasta'.format(args.uniprot_entry_url.rstrip('/'), x))
+    if response.status_code in (400, 404):
+        return None
+    response.raise_for_status()
+    records = list(splitFasta(response.text).values())
+    return records[0] if records else None
+
+"""
+Function to fetch the fasta records of a batch of UniProt IDs, with the requested UniProt ID as key.
+The records that the stream query returns under another UniProt ID (e.g. for a secondary accession) are fetched one by one from the entry endpoint.
+A batch (or ID) that still fails after its retries is printed and left out, so the other batches are still written and cached.
+
+Arguments:
+    session: session used for the requests (made with makeSession)
+    batch: list of UniProt IDs
+    isoforms: True for a batch of isoform IDs (bool)
+"""
+def fetchRecords(session, batch, isoforms=False):
+    try:
+        found = fetchBatch(session, batch, isoforms)
+    except requests.RequestException as error:
+        print("Fetching {} UniProt IDs failed ({}): {}".format(len(batch), error, ' '.join(batch)))
+        return {}
+    records = {x: found[x] for x in batch if x in found}
+    for x in batch:
+        if x not in records:
+            try:
+                record = fetchEntry(session, x)
+            except requests.RequestException as error:
+                print("Fetching UniProt ID {} failed ({})".format(x, error))
+                continue
+            if record is not None:
+                records[x] = record
+    return records
+
 """
 Function to create a multifasta file, containing the sequence information in fasta format accessed via UniProt
 for each protein that is specified in an input array.
+Records that are in the local sequence cache are taken from there, the other IDs are fetched in batches, by several threads at the same time.
+The records are written in the order of the input array, followed by the index of the multifasta file.
+A record that UniProt returns under another UniProt ID (secondary accession) is written with the header of UniProt, and printed.
+
+IMPORTANT: when the ID can not be found on UniProt (or fetching it failed), the protein will be missing from the multifasta file; these IDs are printed.
 
-IMPORTANT: when the ID can not be found on UniProt, the protein will be missing from the multifasta file.
+Arguments:
+    array: UniProt IDs (list or array)
 """
 def getFasta(array):
-    try:
-        all_fasta = open("../Output/filteredDataSeq.fasta", "w")
+    array = list(array)
+    if args.no_cache:
+        records, misses = {}, array
+    else:
+        ttl = args.cache_ttl * 24 * 3600 if args.cache_ttl is not None else None
+        records, misses = seqcache.lookup(args.cache_dir, array, ttl)
+
+    batches = []
+    for isoforms in (False, True):
+        ids = [x for x in misses if ('-' in x) == isoforms]
+        batches += [(ids[i:i + args.batch_size], isoforms) for i in range(0, len(ids), args.batch_size)]
+    fetched = {}
+    with makeSession(args.workers) as session, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for result in pool.map(lambda batch: fetchRecords(session, *batch), batches):
+            fetched.update(result)
+    records.update(fetched)
+
+    if not args.no_cache:
+        maxSize = int(args.cache_max_size * 1024 * 1024) if args.cache_max_size is not None else None
+        seqcache.store(args.cache_dir, fetched, maxSize)
+
+    os.makedirs('../Output', exist_ok=True)
+    written = set()
+    with open("../Output/filteredDataSeq.fasta", "w") as all_fasta:
         for x in array:
-            response = requests.get('https://www.uniprot.org/uniprot/' + x + '.fasta')
-            all_fasta.write(response.text)
-        all_fasta.close()
-    except FileNotFoundError:
-        all_fasta.close()
-        getFasta()
-        
-getFasta(uniqueID)
\ No newline at end of file
+            if x in records and records[x] not in written:
+                # the same record can be found under two IDs (a primary and a secondary accession), it is written once
+                all_fasta.write(records[x])
+                written.add(records[x])
+    buildIndex("../Output/filteredDataSeq.fasta")
+
+    renamed = [x for x in array if x in records and headerID(records[x]) != x]
+    if renamed:
+        print("UniProt IDs found under another UniProt ID: {}".format(' '.join('{} ({})'.format(x, headerID(records[x])) for x in renamed)))
+    missing = [x for x in array if x not in records]
+    if missing:
+        print("UniProt IDs without a record ({}): {}".format(len(missing), ' '.join(missing)))
+
+getFasta(uniqueID)
@@ -9,17 +9,37 @@
 
 """ 
 Requires: filteredData.tsv (generated with filter.py)
-Output: pathways.tsv
+Options:
+    --format: read and write .tsv files (tsv, default) or .parquet files (parquet)
+    --bulk: download the ID conversion and pathway tables of the whole organism once, instead of 2 requests per protein
+    --snapshot: read the KEGG tables from a local snapshot (made with keggsnapshot.py) instead of connecting to KEGG
+Output: pathways.tsv or pathways.parquet
 """
 
+import argparse
 import pandas as pd
-from bioservices.kegg import KEGG
+from keggsnapshot import getKeggTables, KeggSnapshot
 
-data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
+parser = argparse.ArgumentParser(description='Annotate the proteins with KEGG IDs and KEGG pathways.')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the input and output files (default: tsv)')
+parser.add_argument('--bulk', action='store_true', help='download the tables of the whole organism once instead of querying KEGG per protein')
+parser.add_argument('--snapshot', default=None, help='local KEGG snapshot to use instead of the KEGG REST API (see keggsnapshot.py)')
+args = parser.parse_args()
+
+if args.format == 'parquet':
+    from columnar import readParquet, writeParquet
+    data = readParquet('filteredData', columns=['Protein'])
+else:
+    data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
 uniqueID = data['Protein'].unique()
 df = pd.DataFrame(data=uniqueID,columns=["uniprotID"])
 
-k = KEGG()
+# The snapshot answers the same calls as the KEGG class, so all functions below work with both
+if args.snapshot:
+    k = KeggSnapshot(args.snapshot)
+else:
+    from bioservices.kegg import KEGG
+    k = KEGG()
 
 """
 Function to get Kegg ID's when given a specific UniProt ID and a KEGG accessionpoint.
@@ -107,8 +127,34 @@ def makeKeggPathCol(df,kIdCol,keggLink):
     for x in df[kIdCol]:
         df.at[i,"keggPathways"] = parsePath(getKeggPath(x,keggLink))
         i = i+1
-        
-        
-makeKeggCol(df,"uniprotID",k)
-makeKeggPathCol(df,"keggID",k)
-df.to_csv('../Output/pathways.tsv', sep = '\t')
\ No newline at end of file
+
+##Bulk mode: 3 requests for the whole organism instead of 2 requests per protein
+
+"""
+Function to fill in the columns "keggID" and "keggPathways" of a dataframe with UniProt ID's, using the tables from getKeggTables().
+Gives the same values as makeKeggCol() and makeKeggPathCol().
+
+Arguments:
+    df: DataFrame containing the UniProt ID's (pandas DataFrame)
+    upIdCol: name of the column that contains the UniProt ID's (string)
+    tables: the 3 dictionaries returned by getKeggTables() (see keggsnapshot.py)
+"""
+def makeKeggColsBulk(df, upIdCol, tables):
+    keggIds, genePaths, pathNames = tables
+    df["keggID"] = [keggIds.get(x, "NA") for x in df[upIdCol]]
+    pathways = []
+    for kId in df["keggID"]:
+        paths = sorted(genePaths.get(kId, []))
+        pathways.append(parsePath(dict((p, pathNames.get(p, "")) for p in paths) if paths else "NA"))
+    df["keggPathways"] = pathways
+
+
+if args.bulk:
+    makeKeggColsBulk(df, "uniprotID", k.tables() if args.snapshot else getKeggTables(k, "pae"))
+else:
+    makeKeggCol(df,"uniprotID",k)
+    makeKeggPathCol(df,"keggID",k)
+if args.format == 'parquet':
+    writeParquet(df, 'pathways')
+else:
+    df.to_csv('../Output/pathways.tsv', sep = '\t')
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+###################################################################
+##              Local snapshot of the KEGG tables                ##
+###################################################################
+##  - UniProt ID --> KEGG ID, KEGG ID --> pathways, pathway names ##
+##  - lets kegg.py run without connecting to KEGG                ##
+###################################################################
+
+"""
+Commands:
+    build: download the tables of the organism from KEGG and store them in the snapshot file
+    refresh: same as build, but only when the snapshot is missing or older than --max-age days
+Options:
+    --snapshot: path to the snapshot file (default ../Cache/keggSnapshot_pae.sqlite)
+    --org: KEGG organism code (default pae)
+    --max-age: maximum age of the snapshot in days, used by refresh (default 30)
+Output: snapshot file (SQLite), used by kegg.py --snapshot
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+# Version of the layout of the snapshot file, stored in the snapshot itself
+snapshotVersion = 1
+
+##Downloading the tables from KEGG
+
+"""
+Function to split the text returned by the KEGG REST API into (first column, second column) pairs, one per line.
+
+Arguments:
+    text: tab seperated text returned by KEGG (string)
+"""
+def parseKeggTable(text):
+    pairs = []
+    for line in text.strip().split("\n"):
+        cols = line.split("\t")
+        if len(cols) >= 2:
+            pairs.append((cols[0], cols[1]))
+    return pairs
+
+"""
+Function to download the tables needed to annotate all proteins of an organism:
+    UniProt ID --> KEGG ID (KEGG.conv)
+    KEGG ID --> pathway IDs (KEGG.link)
+    pathway ID --> pathway name (KEGG.list)
+Returns 3 dictionaries, without the "up:", "pae:" and "path:" prefixes, and without the organism name at the end of the pathway names.
+
+Arguments:
+    keggLink: accession point to KEGG database
+    org: KEGG organism code (string)
+"""
+def getKeggTables(keggLink, org):
+    conv = keggLink.conv(org, "uniprot")
+    conv = conv.items() if isinstance(conv, dict) else parseKeggTable(conv)
+    keggIds = {}
+    for upId, kId in conv:
+        keggIds[upId.partition(":")[2]] = kId.partition(":")[2]
+
+    genePaths = {}
+    for kId, pathId in parseKeggTable(keggLink.link("pathway", org)):
+        genePaths.setdefault(kId.partition(":")[2], []).append(pathId.replace("path:", ""))
+
+    pathNames = dict((pathId.replace("path:", ""), name) for pathId, name in parseKeggTable(keggLink.list("pathway/" + org)))
+    # names end with the organism, e.g. "Glycolysis / Gluconeogenesis - Pseudomonas aeruginosa PAO1"
+    if pathNames:
+        suffix = " - " + next(iter(pathNames.values())).rsplit(" - ", 1)[-1]
+        pathNames = dict((pathId, name[:-len(suffix)] if name.endswith(suffix) else name) for pathId, name in pathNames.items())
+    return keggIds, genePaths, pathNames
+
+##Building the snapshot
+
+"""
+Function to download the tables of an organism from KEGG and write them to a snapshot file.
+The file is first written under a temporary name, so an existing snapshot stays usable if the download fails.
+
+Arguments:
+    path: path to the snapshot file (string)
+    org: KEGG organism code (string)
+"""
+def buildSnapshot(path, org):
+    from bioservices.kegg import KEGG
+    k = KEGG()
+    keggIds, genePaths, pathNames = getKeggTables(k, org)
+
+    # KEGG release, e.g. "Release 97.0+/01-15, Jan 21"
+    try:
+        release = re.search(r'Release ([^\s,]+)', k.info("pathway")).group(1)
+    except (AttributeError, TypeError):
+        release = "unknown"
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmpPath = path + '.tmp'
+    if os.path.exists(tmpPath):
+        os.remove(tmpPath)
+    conn = sqlite3.connect(tmpPath)
+    with conn:
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        conn.execute('CREATE TABLE conv (uniprotID TEXT PRIMARY KEY, keggID TEXT)')
+        conn.execute('CREATE TABLE links (keggID TEXT, pathwayID TEXT, PRIMARY KEY (keggID, pathwayID)) WITHOUT ROWID')
+        conn.execute('CREATE TABLE pathways (pathwayID TEXT PRIMARY KEY, name TEXT)')
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [('version', str(snapshotVersion)), ('organism', org),
+                                                            ('created', str(time.time())), ('keggRelease', release)])
+        conn.executemany('INSERT INTO conv VALUES (?, ?)', keggIds.items())
+        conn.executemany('INSERT INTO links VALUES (?, ?)', [(kId, p) for kId, paths in genePaths.items() for p in set(paths)])
+        conn.executemany('INSERT INTO pathways VALUES (?, ?)', pathNames.items())
+    conn.close()
+    os.replace(tmpPath, path)
+    print("Snapshot of {} written to {} (KEGG release {}): {} UniProt IDs, {} genes with pathways, {} pathways".format(
+        org, path, release, len(keggIds), len(genePaths), len(pathNames)))
+
+"""
+Function to get the age of a snapshot file in days, None when there is no (readable) snapshot of the current version.
+
+Arguments:
+    path: path to the snapshot file (string)
+"""
+def snapshotAge(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(path)
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        conn.close()
+    except sqlite3.DatabaseError:
+        return None
+    if meta.get('version') != str(snapshotVersion):
+        return None
+    return (time.time() - float(meta['created'])) / (24 * 3600)
+
+"""
+Function to build the snapshot only when it is missing, of an older version, or older than maxAge days.
+
+Arguments:
+    path: path to the snapshot file (string)
+    org: KEGG organism code (string)
+    maxAge: maximum age of the snapshot in days (float)
+"""
+def refreshSnapshot(path, org, maxAge):
+    age = snapshotAge(path)
+    if age is not None and age <= maxAge:
+        print("Snapshot {} is {:.1f} days old, no refresh needed".format(path, age))
+    else:
+        buildSnapshot(path, org)
+
+##Reading the snapshot
+
+"""
+Class that answers the same calls as the bioservices KEGG class that are used in kegg.py (conv and get_pathway_by_gene),
+from a snapshot file instead of the KEGG REST API, so getKeggId() and getKeggPath() can be used without a connection to KEGG.
+
+Arguments:
+    path: path to the snapshot file (made with buildSnapshot)
+"""
+class KeggSnapshot:
+    def __init__(self, path):
+        if snapshotAge(path) is None:
+            raise ValueError("{} is not a KEGG snapshot of version {}, run 'python keggsnapshot.py build' first".format(path, snapshotVersion))
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+        self.org = self.meta['organism']
+
+    # Same output as KEGG.conv(org, "up:<UniProt ID>"): {"up:<UniProt ID>": "<org>:<KEGG ID>"}, or "\n" when not found
+    def conv(self, target, source):
+        row = self.conn.execute('SELECT keggID FROM conv WHERE uniprotID = ?', (source.partition(":")[2],)).fetchone()
+        if row is None:
+            return "\n"
+        return {source: "{}:{}".format(self.org, row[0])}
+
+    # Same output as KEGG.get_pathway_by_gene(<KEGG ID>, org): {pathway ID: pathway name}, or None when there are no pathways
+    def get_pathway_by_gene(self, kId, org):
+        rows = self.conn.execute("SELECT links.pathwayID, COALESCE(pathways.name, '') FROM links LEFT JOIN pathways "
+                                 "ON links.pathwayID = pathways.pathwayID WHERE links.keggID = ? ORDER BY links.pathwayID", (kId,)).fetchall()
+        return dict(rows) or None
+
+    # Same output as getKeggTables(), for kegg.py --bulk
+    def tables(self):
+        keggIds = dict(self.conn.execute('SELECT uniprotID, keggID FROM conv'))
+        genePaths = {}
+        for kId, pathId in self.conn.execute('SELECT keggID, pathwayID FROM links'):
+            genePaths.setdefault(kId, []).append(pathId)
+        pathNames = dict(self.conn.execute('SELECT pathwayID, name FROM pathways'))
+        return keggIds, genePaths, pathNames
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or refresh the local snapshot of the KEGG tables.')
+    parser.add_argument('command', choices=['build', 'refresh'], help='build: always download, refresh: only download when the snapshot is too old')
+    parser.add_argument('--snapshot', default='../Cache/keggSnapshot_pae.sqlite', help='path to the snapshot file (default: ../Cache/keggSnapshot_pae.sqlite)')
+    parser.add_argument('--org', default='pae', help='KEGG organism code (default: pae)')
+    parser.add_argument('--max-age', type=float, default=30, help='maximum age of the snapshot in days, for refresh (default: 30)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        buildSnapshot(args.snapshot, args.org)
+    else:
+        refreshSnapshot(args.snapshot, args.org, args.max_age)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+###################################################################
+##             Running all preprocessing scripts                 ##
+###################################################################
+##  - only reruns scripts whose inputs or options have changed   ##
+##  - independent scripts are run at the same time               ##
+###################################################################
+
+"""
+Arguments: acetylation data (as tab seperated textfile, see filter.py)
+Options:
+    --format: format of the intermediate files, tsv (default) or parquet
+    --max-pep, --min-intensity, --stream: passed to filter.py
+    --kegg-bulk, --kegg-snapshot: passed to kegg.py as --bulk and --snapshot
+    --no-cache, --uniprot-url: passed to interaction.py
+    --force: rerun these stages, even when nothing has changed
+    --jobs: maximum number of stages that run at the same time (default 4)
+Output: all files of filter.py, interaction.py, kegg.py, acetyl.py and aggregate.py, the output of string_check.py,
+        a timing report per stage, and pipeline_state.json (in Output) with the hashes of the last run of every stage
+
+Stages (with the stages they depend on):
+    filter
+    interaction (filter), string_check (interaction), kegg (filter), acetyl (filter)
+    aggregate (kegg, acetyl; also needs the manually downloaded STRING files in String_man)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# All scripts use paths relative to the Scripts directory, so they are always run from there
+scriptDir = os.path.dirname(os.path.abspath(__file__))
+outputDir = os.path.join(scriptDir, '..', 'Output')
+stringDir = os.path.join(scriptDir, '..', 'String_man')
+stateFile = os.path.join(outputDir, 'pipeline_state.json')
+
+"""
+Function to describe all stages of the pipeline.
+Returns a dictionary with the stage name as key and a dictionary with these keys as value:
+    scripts: python files of the stage (hashed, so changing the code reruns the stage)
+    args: command line arguments of the script
+    deps: stages that have to be finished first
+    inputs: files read by the stage
+    outputs: files written by the stage
+
+Arguments:
+    args: parsed command line arguments of pipeline.py
+"""
+def makeStages(args):
+    ext = '.' + args.format
+    out = lambda name: os.path.join(outputDir, name)
+    fmt = ['--format', args.format]
+    helpers = ['columnar.py'] if args.format == 'parquet' else []
+
+    filterArgs = [os.path.abspath(args.input), '--max-pep', str(args.max_pep), '--min-intensity', str(args.min_intensity)] + fmt
+    if args.stream:
+        filterArgs.append('--stream')
+    keggArgs = list(fmt)
+    keggInputs = [out('filteredData' + ext)]
+    if args.kegg_bulk:
+        keggArgs.append('--bulk')
+    if args.kegg_snapshot:
+        keggArgs += ['--snapshot', os.path.abspath(args.kegg_snapshot)]
+        keggInputs.append(os.path.abspath(args.kegg_snapshot))
+    interactionArgs = fmt + (['--no-cache'] if args.no_cache else [])
+    if args.uniprot_url:
+        interactionArgs += ['--uniprot-url', args.uniprot_url]
+
+    return {
+        'filter': {'scripts': ['filter.py'] + helpers, 'args': filterArgs, 'deps': [],
+                   'inputs': [os.path.abspath(args.input)], 'outputs': [out('filteredData' + ext)]},
+        'interaction': {'scripts': ['interaction.py', 'seqcache.py', 'fastaindex.py'] + helpers, 'args': interactionArgs, 'deps': ['filter'],
+                        'inputs': [out('filteredData' + ext)], 'outputs': [out('filteredDataSeq.fasta'), out('filteredDataSeq.fasta.fai')]},
+        'string_check': {'scripts': ['string_check.py', 'fastaindex.py'] + helpers, 'args': fmt, 'deps': ['interaction'],
+                         'inputs': [out('filteredData' + ext), out('filteredDataSeq.fasta')], 'outputs': []},
+        'kegg': {'scripts': ['kegg.py', 'keggsnapshot.py'] + helpers, 'args': keggArgs, 'deps': ['filter'],
+                 'inputs': keggInputs, 'outputs': [out('pathways' + ext)]},
+        'acetyl': {'scripts': ['acetyl.py'] + helpers, 'args': fmt, 'deps': ['filter'],
+                   'inputs': [out('filteredData' + ext)], 'outputs': [out('acetylation' + ext)]},
+        'aggregate': {'scripts': ['aggregate.py'] + helpers, 'args': fmt, 'deps': ['kegg', 'acetyl'],
+                      'inputs': [os.path.join(stringDir, 'string_interactions.tsv'), os.path.join(scriptDir, '..', '287.protein.actions.v11.0.txt.gz'),
+                                 os.path.join(stringDir, 'string_mapping.tsv'), out('pathways' + ext), out('acetylation' + ext)],
+                      'outputs': [out('nodeDf' + ext), out('ackegg' + ext), out('elements.json')]},
+    }
+
+"""
+Function to calculate the sha256 hash of the content of a file, None when the file does not exist.
+Hashes are kept in fileCache by path, size and modification time, so unchanged files are only read once.
+
+Arguments:
+    path: path to the file (string)
+    fileCache: dictionary with earlier hashes (from the state file)
+"""
+def hashFile(path, fileCache):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    cached = fileCache.get(path)
+    if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+        return cached['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    fileCache[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+"""
+Function to calculate the key of a stage: one hash of its scripts, its arguments and the content of its input files.
+When the key is the same as in the last successful run (and the outputs are unchanged), the stage can be skipped.
+
+Arguments:
+    stage: description of the stage (from makeStages)
+    fileCache: dictionary with earlier hashes (from the state file)
+"""
+def stageKey(stage, fileCache):
+    parts = {
+        'scripts': [hashFile(os.path.join(scriptDir, s), fileCache) for s in stage['scripts']],
+        'args': stage['args'],
+        'inputs': [hashFile(p, fileCache) for p in stage['inputs']],
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+"""
+Function to run one stage, unless its key and outputs are the same as in the last run.
+Returns (status, seconds, printed output of the script, or of its last run when skipped).
+
+Arguments:
+    name: name of the stage (string)
+    stage: description of the stage (from makeStages)
+    state: state of the last runs (from the state file), updated when the stage ran successfully
+    force: run the stage even when nothing changed (boolean)
+"""
+def runStage(name, stage, state, force):
+    start = time.time()
+    fileCache = state['files']
+    missing = [p for p in stage['inputs'] if not os.path.exists(p)]
+    if missing:
+        return 'missing input', time.time() - start, 'missing: ' + ', '.join(missing) + '\n'
+
+    key = stageKey(stage, fileCache)
+    last = state['stages'].get(name)
+    if not force and last and last['key'] == key and all(hashFile(p, fileCache) == h for p, h in last['outputs'].items()):
+        return 'skipped', time.time() - start, last.get('log', '')
+
+    result = subprocess.run([sys.executable, stage['scripts'][0]] + stage['args'], cwd=scriptDir,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if result.returncode != 0:
+        return 'failed', time.time() - start, result.stdout
+    state['stages'][name] = {'key': key, 'outputs': dict((p, hashFile(p, fileCache)) for p in stage['outputs']), 'log': result.stdout}
+    return 'ran', time.time() - start, result.stdout
+
+"""
+Function to run all stages in order of their dependencies, with at most `jobs` stages at the same time.
+When a stage fails, the stages that depend on it are not run.
+Returns a dictionary with (status, seconds) for every stage.
+
+Arguments:
+    stages: description of all stages (from makeStages)
+    state: state of the last runs (from the state file)
+    force: names of the stages that have to be run even when nothing changed (list)
+    jobs: maximum number of stages that run at the same time (int)
+"""
+def runPipeline(stages, state, force, jobs):
+    report = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(report) < len(stages):
+            for name, stage in stages.items():
+                if name in report or name in running.values():
+                    continue
+                if any(report.get(dep, ('',))[0] in ('failed', 'missing input', 'not run') for dep in stage['deps']):
+                    report[name] = ('not run', 0.0)
+                elif all(report.get(dep, ('',))[0] in ('ran', 'skipped') for dep in stage['deps']):
+                    # a stage whose dependency ran is only run again when that changed the content of its inputs
+                    running[pool.submit(runStage, name, stage, state, name in force)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                status, seconds, log = future.result()
+                report[name] = (status, seconds)
+                print("== {} ({}, {:.1f} s)".format(name, status, seconds))
+                if log:
+                    print(log, end='' if log.endswith('\n') else '\n')
+    return report
+
+"""
+Function to print the time spent in every stage.
+
+Arguments:
+    stages: description of all stages (from makeStages), used for the order
+    report: dictionary with (status, seconds) for every stage (from runPipeline)
+    total: total time of the run in seconds (float)
+"""
+def printReport(stages, report, total):
+    print("\n{:<14}{:<16}{:>10}".format('stage', 'status', 'seconds'))
+    for name in stages:
+        status, seconds = report[name]
+        print("{:<14}{:<16}{:>10.1f}".format(name, status, seconds))
+    print("{:<30}{:>10.1f}".format('total', total))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run all preprocessing scripts, skipping the ones whose inputs did not change.')
+    parser.add_argument('input', help='acetylation data (as tab seperated textfile)')
+    parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the intermediate files (default: tsv)')
+    parser.add_argument('--max-pep', type=float, default=0.05, help='passed to filter.py (default: 0.05)')
+    parser.add_argument('--min-intensity', type=float, default=0, help='passed to filter.py (default: 0)')
+    parser.add_argument('--stream', action='store_true', help='passed to filter.py')
+    parser.add_argument('--kegg-bulk', action='store_true', help='passed to kegg.py as --bulk')
+    parser.add_argument('--kegg-snapshot', default=None, help='passed to kegg.py as --snapshot')
+    parser.add_argument('--no-cache', action='store_true', help='passed to interaction.py')
+    parser.add_argument('--uniprot-url', default=None, help='passed to interaction.py')
+    parser.add_argument('--force', nargs='*', default=[], help='stages to rerun even when nothing changed')
+    parser.add_argument('--jobs', type=int, default=4, help='maximum number of stages that run at the same time (default: 4)')
+    args = parser.parse_args()
+
+    stages = makeStages(args)
+    unknown = set(args.force) - set(stages)
+    if unknown:
+        parser.error("unknown stage(s): " + ', '.join(sorted(unknown)))
+
+    try:
+        with open(stateFile) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {'stages': {}, 'files': {}}
+
+    start = time.time()
+    report = runPipeline(stages, state, set(args.force), args.jobs)
+    os.makedirs(outputDir, exist_ok=True)
+    with open(stateFile, 'w') as f:
+        json.dump(state, f, indent=1)
+    printReport(stages, report, time.time() - start)
+
+    if any(status in ('failed', 'missing input') for status, _ in report.values()):
+        sys.exit(1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+###################################################################
+##            Local cache for UniProt FASTA records              ##
+###################################################################
+##  - records are stored by content hash (sha256)                ##
+##  - an index links every UniProt ID to the hash of its record  ##
+###################################################################
+
+"""
+Used by: interaction.py (to only fetch proteins that are not cached yet) & string_check.py --cache (to check the cache)
+
+Layout of the cache directory:
+    index.sqlite: table with UniProt ID, hash of the record, time it was fetched, time it was last used and size in bytes
+    objects/ab/ab12...ef.fasta: the records, stored under their sha256 hash
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+"""
+Function to open the index of a cache directory (the directory and index are created when they do not exist yet).
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+"""
+def connect(cacheDir):
+    os.makedirs(os.path.join(cacheDir, 'objects'), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(cacheDir, 'index.sqlite'))
+    conn.execute('CREATE TABLE IF NOT EXISTS entries (accession TEXT PRIMARY KEY, digest TEXT, fetched REAL, lastUsed REAL, size INTEGER)')
+    return conn
+
+"""
+Function to get the path of the file in which a record with the given hash is stored.
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    digest: sha256 hash of the record (string)
+"""
+def objectPath(cacheDir, digest):
+    return os.path.join(cacheDir, 'objects', digest[:2], digest + '.fasta')
+
+"""
+Function to get the index entries of the given UniProt IDs.
+Returns a dictionary with the UniProt ID as key and (digest, fetched, size) as value, IDs that are not in the index are left out.
+
+Arguments:
+    conn: connection to the index (made with connect)
+    ids: UniProt IDs (list)
+"""
+def getEntries(conn, ids):
+    entries = {}
+    ids = list(ids)
+    # sqlite limits the number of parameters per query
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        rows = conn.execute('SELECT accession, digest, fetched, size FROM entries WHERE accession IN ({})'.format(','.join('?' * len(part))), part)
+        for accession, digest, fetched, size in rows:
+            entries[accession] = (digest, fetched, size)
+    return entries
+
+"""
+Function to look up the fasta records of the given UniProt IDs in the cache.
+Returns a dictionary with the records that were found and a list with the IDs that have to be fetched.
+Records that are older than the TTL, or whose file is missing or damaged, count as not found.
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    ids: UniProt IDs (list)
+    ttl: maximum age of a record in seconds, None to keep records forever (float)
+"""
+def lookup(cacheDir, ids, ttl=None):
+    now = time.time()
+    records = {}
+    misses = []
+    with connect(cacheDir) as conn:
+        entries = getEntries(conn, ids)
+        for x in ids:
+            entry = entries.get(x)
+            record = None
+            if entry and (ttl is None or now - entry[1] <= ttl):
+                record = readObject(cacheDir, entry[0])
+            if record is None:
+                misses.append(x)
+            else:
+                records[x] = record
+        conn.executemany('UPDATE entries SET lastUsed = ? WHERE accession = ?', [(now, x) for x in records])
+    conn.close()
+    return records, misses
+
+"""
+Function to read a record from the cache, returns None when the file is missing or its content does not match its hash.
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    digest: sha256 hash of the record (string)
+"""
+def readObject(cacheDir, digest):
+    try:
+        with open(objectPath(cacheDir, digest), 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    if hashlib.sha256(content).hexdigest() != digest:
+        return None
+    return content.decode()
+
+"""
+Function to add fasta records to the cache, and afterwards remove the least recently used records if the cache is too large.
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    records: dictionary with UniProt ID as key and fasta record as value
+    maxSize: maximum size of all records together in bytes, None for no limit (int)
+"""
+def store(cacheDir, records, maxSize=None):
+    now = time.time()
+    rows = []
+    for x, record in records.items():
+        content = record.encode()
+        digest = hashlib.sha256(content).hexdigest()
+        path = objectPath(cacheDir, digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file first, so an interrupted run never leaves a half written record
+            with open(path + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(path + '.tmp', path)
+        rows.append((x, digest, now, now, len(content)))
+    with connect(cacheDir) as conn:
+        conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', rows)
+    conn.close()
+    if maxSize is not None:
+        evict(cacheDir, maxSize)
+
+"""
+Function to remove the least recently used records until the records in the cache take up at most maxSize bytes.
+Files are only deleted when no UniProt ID refers to them anymore.
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    maxSize: maximum size of all records together in bytes (int)
+"""
+def evict(cacheDir, maxSize):
+    with connect(cacheDir) as conn:
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        removed = []
+        for accession, digest, size in conn.execute('SELECT accession, digest, size FROM entries ORDER BY lastUsed').fetchall():
+            if total <= maxSize:
+                break
+            removed.append((accession, digest))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE accession = ?', [(x,) for x, _ in removed])
+        for digest in set(d for _, d in removed):
+            if conn.execute('SELECT 1 FROM entries WHERE digest = ?', (digest,)).fetchone() is None:
+                try:
+                    os.remove(objectPath(cacheDir, digest))
+                except FileNotFoundError:
+                    pass
+    conn.close()
+
+"""
+Function to check the cache for the given UniProt IDs.
+Returns a dictionary with these lists of UniProt IDs:
+    hits: valid record in the cache
+    misses: not in the cache
+    expired: record is older than the TTL
+    missingFile: in the index, but the file of the record is missing
+    corrupt: content of the file does not match its hash, or it is not a fasta record
+(the header can contain another UniProt ID than the one that was requested, e.g. the primary accession of a secondary accession)
+
+Arguments:
+    cacheDir: path to the cache directory (string)
+    ids: UniProt IDs (list)
+    ttl: maximum age of a record in seconds, None to keep records forever (float)
+"""
+def checkCache(cacheDir, ids, ttl=None):
+    now = time.time()
+    report = {'hits': [], 'misses': [], 'expired': [], 'missingFile': [], 'corrupt': []}
+    with connect(cacheDir) as conn:
+        entries = getEntries(conn, ids)
+    conn.close()
+    for x in ids:
+        entry = entries.get(x)
+        if entry is None:
+            report['misses'].append(x)
+        elif not os.path.exists(objectPath(cacheDir, entry[0])):
+            report['missingFile'].append(x)
+        else:
+            record = readObject(cacheDir, entry[0])
+            if record is None or not record.startswith('>'):
+                report['corrupt'].append(x)
+            elif ttl is not None and now - entry[1] > ttl:
+                report['expired'].append(x)
+            else:
+                report['hits'].append(x)
+    return report
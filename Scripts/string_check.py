@@ -9,41 +9,54 @@
 
 """ 
 Requires: filteredData.tsv (generated with filter.py) & filteredDataSeq.fasta (generated with interaction.py)
-Output: prints UniProt ID's of proteins of which the sequence could not be fetched
+          filteredDataSeq.fasta.fai is (re)built when it is missing or older than filteredDataSeq.fasta
+Options:
+    --format: read filteredData.tsv (tsv, default) or filteredData.parquet (parquet)
+    --cache: check the local sequence cache (see seqcache.py) instead of the multifasta file
+    --cache-dir: directory of the local sequence cache (default ../Cache)
+    --cache-ttl: records older than this number of days are reported as expired (default: never)
+Output: prints UniProt ID's of proteins of which the sequence could not be fetched,
+        or with --cache: the number of cache hits, misses and damaged records, and the UniProt ID's that are not a hit
 """
 
+import argparse
 import pandas as pd
-
-data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
+from fastaindex import missingProteins
+
+parser = argparse.ArgumentParser(description='Check which proteins are missing from the multifasta file.')
+parser.add_argument('--format', choices=['tsv', 'parquet'], default='tsv', help='format of the input file (default: tsv)')
+parser.add_argument('--cache', action='store_true', help='check the local sequence cache instead of the multifasta file')
+parser.add_argument('--cache-dir', default='../Cache', help='directory of the local sequence cache (default: ../Cache)')
+parser.add_argument('--cache-ttl', type=float, default=None, help='maximum age of cached records in days (default: no limit)')
+args = parser.parse_args()
+
+if args.format == 'parquet':
+    from columnar import readParquet
+    data = readParquet('filteredData', columns=['Protein'])
+else:
+    data = pd.read_csv('../Output/filteredData.tsv',sep='\t')
 uniqueID = data['Protein'].unique()
 
 """
-Function to extract the gene name in a FASTA header line
+Function to print a report of the local sequence cache for all proteins in the filtered data.
 
 Arguments:
-    descripString: string in which gene should be located
-"""
-def findProtID(descripString):
-    import re
-    global result
-    gene = re.search('\|(.+?)\|',descripString)
-    if gene:
-        result = gene.group(1)
-    return result
-
-"""
-Function to extract all protein identifiers that are found in a multifasta file.
+    cacheDir: path to the cache directory (string)
+    ttl: maximum age of a record in days, None to keep records forever (float)
 """
-def getAllFoundProteinIDs():
-    result = []
-    for line in open("../Output/filteredDataSeq.fasta"):
-        global descrip
-        if line.startswith(">"):
-                descrip = line
-                protID = findProtID(descrip)
-                result.append(protID)
-    return result
-
-##Print all UniProt IDs that are in the filtered input data but are missing in the multifasta file
-foundProt = getAllFoundProteinIDs()
-print(set(foundProt) ^ set(uniqueID))
\ No newline at end of file
+def printCacheReport(cacheDir, ttl):
+    import seqcache
+    report = seqcache.checkCache(cacheDir, list(uniqueID), ttl * 24 * 3600 if ttl is not None else None)
+    print("Proteins: {}".format(len(uniqueID)))
+    for key, description in [('hits', 'cache hits'), ('misses', 'cache misses'), ('expired', 'expired records'),
+                             ('missingFile', 'records with missing file'), ('corrupt', 'damaged records')]:
+        print("{}: {}".format(description, len(report[key])))
+    for key in ['misses', 'expired', 'missingFile', 'corrupt']:
+        if report[key]:
+            print("\n{}:\n{}".format(key, ' '.join(report[key])))
+
+if args.cache:
+    printCacheReport(args.cache_dir, args.cache_ttl)
+else:
+    ##Print all UniProt IDs that are in the filtered input data but are missing in the multifasta file
+    print(missingProteins("../Output/filteredDataSeq.fasta", uniqueID))
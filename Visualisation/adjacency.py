@@ -0,0 +1,98 @@
+"""
+;===================================================================================================
+; Title:   Adjacency index of the interaction graph, for the neighbourhood of a protein (focus mode)
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+The graph is stored in compressed sparse row (CSR) form: the neighbours of node i are
+	neighbours[starts[i]:starts[i + 1]]
+and edges[starts[i]:starts[i + 1]] are the positions of the edges to these neighbours (every edge is stored twice, once for both of its nodes).
+Nodes and edges are positions (integers), e.g. in the lists of nodes and edges of a ScoreIndex (see main.py).
+The neighbourhood of k hops around a node is found with a breadth first search that takes the neighbours of all nodes of a hop at once,
+so it only looks at the edges of the nodes in the neighbourhood, not at all edges of the graph.
+The communities of the nodes (see communities) group the nodes in the overview of the graph.
+
+"""
+import numpy as np
+
+
+# Returns the positions of the slices values[starts[i]:ends[i]] of all i, as one numpy array
+def slice_positions(starts, ends):
+	lengths = ends - starts
+	return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+# CSR adjacency index of a graph with num_nodes nodes and an edge between sources[i] and targets[i] (numpy arrays of node positions)
+class Adjacency:
+	def __init__(self, sources, targets, num_nodes):
+		ends = np.concatenate([sources, targets])
+		order = np.argsort(ends, kind='stable')
+		self.neighbours = np.concatenate([targets, sources])[order]
+		self.edges = np.tile(np.arange(len(sources)), 2)[order]
+		self.starts = np.searchsorted(ends[order], np.arange(num_nodes + 1))
+		self.num_nodes = num_nodes
+
+	# Returns the neighbours of nodes, and the edges to them (one element per edge, so a neighbour can be in it more than once)
+	# edge_mask: boolean numpy array with an element for every edge, only the edges that are True are used
+	def neighbours_of(self, nodes, edge_mask):
+		positions = slice_positions(self.starts[nodes], self.starts[nodes + 1])
+		edges = self.edges[positions]
+		used = edge_mask[edges]
+		return self.neighbours[positions][used], edges[used]
+
+	# Returns the number of hops from the nearest of centers to every node (numpy array), -1 for nodes that are more than hops away
+	def distances(self, centers, hops, edge_mask):
+		distance = np.full(self.num_nodes, -1)
+		frontier = np.unique(centers)
+		distance[frontier] = 0
+		for hop in range(1, hops + 1):
+			if not len(frontier):
+				break
+			neighbours = self.neighbours_of(frontier, edge_mask)[0]
+			frontier = np.unique(neighbours[distance[neighbours] < 0])
+			distance[frontier] = hop
+		return distance
+
+	# Returns the (sorted) positions of the nodes that are at most hops away from centers, and of the edges between these nodes
+	# known: number of hops that is already shown, only the nodes that are further away and the edges to them are returned then,
+	# so going from k to k + 1 hops only gives the elements that are new
+	def ego(self, centers, hops, edge_mask, known=-1):
+		distance = self.distances(centers, hops, edge_mask)
+		nodes = np.flatnonzero(distance > known)
+		neighbours, edges = self.neighbours_of(nodes, edge_mask)
+		return nodes, np.unique(edges[distance[neighbours] >= 0])
+
+	# Returns the community of every node (numpy array), found with label propagation: every node starts in its own community and then
+	# takes the community to which the total weight of its edges is the highest, until (almost) no node changes community
+	# The nodes are changed in batches (in a random order, seed: start of the random numbers, so the result is always the same),
+	# every batch with the communities after the previous batch: changing all nodes at once can make two groups of nodes keep swapping communities
+	# weights: numpy array with the weight of every edge (e.g. the combined score), only the edges that are True in edge_mask are used
+	# A community is the position of one of its nodes, nodes without edges keep their own position
+	def communities(self, edge_mask, weights, iterations=30, batches=20, seed=0):
+		random = np.random.RandomState(seed)
+		labels = np.arange(self.num_nodes)
+		degrees = np.diff(self.starts)
+		for iteration in range(iterations):
+			changed = 0
+			for batch in np.array_split(random.permutation(self.num_nodes), batches):
+				positions = slice_positions(self.starts[batch], self.starts[batch + 1])
+				used = edge_mask[self.edges[positions]]
+				nodes = np.repeat(batch, degrees[batch])[used]
+				positions = positions[used]
+
+				# total weight of the edges of every node to every community of its neighbours (with a tiny random part, to break ties)
+				pairs, inverse = np.unique(nodes * self.num_nodes + labels[self.neighbours[positions]], return_inverse=True)
+				totals = np.bincount(inverse, weights=weights[self.edges[positions]]) + random.uniform(0, 1e-6, len(pairs))
+				pair_nodes, pair_labels = pairs // self.num_nodes, pairs % self.num_nodes
+
+				# the community with the highest total is the first one of every node after sorting
+				order = np.lexsort((-totals, pair_nodes))
+				first = np.ones(len(order), dtype=bool)
+				first[1:] = pair_nodes[order][1:] != pair_nodes[order][:-1]
+				best_nodes, best_labels = pair_nodes[order][first], pair_labels[order][first]
+				change = labels[best_nodes] != best_labels
+				labels[best_nodes[change]] = best_labels[change]
+				changed += change.sum()
+			if changed <= self.num_nodes // 1000:
+				break
+		return labels
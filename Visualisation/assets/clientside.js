@@ -0,0 +1,176 @@
+/*
+;===================================================================================================
+; Title:   Clientside callbacks of the cytoscape node graph
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+These callbacks run in the browser (they are added in register_callbacks in main.py), so clicking a node, changing the node labels,
+showing the edge labels and counting the nodes do not have to wait for the server.
+Dash loads every .js file in the assets folder.
+
+The stylesheets and labels come from the 'graph_style' store (see graph_style in main.py).
+*/
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+	paces: {
+
+		// Returns the stylesheet of the cytoscape node graph
+		// inputs used to change the stylesheet:
+		//  - selecting a node or searching a protein (the 'selection' store):	Colors the selected node, and the nodes and edges connected to it,
+		//																		or the found proteins purple, and makes all other nodes and edges fade
+		//  - selecting a different label in the node labels dropdown:			Changes label of nodes
+		//  - clicking edgelabel checklist:										Displays interactions atributes of an edge as an edge label.
+		// The selected nodes and their partners have classes (see show_graph), so the same few rules style any selection
+		generate_stylesheet: function(selection, new_label, edgelabelvalue, graph_style) {
+			var label = graph_style.labels[new_label] || 'data(label)';
+
+			// Rules with the label of the dropdown (instead of the gene name)
+			var with_label = function(rule) {
+				if (rule.style.label !== 'data(label)') {
+					return rule;
+				}
+				return {selector: rule.selector, style: Object.assign({}, rule.style, {label: label})};
+			};
+			var default_stylesheet = graph_style.default_stylesheet.map(with_label);
+
+			// if no node is selected, and no protein is searched, return to default stylesheet
+			if (!selection) {
+				return default_stylesheet;
+			}
+
+			// Defines value of edge label
+			var edge_label = (edgelabelvalue || []).indexOf('show_interaction') !== -1 ? 'data(interaction)' : '';
+
+			// Everything is very opaque, except for the selected nodes, their partners and interactions
+			return default_stylesheet.concat([{
+				selector: 'node',
+				style: {
+					'opacity': 0.3,
+					'label': ''
+				}
+			}, {
+				selector: 'edge',
+				style: {
+					'opacity': 0.2,
+					'curve-style': 'bezier'
+				}
+			}], graph_style.selection_stylesheet.map(with_label), [{
+				selector: 'edge.neighbour',
+				style: {
+					'label': edge_label
+				}
+			}]);
+		},
+
+		// Returns the selected proteins: the clicked node ({ids: [id], searched: false}), or the proteins found with the search box
+		// ({ids: [...], searched: true}, see search_protein in main.py), or null when nothing is selected ('Return to default look')
+		selection: function(data, button, search_result) {
+			var triggered = dash_clientside.callback_context.triggered;
+			var changed_id = triggered.length ? triggered[0].prop_id : '.';
+			if (changed_id.indexOf('to_default_stylesheet') !== -1) {
+				return null;
+			}
+			if (changed_id.indexOf('search_result') !== -1) {
+				return search_result && search_result.ids.length ? {ids: search_result.ids, searched: true} : null;
+			}
+			return data ? {ids: [data.id], searched: false} : null;
+		},
+
+		// Returns the id of the clicked node in focus mode (the new center of the neighbourhood that is shown),
+		// or of the clicked meta-node in the overview (to expand it), see update_graph_elements in main.py
+		tapped_node: function(data, graph_mode) {
+			if (!data || (graph_mode !== 'focus' && data.members === undefined)) {
+				return window.dash_clientside.no_update;
+			}
+			return data.id;
+		},
+
+		// Returns the elements of the graph and the positions of its nodes after an update from the server (see update_graph_elements in main.py):
+		// the new elements are added to the elements that are shown (append), or replace them (elements is null when only the positions changed)
+		merge_elements: function(update, graph) {
+			if (!update) {
+				return window.dash_clientside.no_update;
+			}
+			var elements = (graph && graph.elements) || [];
+			if (update.elements) {
+				elements = update.append ? elements.concat(update.elements) : update.elements;
+			}
+			return {elements: elements, positions: update.positions};
+		},
+
+		// Returns the layout of the dropdown, to keep it in the 'graph_layout' store
+		layout_name: function(layout) {
+			return layout;
+		},
+
+		// Shows the elements of the 'graph_elements' store in the graph (not when only the layout changed), with the layout of the dropdown:
+		// the 'precomputed' layout is a 'preset' layout with the positions computed on the server
+		// The nodes and edges get the classes that are styled by the stylesheet (see selection_stylesheet in main.py):
+		//  - 'highlighted': the proteins in highlighted (see highlight_proteins in main.py)
+		//  - 'selected' or 'searched': the proteins in selection (see selection), and 'neighbour': the partners of a selected protein and their interactions
+		// (the layout is not changed when only the classes changed)
+		show_graph: function(graph, layout, highlighted, selection) {
+			var triggered = dash_clientside.callback_context.triggered.map(function(t) { return t.prop_id; });
+			var only_layout = triggered.length === 1 && triggered[0] === 'dropdown-layout.value';
+			var only_classes = triggered.length > 0 && triggered.every(function(id) { return id === 'highlighted.data' || id === 'selection.data'; });
+			var elements = window.dash_clientside.no_update;
+			if (graph && !only_layout) {
+				var highlighted_ids = new Set(highlighted || []);
+				var selected_ids = new Set(selection ? selection.ids : []);
+				var searched = selection && selection.searched;
+				var neighbours = new Set();
+				if (selection && !searched) {
+					graph.elements.forEach(function(element) {
+						if (selected_ids.has(element.data.source)) {
+							neighbours.add(element.data.target);
+						}
+						if (selected_ids.has(element.data.target)) {
+							neighbours.add(element.data.source);
+						}
+					});
+				}
+				// every element gets its classes (also none), so the classes of an earlier selection are removed
+				elements = graph.elements.map(function(element) {
+					var classes = [];
+					var id = element.data.id;
+					if (element.data.source === undefined) {
+						if (highlighted_ids.has(id)) {
+							classes.push('highlighted');
+						}
+						if (selected_ids.has(id)) {
+							classes.push(searched ? 'searched' : 'selected');
+						} else if (neighbours.has(id)) {
+							classes.push('neighbour');
+						}
+					} else if (!searched && (selected_ids.has(element.data.source) || selected_ids.has(element.data.target))) {
+						classes.push('neighbour');
+					}
+					return Object.assign({}, element, {classes: classes.join(' ')});
+				});
+			}
+			if (only_classes) {
+				return [elements, window.dash_clientside.no_update];
+			}
+			if (layout !== 'precomputed') {
+				return [elements, {name: layout}];
+			}
+			if (!graph || !graph.positions) {
+				// the positions are not there yet, they are sent by the server
+				return [elements, window.dash_clientside.no_update];
+			}
+			return [elements, {name: 'preset', positions: graph.positions}];
+		},
+
+		// Displays total number of nodes in cytoscape node graph (the nodes of the edges)
+		num_nodes: function(elements) {
+			var nodes = new Set();
+			(elements || []).forEach(function(element) {
+				if (element.data.source !== undefined) {
+					nodes.add(element.data.source);
+					nodes.add(element.data.target);
+				}
+			});
+			return 'Currently displaying ' + nodes.size + ' nodes ';
+		}
+	}
+});
@@ -0,0 +1,283 @@
+"""
+;===================================================================================================
+; Title:   Filter queries of the DataTables (filter_query) as vectorized masks
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+Supported filter queries (the format made by the filter boxes of the columns of the DataTables):
+	{column} operator value		operators: = eq, != ne, < lt, <= le, > gt, >= ge, contains, datestartswith
+								(a value without operator is 'contains', the columns of the tables have no type)
+	{column} is blank / is nil / is num / is str
+	the clauses of the columns that are filtered are combined with &&, e.g. {node1} contains acs && {combined_score} >= 0.9
+
+"""
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+# Every token of a query: column, quoted string, logical operator, parenthesis, comparison symbol or word
+token_pattern = re.compile(r'''\s*(?:
+	(?P<column>\{(?:[^}\\]|\\.)*\})
+	|(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|`(?:[^`\\]|\\.)*`)
+	|(?P<logical>&&|\|\||!(?!=))
+	|(?P<paren>[()])
+	|(?P<symbol><=|>=|!=|<|>|=)
+	|(?P<word>[^\s(){}'"`&|<>=!]+|[&|<>=!'"`])
+	)''', re.X)
+
+# Comparison operators and the name of the matching pandas Series method
+relational_operators = {'=': 'eq', 'eq': 'eq', '!=': 'ne', 'ne': 'ne', '<': 'lt', 'lt': 'lt', '<=': 'le', 'le': 'le',
+						'>': 'gt', 'gt': 'gt', '>=': 'ge', 'ge': 'ge', 'contains': 'contains', 'datestartswith': 'datestartswith'}
+unary_operators = ('blank', 'nil', 'num', 'str')
+
+
+# Splits a query in (kind, text, start, end) tokens, raises a ValueError for text that can not be read
+def tokenize(query):
+	tokens = []
+	position = 0
+	query = query.rstrip()
+	while position < len(query):
+		match = token_pattern.match(query, position)
+		if not match or match.end() == position:
+			raise ValueError("can not read filter query at: {}".format(query[position:]))
+		kind = match.lastgroup
+		tokens.append((kind, match.group(kind), match.start(kind), match.end(kind)))
+		position = match.end()
+	return tokens
+
+
+# Turns the text of a value into a float, or a string (without quotes) when it is quoted or not a number
+def parse_value(text):
+	if len(text) > 1 and text[0] == text[-1] and text[0] in ("'", '"', '`'):
+		return text[1:-1].replace('\\' + text[0], text[0])
+	try:
+		return float(text)
+	except ValueError:
+		return text
+
+
+# Parses a query into a plan of nested tuples:
+#	('and', plan, plan, ...), ('or', plan, plan, ...), ('not', plan),
+#	('compare', column, operator, value, case_insensitive) and ('is', column, unary operator)
+# An empty query gives ('and',) which keeps all rows
+def parse(query):
+	tokens = tokenize(query)
+	position = [0]
+
+	def peek():
+		return tokens[position[0]] if position[0] < len(tokens) else (None, None, len(query), len(query))
+
+	def take():
+		token = peek()
+		position[0] += 1
+		return token
+
+	def expression():
+		parts = [conjunction()]
+		while peek()[1] == '||':
+			take()
+			parts.append(conjunction())
+		return parts[0] if len(parts) == 1 else ('or',) + tuple(parts)
+
+	def conjunction():
+		parts = [factor()]
+		while peek()[1] == '&&':
+			take()
+			parts.append(factor())
+		# nested conjunctions are flattened, so every clause of a chain of && is on the same level
+		flat = []
+		for part in parts:
+			flat.extend(part[1:] if part[0] == 'and' else [part])
+		return flat[0] if len(flat) == 1 else ('and',) + tuple(flat)
+
+	def factor():
+		kind, text, start, end = peek()
+		if text == '!':
+			take()
+			return ('not', factor())
+		if text == '(':
+			take()
+			plan = expression()
+			if take()[1] != ')':
+				raise ValueError("missing ) in filter query: {}".format(query))
+			return plan
+		if kind == 'column':
+			return clause()
+		raise ValueError("expected a column, ! or ( in filter query at: {}".format(query[start:]))
+
+	def clause():
+		column = take()[1][1:-1].replace('\\}', '}')
+		kind, text, start, end = take()
+		if text == 'is':
+			unary = take()[1]
+			if unary not in unary_operators:
+				raise ValueError("unknown operator 'is {}' in filter query".format(unary))
+			return ('is', column, unary)
+		case_insensitive = False
+		if text in ('i', 's') and peek()[0] == 'symbol' and peek()[2] == end:
+			# i= s> ... (case insensitive / sensitive version of a symbol)
+			text += take()[1]
+		if text not in relational_operators and text and text[0] in 'is' and text[1:] in relational_operators:
+			case_insensitive = text[0] == 'i'
+			text = text[1:]
+		if text not in relational_operators:
+			raise ValueError("unknown operator '{}' in filter query".format(text))
+		# the value is everything up to the next &&, || or ), so values with spaces do not have to be quoted
+		value_tokens = []
+		while peek()[0] is not None and peek()[0] != 'logical' and peek()[1] != ')':
+			value_tokens.append(take())
+		if not value_tokens:
+			raise ValueError("missing value after '{}' in filter query".format(text))
+		if len(value_tokens) == 1:
+			value = parse_value(value_tokens[0][1])
+		else:
+			value = query[value_tokens[0][2]:value_tokens[-1][3]]
+		operator = relational_operators[text]
+		if operator in ('contains', 'datestartswith') and not isinstance(value, str):
+			# text operators compare with the value as it was typed (so 3 is not read as 3.0)
+			value = value_tokens[0][1]
+		return ('compare', column, operator, value, case_insensitive)
+
+	if not tokens:
+		return ('and',)
+	plan = expression()
+	if position[0] != len(tokens):
+		raise ValueError("unexpected '{}' in filter query".format(peek()[1]))
+	return plan
+
+
+# Returns a boolean numpy array: True for the rows of df (only the rows at the positions in rows) that match one clause
+# text_indexes: dictionary with column name as key and TextIndex (see text_index.py) as value, used for 'contains'
+def clause_mask(df, clause, rows, text_indexes):
+	if clause[1] not in df.columns:
+		raise ValueError("unknown column '{}' in filter query".format(clause[1]))
+	if text_indexes and clause[0] == 'compare' and clause[2] == 'contains' and clause[1] in text_indexes:
+		mask = text_indexes[clause[1]].mask(clause[3], clause[4], df.index.to_numpy()[rows])
+		if mask is not None:
+			return mask
+	# only the column that is needed is taken from the rows
+	series = df[clause[1]].iloc[rows]
+
+	if clause[0] == 'is':
+		if clause[2] == 'nil':
+			return series.isna().to_numpy()
+		if clause[2] == 'blank':
+			return (series.isna() | (series.astype(str).str.strip() == '')).to_numpy()
+		if clause[2] == 'num':
+			return np.array([isinstance(x, (int, float, np.number)) and not isinstance(x, bool) and x == x for x in series])
+		return np.array([isinstance(x, str) for x in series])
+
+	_, column, operator, value, case_insensitive = clause
+	if operator in ('contains', 'datestartswith') or (case_insensitive and isinstance(value, str)):
+		# text comparison, on the text of the cells; empty cells never match
+		text = series.astype(str) if series.dtype != object else series
+		if case_insensitive:
+			text, value = text.str.lower(), value.lower()
+		if operator == 'contains':
+			mask = text.str.contains(value, regex=False, na=False)
+		elif operator == 'datestartswith':
+			mask = text.str.startswith(value, na=False)
+		else:
+			mask = getattr(text, operator)(value)
+		return (mask & series.notna()).to_numpy()
+	try:
+		return getattr(series, operator)(value).to_numpy()
+	except TypeError:
+		raise ValueError("can not compare column '{}' with '{}'".format(column, value))
+
+
+# Returns a boolean numpy array: True for the rows of df (at the positions in rows) that match a plan (combining the masks of the clauses)
+def plan_mask(df, plan, rows, text_indexes):
+	if plan[0] == 'and':
+		mask = np.ones(len(rows), dtype=bool)
+		for part in plan[1:]:
+			mask &= plan_mask(df, part, rows, text_indexes)
+		return mask
+	if plan[0] == 'or':
+		mask = np.zeros(len(rows), dtype=bool)
+		for part in plan[1:]:
+			mask |= plan_mask(df, part, rows, text_indexes)
+		return mask
+	if plan[0] == 'not':
+		return ~plan_mask(df, plan[1], rows, text_indexes)
+	return clause_mask(df, plan, rows, text_indexes)
+
+
+# Least recently used cache of parsed queries (plans) and of the rows that match them, counting the cache hits and misses
+# Rows are cached for every first part of a chain of && clauses, so a query that adds a clause to an earlier query
+# (or types more characters of a 'contains' value) only has to check the rows that matched the earlier query
+# The cache can be used by several threads at the same time, so it is locked while it is changed
+class QueryCache:
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.plans = OrderedDict()
+		self.rows = OrderedDict()
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def _get(self, entries, key):
+		with self.lock:
+			if key in entries:
+				entries.move_to_end(key)
+				return entries[key]
+			return None
+
+	def _put(self, entries, key, value):
+		with self.lock:
+			entries[key] = value
+			entries.move_to_end(key)
+			while len(entries) > self.maxsize:
+				entries.popitem(last=False)
+
+	# Returns the plan of a query, parsing it only the first time
+	def plan(self, query):
+		plan = self._get(self.plans, query)
+		if plan is None:
+			plan = parse(query)
+			self._put(self.plans, query, plan)
+		return plan
+
+	# Returns the positions (numpy array of ints) of the rows of df that match the query
+	# data_key identifies df: the cached rows of a data_key are only valid for exactly the same dataframe
+	# text_indexes: indexes of the text columns of df, used for 'contains' (see clause_mask)
+	def filter_rows(self, df, query, data_key, text_indexes=None):
+		plan = self.plan(query or '')
+		clauses = plan[1:] if plan[0] == 'and' else (plan,)
+
+		# longest first part of the chain of clauses that was filtered before
+		done, rows = 0, None
+		for count in range(len(clauses), 0, -1):
+			rows = self._get(self.rows, (data_key, clauses[:count]))
+			if rows is not None:
+				done = count
+				break
+		if done == len(clauses) and done > 0:
+			self.hits += 1
+			return rows
+		self.misses += 1
+		if rows is None:
+			rows = np.arange(len(df))
+
+		for count in range(done + 1, len(clauses) + 1):
+			clause = clauses[count - 1]
+			rows = self._shorter_contains_rows(data_key, clauses[:count - 1], clause, rows)
+			rows = rows[plan_mask(df, clause, rows, text_indexes)]
+			self._put(self.rows, (data_key, clauses[:count]), rows)
+		return rows
+
+	# For a 'contains' clause: the rows that matched the same clause with a shorter value (which contain all rows of the longer value)
+	def _shorter_contains_rows(self, data_key, before, clause, rows):
+		if clause[0] != 'compare' or clause[2] != 'contains' or not isinstance(clause[3], str):
+			return rows
+		for length in range(len(clause[3]) - 1, 0, -1):
+			shorter = clause[:3] + (clause[3][:length],) + clause[4:]
+			cached = self._get(self.rows, (data_key, before + (shorter,)))
+			if cached is not None:
+				return cached
+		return rows
+
+	def info(self):
+		return "query cache: {} hits, {} misses, {} plans, {} row sets".format(self.hits, self.misses, len(self.plans), len(self.rows))
@@ -0,0 +1,79 @@
+"""
+;===================================================================================================
+; Title:   Force-directed layout of the cytoscape node graph, computed on the server
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+Fruchterman-Reingold layout with numpy:
+	- every edge pulls its two nodes together (with a force distance^2 / k)
+	- every two nodes push each other away (with a force k^2 / distance)
+	- a weak pull to the center keeps the parts of the graph that are not connected to each other close together
+Every step, the nodes move in the direction of the sum of their forces, but at most 'temperature', which goes down to 0 at the last step.
+For large graphs the push between all pairs of nodes would take too long, so the nodes are then grouped in the cells of a grid,
+and every node is only pushed away by the centers of the cells (with the number of nodes in the cell as weight).
+
+"""
+import numpy as np
+
+
+# Graphs with at most this number of nodes are laid out with the push between all pairs of nodes, larger ones with a grid
+exact_nodes = 1000
+
+# Number of cells of the grid (for large graphs)
+grid_cells = 32 * 32
+
+# Number of nodes that are handled at once when computing the push (limits the memory that is used)
+chunk_size = 500
+
+
+# Returns the force that pushes every node away from the other nodes (numpy array, one row of x and y per node)
+def repulsion(positions, k):
+	if len(positions) <= exact_nodes:
+		centers, weights, softening = positions, np.ones(len(positions)), 1e-4 * k * k
+	else:
+		# centers of the nodes in every cell of the grid, and the number of nodes in the cell
+		side = int(np.sqrt(grid_cells))
+		low = positions.min(axis=0)
+		cell_size = (positions.max(axis=0) - low).max() / side + 1e-9
+		cells = np.minimum(((positions - low) / cell_size).astype(int), side - 1)
+		cell = cells[:, 0] * side + cells[:, 1]
+		weights = np.bincount(cell, minlength=side * side).astype(float)
+		used = np.flatnonzero(weights)
+		centers = np.stack([np.bincount(cell, positions[:, 0], side * side)[used], np.bincount(cell, positions[:, 1], side * side)[used]], axis=1)
+		weights = weights[used]
+		centers /= weights[:, None]
+		softening = (cell_size / 2) ** 2
+	force = np.zeros_like(positions)
+	for start in range(0, len(positions), chunk_size):
+		dx = positions[start:start + chunk_size, 0, None] - centers[None, :, 0]
+		dy = positions[start:start + chunk_size, 1, None] - centers[None, :, 1]
+		push = weights * (k * k) / (dx * dx + dy * dy + softening)
+		force[start:start + chunk_size, 0] = (dx * push).sum(axis=1)
+		force[start:start + chunk_size, 1] = (dy * push).sum(axis=1)
+	return force
+
+
+# Returns the positions (numpy array, one row of x and y per node) of num_nodes nodes with edges between sources[i] and targets[i] (node positions)
+# k: preferred length of an edge; the start positions are random (seed: start of the random numbers, so the layout is always the same)
+def force_layout(sources, targets, num_nodes, iterations=100, k=100.0, seed=0):
+	random = np.random.RandomState(seed)
+	positions = random.uniform(-1, 1, (num_nodes, 2)) * k * np.sqrt(num_nodes)
+	if num_nodes < 2:
+		return positions
+	temperature = k * np.sqrt(num_nodes) / 10
+	for iteration in range(iterations):
+		force = repulsion(positions, k)
+
+		# pull of the edges
+		delta = positions[sources] - positions[targets]
+		pull = delta * np.sqrt((delta ** 2).sum(axis=1))[:, None] / k
+		for axis in (0, 1):
+			force[:, axis] += np.bincount(targets, pull[:, axis], num_nodes) - np.bincount(sources, pull[:, axis], num_nodes)
+
+		# pull to the center
+		force -= positions * np.sqrt((positions ** 2).sum(axis=1))[:, None] / (k * num_nodes)
+
+		length = np.sqrt((force ** 2).sum(axis=1)) + 1e-9
+		step = temperature * (1 - iteration / iterations)
+		positions += force * (np.minimum(length, step) / length)[:, None]
+	return positions
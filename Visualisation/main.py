@@ -6,14 +6,28 @@
 
 
 """
+import json
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+import flask
 import dash	
-from dash.dependencies import Input, Output, State	 	# this line will give an error if there is a file called 'dash.py' in the project
+from dash.dependencies import Input, Output, State, ClientsideFunction	 	# this line will give an error if there is a file called 'dash.py' in the project
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_table
 import dash_cytoscape as cyto
+from dash.exceptions import PreventUpdate
+from filter_query import QueryCache			# Visualisation/filter_query.py
+from text_index import TextIndex			# Visualisation/text_index.py
+from adjacency import Adjacency			# Visualisation/adjacency.py
+from layout import force_layout			# Visualisation/layout.py
+from search_index import SearchIndex			# Visualisation/search_index.py
 
 
 #############################################################################################################
@@ -21,31 +35,87 @@ import dash_cytoscape as cyto
 #############################################################################################################
 																											#
 # Cut-off score for combined_score from string interactions													#
-NODE_CUTOFF_SCORE = 0.7			# Cut-off value for interactions between proteins							#
+NODE_CUTOFF_SCORE = 0.7			# Cut-off value at start (can be changed with the slider)					#
+MIN_CUTOFF_SCORE = 0.4			# Lowest value of the slider, weaker interactions are not loaded			#
+																											#
+# Format of the preprocessed files in Preprocessing/Output													#
+DATA_FORMAT = 'tsv'				# 'tsv' or 'parquet' (generated with --format parquet)						#
+																											#
+# Number of cytoscape graphs (lists of elements) that are kept in memory									#
+ELEMENT_CACHE_SIZE = 16			# least recently used graphs are removed first								#
+																											#
+# Number of filter queries of the tables (and the rows that match them) kept in memory						#
+FILTER_CACHE_SIZE = 64			# least recently used queries are removed first								#
+																											#
+# Focus mode: only the neighbourhood of the selected or searched protein is shown							#
+FOCUS_HOPS = 1					# Number of hops around the protein at start (can be expanded with a button)	#
+																											#
+# Overview: the proteins are grouped in meta-nodes, by KEGG pathway or by community							#
+OVERVIEW_GROUPS = 100			# Maximal number of meta-nodes (the smallest groups are combined in one)		#
+OVERVIEW_EDGES = 300			# Maximal number of edges between meta-nodes (the ones with most interactions)	#
+																											#
+# Search box																								#
+SEARCH_SUGGESTIONS = 10			# Number of proteins suggested while typing (best matches first)			#
+																											#
+# Folder in which the positions of the nodes of the 'precomputed' layout are kept (a folder per dataset)		#
+LAYOUT_CACHE_FOLDER = 'Preprocessing/Output/layouts'														#
+LAYOUT_CACHE_SIZE = 100			# Megabytes, the least recently used layouts are removed first				#
 																											#
 # Colors																									#
 neutral_color = '#6c6f74'		# grey																		#
 positive_color = '#7bb526'		# green																		#
 negative_color = '#f32c22'		# red																		#
 selected_edge_color = '#3c6975'	# blue-ish																	#
+highlight_color = '#ff851b'		# orange, border of the proteins of a pasted list							#
+searched_color = '#B10DC9'		# purple, proteins found with the search box								#
 																											#
 ##############################################################################################################
-colordict = {'positive': positive_color, 'negative': negative_color, 'similar': neutral_color}
+
+# Returns the color of a balance of log fold changes between -1 (all negative) and 1 (all positive): from negative_color over neutral_color to positive_color
+def balance_color(balance):
+	end = positive_color if balance > 0 else negative_color
+	mixed = [round((1 - abs(balance)) * int(neutral_color[i:i + 2], 16) + abs(balance) * int(end[i:i + 2], 16)) for i in (1, 3, 5)]
+	return '#{:02x}{:02x}{:02x}'.format(*mixed)
+
+
+# Reads a .parquet file from the preprocessing output (memory mapped), list columns (keggPathways, peptides) are returned as lists
+def read_parquet_output(name):
+	import pyarrow.parquet as pq
+	df = pq.read_table('Preprocessing/Output/{}.parquet'.format(name), memory_map=True).to_pandas()
+	if 'keggPathways' in df.columns:
+		df['keggPathways'] = [list(x) if len(x) else ['No pathways'] for x in df['keggPathways']]
+	if 'peptides' in df.columns:
+		df['peptides'] = [list(x) for x in df['peptides']]
+	return df
 
 
 # Read in the data
-nodeDf = pd.read_csv('Preprocessing/Output/nodeDf.tsv', delimiter='\t')
 prot_annot = pd.read_csv('Preprocessing/String_man/string_protein_annotations.tsv',sep='\t')
-kegg = pd.read_csv('Preprocessing/Output/pathways.tsv', sep='\t')
-acetylation = pd.read_csv('Preprocessing/Output/ackegg.tsv', sep='\t')
 
-# The number of acetylation sites is read as floats by python, so we change them back into integers
-acetylation['numAcSites'] = acetylation['numAcSites'].apply(lambda x: int(x))
+if DATA_FORMAT == 'parquet':
+	# The parquet files are already typed: numAcSites are integers and keggPathways are lists
+	nodeDf = read_parquet_output('nodeDf')
+	kegg = read_parquet_output('pathways')
+	acetylation = read_parquet_output('ackegg')
 
+	# The tables show the lists as text, in the same format as the .tsv files
+	acetylation['keggPathways'] = acetylation['keggPathways'].apply(lambda x: ' // '.join(x))
+	acetylation['peptides'] = acetylation['peptides'].apply(lambda x: ' // '.join("peptide {}: {}".format(i+1, pept) for i, pept in enumerate(x)))
+else:
+	nodeDf = pd.read_csv('Preprocessing/Output/nodeDf.tsv', delimiter='\t')
+	kegg = pd.read_csv('Preprocessing/Output/pathways.tsv', sep='\t')
+	acetylation = pd.read_csv('Preprocessing/Output/ackegg.tsv', sep='\t')
 
-# Splitting the different pathyways from the kegg file to make it more readable in the "selected node details" card in the application.
-# The resulting list will be used in the "displaySelectedNodeData" callback.
-kegg['keggPathways'] = kegg['keggPathways'].apply(lambda x: x.split(' // '))
+	# The number of acetylation sites is read as floats by python, so we change them back into integers
+	acetylation['numAcSites'] = acetylation['numAcSites'].apply(lambda x: int(x))
+
+	# Splitting the different pathyways from the kegg file to make it more readable in the "selected node details" card in the application.
+	# The resulting list will be used in the "displaySelectedNodeData" callback.
+	kegg['keggPathways'] = kegg['keggPathways'].apply(lambda x: x.split(' // '))
+
+# Identifies the loaded data (file and time it was written), part of the keys of the element cache
+nodeDf_file = 'Preprocessing/Output/nodeDf.{}'.format(DATA_FORMAT)
+dataset_id = '{}@{}'.format(nodeDf_file, os.path.getmtime(nodeDf_file))
 
 # Dictionaries are for retrieving protein (node) information in a O(1) manner, in order to minimize delays.
 protein_annotation = dict(zip(prot_annot['identifier'], prot_annot['annotation']))
@@ -55,75 +125,498 @@ acet_sites = dict(zip(acetylation['uniprotID'], acetylation['numAcSites']))
 logfc_anno = dict(zip(acetylation['uniprotID'], acetylation['protLogFC']))
 
 
-#Make a list of unique records
+#Make a set of unique records (a set, so checking if a protein has annotation data is O(1))
 unique_nodict = prot_anno
 for k, v in unique_nodict.copy().items():
 	if v == "annotation not available":
 		del unique_nodict[k]
-unique_keys = list(unique_nodict.keys())
+unique_keys = set(unique_nodict.keys())
+
 
+# remove all entries from dataframe that do not meet requirements for the interaction score (lowest value of the cut-off slider)
+nodeDf = nodeDf[nodeDf.combined_score >= MIN_CUTOFF_SCORE]
 
-# make nodes and edges
-nodes = set()
-cy_edges = []
-cy_nodes = []
 
+# logfc_anno string is a bit messy, so this function returns a short, more orderly string for the UniProt IDs of a whole column at once
+# something like: "negative !NaN in peptide(s)" will be returned as just "negative", proteins without logFC as "similar"
+# logFCString in Scripts/aggregate.py does the same for elements.json (tests/test_build_elements.py checks that they agree)
+def get_logFC_as_strings(uniprot_ids):
+	logfc = uniprot_ids.map(logfc_anno).astype(str)
+	return np.select([logfc.str.contains('positive'), logfc.str.contains('negative')], ['positive', 'negative'], 'similar')
 
-# remove all entries from dataframe that do not meet requirements for the interaction score
-nodeDf = nodeDf[nodeDf.combined_score >= NODE_CUTOFF_SCORE]
+# Turns a dataframe into cytoscape elements ({'data': {column: value}} per row), with None instead of NaN
+def to_elements(df):
+	return [{'data': row} for row in df.astype(object).where(df.notna(), None).to_dict('records')]
 
+# Makes the cytoscape elements (edges first, then nodes) for all interactions in df with a combined_score >= cutoff
+# annotated_only: only keep the proteins that have annotation data (unique_keys), and the interactions between them
+# Nodes are in the order in which they are first found in df (node1 before node2)
+def build_elements(df, annotated_only, cutoff):
+	df = df[df['combined_score'].to_numpy() >= cutoff]
+	source_logFC = get_logFC_as_strings(df['node1_uniprot'])
+	target_logFC = get_logFC_as_strings(df['node2_uniprot'])
 
-# logfc_anno string is a bit messy, so this function returns a short, more orderly string
-# something like: "negative !NaN in peptide(s)" will be returned as just "negative"
-def get_logFC_as_string(logfc_anno):
-	logfc = str(logfc_anno)
-	if 'positive' in logfc:
-		return 'positive'
-	if 'negative' in logfc:
-		return 'negative'
+	# boolean masks of the sources and targets that are shown
+	if annotated_only:
+		source_shown = df['node1'].isin(unique_keys).to_numpy()
+		target_shown = df['node2'].isin(unique_keys).to_numpy()
 	else:
-		return 'similar'
-
-for index, row in nodeDf.iterrows():
-	# source node annotation info
-	source = row['node1']
-	source_stringid = row['node1_string_id']
-	source_uniprot = row['node1_uniprot']
-	source_kegg = row['node1_kegg']
-	source_logFC = get_logFC_as_string(logfc_anno.get(source_uniprot))
-
-	# target node annotation info
-	target = row['node2']
-	target_stringid = row['node2_string_id']
-	target_uniprot = row['node2_uniprot']
-	target_kegg = row['node2_kegg']
-	target_logFC = get_logFC_as_string(logfc_anno.get(target_uniprot))
-
-	# edge annotation info
-	score = row['combined_score']
-	interaction = row['interaction']
-
-	# put information for current row of the dataframe into dictionaries
-	cy_source = {'data': {'id': source, 'label': source, 'stringid':source_stringid, 'UniprotID': source_uniprot, 'KEGG_ID': source_kegg, 'logFC': source_logFC}}
-	cy_target = {'data': {'id': target, 'label': target, 'stringid':target_stringid, 'UniprotID': target_uniprot, 'KEGG_ID': target_kegg, 'logFC': target_logFC}}
-	cy_edge = {'data': {'id': source+target, 'source': source, 'target': target, 'score': score, 'interaction': interaction, 'source_logFC': source_logFC, 'target_logFC': target_logFC}}
-
-	# Add nodes if not already in the set
-	if source not in nodes:
-		nodes.add(source)
-		cy_nodes.append(cy_source)	  # data: { [here comes that data contained for the node as a dictionary] }
-
-	if target not in nodes:
-		nodes.add(target)
-		cy_nodes.append(cy_target)
-	
-	# No need to filter on combine_score since entries with score below 0.7 were removed before this
-	cy_edges.append(cy_edge)
-
-
-# Store original dataframes in different variable, so that this can be called when removing filtering in tabular view
-nodeDf_orig = nodeDf
-acetylation_orig = acetylation
+		source_shown = target_shown = np.ones(len(df), dtype=bool)
+
+	edges = pd.DataFrame({'id': (df['node1'] + df['node2']).to_numpy(), 'source': df['node1'].to_numpy(), 'target': df['node2'].to_numpy(),
+						  'score': df['combined_score'].to_numpy(), 'interaction': df['interaction'].to_numpy(),
+						  'source_logFC': source_logFC, 'target_logFC': target_logFC})[source_shown & target_shown]
+
+	# sources and targets of all rows, sorted as: source of row 0, target of row 0, source of row 1, ...
+	ends = []
+	for end, logFC, shown in [('1', source_logFC, source_shown), ('2', target_logFC, target_shown)]:
+		ends.append(pd.DataFrame({'id': df['node' + end].to_numpy(), 'label': df['node' + end].to_numpy(),
+								  'stringid': df['node{}_string_id'.format(end)].to_numpy(), 'UniprotID': df['node{}_uniprot'.format(end)].to_numpy(),
+								  'KEGG_ID': df['node{}_kegg'.format(end)].to_numpy(), 'logFC': logFC,
+								  'row': np.arange(len(df)), 'end': int(end)})[shown])
+	cy_nodes = pd.concat(ends).sort_values(['row', 'end'], kind='mergesort').drop_duplicates('id').drop(columns=['row', 'end'])
+
+	return to_elements(edges) + to_elements(cy_nodes)
+
+# Reads the Cytoscape elements precomputed by aggregate.py (elements.json) for the given cut-off score
+# returns the elements (edges first, then nodes), or None when there is no elements.json or it was made without this cut-off
+def load_elements_bundle(cutoff):
+	try:
+		with open('Preprocessing/Output/elements.json') as f:
+			bundle = json.load(f)
+	except FileNotFoundError:
+		return None
+	counts = bundle['cutoffs'].get('{:g}'.format(cutoff))
+	if bundle.get('version') != 2 or counts is None:
+		return None
+	# edges are sorted by score and nodes by their first edge, so the elements of the cut-off are the first ones
+	return bundle['edges'][:counts['edges']] + bundle['nodes'][:counts['nodes']]
+
+# Index of the interactions in df, sorted from the highest to the lowest combined_score (same order as in elements.json)
+# The elements for any cut-off are then a slice: the first n edges, with n found by a binary search on the sorted scores,
+# and the nodes whose first (highest scoring) edge is one of these n edges
+class ScoreIndex:
+	def __init__(self, df):
+		df = df[df['combined_score'].notna()]
+		df = df.iloc[np.argsort(-df['combined_score'].to_numpy(), kind='stable')]
+		self.scores = df['combined_score'].to_numpy()
+		elements = build_elements(df, False, -np.inf)
+		self.edges, self.nodes = elements[:len(df)], elements[len(df):]
+
+		# position of the first edge of every node, increasing since nodes are in the order in which they are first found
+		rows = np.arange(len(df))
+		first_edge = pd.concat([pd.Series(rows, index=df['node1'].to_numpy()), pd.Series(rows, index=df['node2'].to_numpy())]).groupby(level=0).min()
+		self.node_first_edge = first_edge.loc[[node['data']['id'] for node in self.nodes]].to_numpy()
+
+		# positions of the edges and nodes that are kept when only annotated proteins are shown
+		self.annotated_edges = np.flatnonzero(df['node1'].isin(unique_keys).to_numpy() & df['node2'].isin(unique_keys).to_numpy())
+		self.annotated_nodes = np.flatnonzero([node['data']['id'] in unique_keys for node in self.nodes])
+
+		# adjacency index of the edges (see adjacency.py), with the positions in self.nodes of the source and target of every edge
+		self.node_ids = pd.Index([node['data']['id'] for node in self.nodes])
+		self.sources, self.targets = self.node_ids.get_indexer(df['node1']), self.node_ids.get_indexer(df['node2'])
+		self.adjacency = Adjacency(self.sources, self.targets, len(self.nodes))
+
+	# same elements as build_elements(df, annotated_only, cutoff), but with the edges sorted by score
+	def elements(self, annotated_only, cutoff):
+		num_edges = np.searchsorted(-self.scores, -cutoff, side='right')
+		num_nodes = np.searchsorted(self.node_first_edge, num_edges)
+		if not annotated_only:
+			return self.edges[:num_edges] + self.nodes[:num_nodes]
+		edges = self.annotated_edges[:np.searchsorted(self.annotated_edges, num_edges)]
+		nodes = self.annotated_nodes[:np.searchsorted(self.annotated_nodes, num_nodes)]
+		return [self.edges[i] for i in edges] + [self.nodes[i] for i in nodes]
+
+	# boolean masks (numpy arrays) of the edges and nodes that are in elements(annotated_only, cutoff)
+	def masks(self, annotated_only, cutoff):
+		num_edges = np.searchsorted(-self.scores, -cutoff, side='right')
+		num_nodes = np.searchsorted(self.node_first_edge, num_edges)
+		edge_mask = np.zeros(len(self.edges), dtype=bool)
+		node_mask = np.zeros(len(self.nodes), dtype=bool)
+		if annotated_only:
+			edge_mask[self.annotated_edges[:np.searchsorted(self.annotated_edges, num_edges)]] = True
+			node_mask[self.annotated_nodes[:np.searchsorted(self.annotated_nodes, num_nodes)]] = True
+		else:
+			edge_mask[:num_edges] = True
+			node_mask[:num_nodes] = True
+		return edge_mask, node_mask
+
+	# elements of the neighbourhood of hops around the proteins in centers (ids), in the graph of elements(annotated_only, cutoff)
+	# known: number of hops that is already shown, only the elements that are new are returned then (see Adjacency.ego)
+	def focus_elements(self, annotated_only, cutoff, centers, hops, known=-1):
+		edge_mask, node_mask = self.masks(annotated_only, cutoff)
+		centers = self.node_ids.get_indexer(centers)
+		centers = centers[centers >= 0]
+		centers = centers[node_mask[centers]]
+		nodes, edges = self.adjacency.ego(centers, hops, edge_mask, known)
+		return [self.edges[i] for i in edges] + [self.nodes[i] for i in nodes]
+
+# Least recently used cache for lists of cytoscape elements (or their score indexes), counting the cache hits and misses
+# The cache is shared by the callbacks of all sessions, which can run at the same time (in threads), so it is locked while it is used
+# name: name of the cache in info (see cache_info)
+class ElementCache:
+	def __init__(self, maxsize, name='element cache'):
+		self.maxsize = maxsize
+		self.name = name
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	# returns the cached elements, or None when they are not in the cache
+	def get(self, key):
+		with self.lock:
+			if key not in self.entries:
+				self.misses += 1
+				return None
+			self.hits += 1
+			self.entries.move_to_end(key)
+			return self.entries[key]
+
+	def put(self, key, elements):
+		with self.lock:
+			self.entries[key] = elements
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+
+	def info(self):
+		return "{}: {} hits, {} misses, {}/{} entries".format(self.name, self.hits, self.misses, len(self.entries), self.maxsize)
+
+element_cache = ElementCache(ELEMENT_CACHE_SIZE)
+index_cache = ElementCache(ELEMENT_CACHE_SIZE, 'score index cache')
+overview_cache = ElementCache(ELEMENT_CACHE_SIZE, 'overview cache')
+layout_cache = ElementCache(ELEMENT_CACHE_SIZE, 'layout cache')
+
+# Identifies the rows of a (filtered and sorted) dataframe of the loaded data: hash of its index
+def rows_key(df):
+	return hashlib.sha1(np.ascontiguousarray(df.index.to_numpy()).tobytes()).hexdigest()
+
+# Key of the elements made from df: the dataset, annotated_only, the cut-off and the rows that are left after filtering the tables (in their order)
+def element_key(df, annotated_only, cutoff):
+	return (dataset_id, annotated_only, cutoff, rows_key(df))
+
+# Returns the score index of df, from the cache when it was made before
+def get_score_index(df):
+	index_key = element_key(df, None, None)
+	score_index = index_cache.get(index_key)
+	if score_index is None:
+		score_index = ScoreIndex(df)
+		index_cache.put(index_key, score_index)
+	return score_index
+
+# Returns the elements for df (edges sorted by score), from the cache when the same graph was made before
+# Other cut-offs of the same df only need a slice of its score index, which is cached as well
+# The returned list is shared between callbacks, so it should not be changed
+def get_elements(df, annotated_only, cutoff):
+	key = element_key(df, annotated_only, cutoff)
+	elements = element_cache.get(key)
+	if elements is None:
+		elements = get_score_index(df).elements(annotated_only, cutoff)
+		element_cache.put(key, elements)
+	return elements
+
+# Overview of the graph of a score index (for annotated_only and cutoff), with the proteins grouped in meta-nodes
+# grouping 'community': every protein is in its community (see Adjacency.communities, with the combined score as weight of the edges)
+# grouping 'kegg': every protein is in the largest of its KEGG pathways (protein_pathways), proteins without pathway are in their community
+# Only the OVERVIEW_GROUPS - 1 largest groups get their own meta-node, the proteins of the smaller groups are in one meta-node 'Other proteins'
+# The color of a meta-node shows the balance of the log fold changes of its proteins (see balance_color)
+class Overview:
+	def __init__(self, score_index, annotated_only, cutoff, grouping):
+		self.score_index = score_index
+		edge_mask, node_mask = score_index.masks(annotated_only, cutoff)
+		nodes = np.flatnonzero(node_mask)
+
+		# communities, named after their size (Community 1 is the largest)
+		communities = pd.Series(score_index.adjacency.communities(edge_mask, score_index.scores)[nodes], index=nodes)
+		sizes = communities.value_counts()
+		names = pd.Series(['Community {}'.format(i + 1) for i in range(len(sizes))], index=sizes.index)
+		groups = communities.map(names)
+		if grouping == 'kegg':
+			pathways = pd.Series([protein_pathways.get(score_index.nodes[i]['data']['UniprotID'], []) for i in nodes], index=nodes).explode().dropna()
+			pathways = pathways.iloc[np.argsort(-pathways.map(pathways.value_counts()).to_numpy(), kind='stable')]
+			pathways = pathways[~pathways.index.duplicated()]
+			groups.loc[pathways.index] = pathways.to_numpy()
+		sizes = groups.value_counts()
+		if len(sizes) > OVERVIEW_GROUPS:
+			groups[~groups.isin(sizes.index[:OVERVIEW_GROUPS - 1])] = 'Other proteins'
+
+		# group of every node (position in self.names), -1 for nodes that are not in the graph
+		codes, self.names = pd.factorize(groups)
+		self.group_of = np.full(len(score_index.nodes), -1)
+		self.group_of[nodes] = codes
+		self.group_ids = {'group:' + name: code for code, name in enumerate(self.names)}
+		self.largest = np.bincount(codes).max() if len(codes) else 1
+
+		# edges of the graph
+		self.edge_positions = np.flatnonzero(edge_mask)
+		self.sources = score_index.sources[self.edge_positions]
+		self.targets = score_index.targets[self.edge_positions]
+		self.scores = score_index.scores[self.edge_positions]
+
+		# rank of every node in its group, from the most to the least interactions, and its log fold change
+		degrees = np.bincount(np.concatenate([self.sources, self.targets]), minlength=len(score_index.nodes))
+		order = np.lexsort((-degrees[nodes], codes))
+		self.rank = np.zeros(len(score_index.nodes), dtype=int)
+		self.rank[nodes[order]] = np.arange(len(nodes)) - np.searchsorted(codes[order], codes[order])
+		logFC = np.array([node['data']['logFC'] for node in score_index.nodes])
+		self.positive, self.negative = logFC == 'positive', logFC == 'negative'
+
+	# Returns the meta-node of a group, for its proteins that are not shown (hidden: boolean mask of the nodes)
+	def meta_node(self, code, hidden):
+		members, positive, negative = hidden.sum(), (hidden & self.positive).sum(), (hidden & self.negative).sum()
+		balance = (positive - negative) / members
+		return {'data': {'id': 'group:' + self.names[code], 'group': self.names[code], 'members': int(members),
+						 'positive': int(positive), 'negative': int(negative),
+						 'logFC': 'positive' if balance > 1 / 3 else 'negative' if balance < -1 / 3 else 'similar',
+						 'color': balance_color(balance), 'size': round(20 + 60 * np.sqrt(members / self.largest), 1)}}
+
+	# Returns the elements of the overview, with the meta-nodes that were clicked (expanded: list of their ids 'group:...') expanded
+	# Every click on a meta-node shows OVERVIEW_GROUPS more of its proteins (the ones with the most interactions first), instead of all of them,
+	# so the graph stays small; the proteins that are not shown yet stay in the meta-node
+	# The interactions between proteins that are shown are shown as they are, the other ones are combined into one edge per pair
+	# of meta-nodes (or meta-node and protein), of which only the OVERVIEW_EDGES with the most interactions are shown
+	def elements(self, expanded):
+		num_groups = len(self.names)
+		shown_per_group = np.zeros(num_groups, dtype=int)
+		for group in expanded:
+			if group in self.group_ids:
+				shown_per_group[self.group_ids[group]] += OVERVIEW_GROUPS
+		in_graph = self.group_of >= 0
+		shown = in_graph & (self.rank < shown_per_group[self.group_of])
+		shown_nodes = np.flatnonzero(shown)
+
+		# every node is shown as its meta-node (0 ... num_groups - 1), or as itself (num_groups + its position)
+		shown_as = self.group_of.copy()
+		shown_as[shown_nodes] = num_groups + shown_nodes
+		sources, targets = shown_as[self.sources], shown_as[self.targets]
+		between_proteins = (sources >= num_groups) & (targets >= num_groups)
+		edges = [self.score_index.edges[i] for i in self.edge_positions[between_proteins]]
+
+		meta_nodes = {code: self.meta_node(code, in_graph & ~shown & (self.group_of == code)) for code in np.unique(self.group_of[in_graph & ~shown])}
+		shown_data = lambda i: meta_nodes[i]['data'] if i < num_groups else self.score_index.nodes[i - num_groups]['data']
+		combined = pd.DataFrame({'a': np.minimum(sources, targets), 'b': np.maximum(sources, targets), 'score': self.scores})
+		combined = combined[~between_proteins & (sources != targets)].groupby(['a', 'b'])['score'].agg(['size', 'max'])
+		combined = combined.sort_values('size', ascending=False, kind='mergesort').head(OVERVIEW_EDGES)
+		for (a, b), size, score in zip(combined.index, combined['size'], combined['max']):
+			source, target = shown_data(a), shown_data(b)
+			edges.append({'data': {'id': source['id'] + '|' + target['id'], 'source': source['id'], 'target': target['id'],
+								   'members': int(size), 'score': float(score), 'interaction': '{} interactions'.format(size),
+								   'source_logFC': source['logFC'], 'target_logFC': target['logFC'],
+								   'width': round(1 + 7 * size / combined['size'].max(), 1)}})
+
+		return edges + list(meta_nodes.values()) + [self.score_index.nodes[i] for i in shown_nodes]
+
+# Returns the file of the layout with key (see get_layout), in the folder of the dataset in LAYOUT_CACHE_FOLDER
+def layout_file(key):
+	return os.path.join(LAYOUT_CACHE_FOLDER, hashlib.sha1(dataset_id.encode()).hexdigest()[:16], 'force-{}.json'.format(key))
+
+# Removes the least recently used layout files (the oldest modification time, see get_layout) until the files in LAYOUT_CACHE_FOLDER
+# take at most LAYOUT_CACHE_SIZE megabytes, and the folders of datasets that have no layouts left
+# Files that are removed by another process at the same time are skipped
+def prune_layout_files():
+	files = []
+	for folder, _, names in os.walk(LAYOUT_CACHE_FOLDER):
+		for name in names:
+			if name.endswith('.json'):	# not the files that are still being written ('.json.<pid>')
+				try:
+					stat = os.stat(os.path.join(folder, name))
+				except OSError:
+					continue
+				files.append((stat.st_mtime, stat.st_size, os.path.join(folder, name)))
+	total = sum(size for _, size, _ in files)
+	for _, size, file in sorted(files):
+		if total <= LAYOUT_CACHE_SIZE * 1e6:
+			break
+		try:
+			os.remove(file)
+		except OSError:
+			pass
+		total -= size
+	for folder in os.listdir(LAYOUT_CACHE_FOLDER):
+		if os.path.isdir(os.path.join(LAYOUT_CACHE_FOLDER, folder)) and not os.listdir(os.path.join(LAYOUT_CACHE_FOLDER, folder)):
+			try:
+				os.rmdir(os.path.join(LAYOUT_CACHE_FOLDER, folder))
+			except OSError:
+				pass
+
+# Returns the positions of all nodes of the score index of df for the 'precomputed' layout ({id: {'x': ..., 'y': ...}}), see force_layout in layout.py
+# The layout is computed once for all interactions of df, so every cut-off, the annotated proteins and the neighbourhoods of focus mode
+# only take the positions of their nodes from it (see get_positions), and the nodes keep their place when the slider is moved
+# The nodes (and edges) are laid out in the order of their ids, so the layout does not change with the sorting of the tables
+# The positions are kept in memory (layout_cache) and in a file in the folder of the dataset (see layout_file), with a hash of the rows of df as key,
+# so a layout is only computed once per dataset and filters of the tables, also when the app is started again (or by another worker process of the server)
+# A file that is read is touched, so the least recently used ones are removed first when the folder gets too large (see prune_layout_files)
+def get_layout(df):
+	key = hashlib.sha1(np.sort(df.index.to_numpy()).tobytes()).hexdigest()
+	positions = layout_cache.get((dataset_id, key))
+	if positions is not None:
+		return positions
+	file = layout_file(key)
+	try:
+		with open(file) as f:
+			positions = json.load(f)
+		os.utime(file)
+	except (OSError, ValueError):
+		score_index = get_score_index(df)
+		order = np.argsort(score_index.node_ids.to_numpy())
+		rank = np.empty(len(order), dtype=int)
+		rank[order] = np.arange(len(order))
+		sources, targets = rank[score_index.sources], rank[score_index.targets]
+		edge_order = np.lexsort((targets, sources))
+		xy = force_layout(sources[edge_order], targets[edge_order], len(order))
+		positions = {node: {'x': round(x, 1), 'y': round(y, 1)} for node, (x, y) in zip(score_index.node_ids[order], xy.tolist())}
+		# written to another file first, so other processes never read a file that is only partly written
+		os.makedirs(os.path.dirname(file), exist_ok=True)
+		with open('{}.{}'.format(file, os.getpid()), 'w') as f:
+			json.dump(positions, f)
+		os.replace('{}.{}'.format(file, os.getpid()), file)
+		prune_layout_files()
+	layout_cache.put((dataset_id, key), positions)
+	return positions
+
+# Returns the positions of the nodes of elements (made from df) for the 'preset' layout of cytoscape ({id: {'x': ..., 'y': ...}})
+# The proteins take their place in the layout of all interactions of df (see get_layout)
+# The meta-nodes of an overview are not in that layout, so an overview (a small graph) is laid out by itself, and only kept in memory
+def get_positions(df, elements):
+	node_ids = [element['data']['id'] for element in elements if 'source' not in element['data']]
+	if not any('members' in element['data'] for element in elements):
+		layout = get_layout(df)
+		return {node: layout[node] for node in node_ids}
+	edges = [(element['data']['source'], element['data']['target']) for element in elements if 'source' in element['data']]
+	key = hashlib.sha1(json.dumps([sorted(node_ids), sorted(edges)]).encode()).hexdigest()
+	positions = layout_cache.get(key)
+	if positions is None:
+		index = pd.Index(node_ids)
+		sources, targets = zip(*edges) if edges else ((), ())
+		xy = force_layout(index.get_indexer(sources), index.get_indexer(targets), len(node_ids))
+		positions = {node: {'x': round(x, 1), 'y': round(y, 1)} for node, (x, y) in zip(node_ids, xy.tolist())}
+		layout_cache.put(key, positions)
+	return positions
+
+# Returns the overview of the graph of df (see Overview), from the cache when it was made before, so the groups are only found once per graph
+def get_overview(df, annotated_only, cutoff, grouping):
+	key = element_key(df, annotated_only, cutoff) + (grouping,)
+	overview = overview_cache.get(key)
+	if overview is None:
+		overview = Overview(get_score_index(df), annotated_only, cutoff, grouping)
+		overview_cache.put(key, overview)
+	return overview
+
+# Elements of the cytoscape graph: the precomputed ones from elements.json, or made from nodeDf when there are none for this cut-off
+cy_elements = load_elements_bundle(NODE_CUTOFF_SCORE)
+if cy_elements is None:
+	cy_elements = get_elements(nodeDf, False, NODE_CUTOFF_SCORE)
+else:
+	element_cache.put(element_key(nodeDf, False, NODE_CUTOFF_SCORE), cy_elements)
+nodes = set(element['data']['id'] for element in cy_elements if 'source' not in element['data'])
+
+# Search index of all proteins of the interactions (see search_index.py): their gene name (id of the node), UniProt, STRING and KEGG ID
+# and annotation, used by the search box (and its suggestions) to find the searched protein
+search_keys = pd.concat([nodeDf[['node' + end + column, 'node' + end]].set_axis(['key', 'id'], axis=1).assign(kind=kind)
+						 for end in ('1', '2')
+						 for column, kind in (('', 'gene name'), ('_uniprot', 'UniProt ID'), ('_string_id', 'STRING ID'), ('_kegg', 'KEGG ID'))])
+search_proteins = set(search_keys['id'].dropna())
+search_index = SearchIndex(search_keys, {node: annotation for node, annotation in unique_nodict.items() if node in search_proteins})
+
+# Returns the proteins (node ids) of a pasted list of gene names and IDs (text, separated by new lines, commas, semicolons, tabs or spaces),
+# the IDs of proteins without interactions (in the acetylation data or the annotations, but not in the graph) and the IDs that are not known at all
+def resolve_proteins(text):
+	tokens = list(dict.fromkeys(token for token in re.split(r'[\s,;]+', text) if token))
+	proteins, not_in_graph, unknown = [], [], []
+	for token, found in zip(tokens, search_index.exact(tokens)):
+		if found:
+			proteins.extend(found)
+		elif any(key in lookup for key in (token, token.upper()) for lookup in (acet_sites, logfc_anno, protein_annotation)):
+			not_in_graph.append(token)
+		else:
+			unknown.append(token)
+	return list(dict.fromkeys(proteins)), not_in_graph, unknown
+
+# KEGG pathways of the acetylated proteins (keggPathways of the acetylation data), with the UniProt ID as key, to group the proteins in the overview
+protein_pathways = {uniprot: [pathway for pathway in pathways.split(' // ') if pathway != 'No pathways']
+					for uniprot, pathways in zip(acetylation['uniprotID'], acetylation['keggPathways']) if isinstance(pathways, str)}
+
+
+# nodeDf and acetylation are not changed after this point: they are shared by all sessions (users, browser tabs)
+# The filters and sorting of the tables are kept per session, in the browser (dcc.Store 'filter_state'), and only select rows of them
+
+# nodeDf with the combined score rounded as in the interaction table, so the filters of the table use the numbers the user sees
+nodeDf_table = nodeDf.round({'combined_score': 3})
+
+# Indexes of the text columns of the tables, for the 'contains' filters (see text_index.py)
+interaction_text_indexes = {'interaction': TextIndex(nodeDf['interaction'], ', ')}
+acetylation_text_indexes = {'keggPathways': TextIndex(acetylation['keggPathways'], ' // '),
+							'peptides': TextIndex(acetylation['peptides'], ' // ')}
+
+# Parsed filter queries of the tables, and the rows that match them (see filter_query.py)
+query_cache = QueryCache(FILTER_CACHE_SIZE)
+
+# Rows of both tables for the filters and sorting of a session (see get_filtered_rows), shared by all sessions
+rows_cache = ElementCache(FILTER_CACHE_SIZE, 'rows cache')
+
+# Returns the hits, misses and sizes of all caches of this process (one line per cache), see the '/cache-info' page in create_app
+def cache_info():
+	caches = [element_cache, index_cache, overview_cache, layout_cache, rows_cache, query_cache]
+	return '\n'.join(cache.info() for cache in caches)
+
+# Filters and sorting of the tables of a session when nothing is filtered
+# every table has a filter (filter_query of the DataTable) and a sort_by (list of {'column_id': ..., 'direction': 'asc' or 'desc'})
+no_filters = {'interaction': {'filter': '', 'sort_by': []}, 'acetylation': {'filter': '', 'sort_by': []}}
+
+# Key of the filter and sorting of one table
+def table_key(table_filter):
+	return (table_filter['filter'] or '', tuple((col['column_id'], col['direction']) for col in table_filter['sort_by'] or []))
+
+# Returns the positions of the rows of df (numpy array) sorted as in sort_by
+def sort_rows(df, rows, sort_by):
+	if not sort_by:
+		return rows
+	order = df.iloc[rows].reset_index(drop=True).sort_values(
+		[col['column_id'] for col in sort_by],
+		ascending=[
+			col['direction'] == 'asc'
+			for col in sort_by
+		]
+	).index.to_numpy()
+	return rows[order]
+
+# Returns the positions of the rows of nodeDf and of acetylation that are left after the filters of a session, sorted as in the session
+# Only the interactions with a combined score of at least cutoff are kept (the cut-off of the slider for the tables, all loaded interactions for the graph)
+# The tables are linked: when the acetylation table is filtered, only the interactions of its proteins are kept,
+# and when the interaction table is filtered, only the proteins of its interactions are kept
+# Raises a ValueError when a filter query can not be used (see filter_query.py)
+# The returned arrays are shared between sessions, so they should not be changed
+def get_filtered_rows(filter_state, cutoff=MIN_CUTOFF_SCORE):
+	interaction_filter, acetylation_filter = filter_state['interaction'], filter_state['acetylation']
+	key = (dataset_id, table_key(interaction_filter), table_key(acetylation_filter), cutoff)
+	rows = rows_cache.get(key)
+	if rows is None:
+		interaction_rows = query_cache.filter_rows(nodeDf_table, interaction_filter['filter'], ('interaction', dataset_id), interaction_text_indexes)
+		if cutoff > MIN_CUTOFF_SCORE:
+			interaction_rows = interaction_rows[nodeDf['combined_score'].to_numpy()[interaction_rows] >= cutoff]
+		acetylation_rows = query_cache.filter_rows(acetylation, acetylation_filter['filter'], ('acetylation', dataset_id), acetylation_text_indexes)
+		if acetylation_filter['filter']:
+			proteins = acetylation['uniprotID'].to_numpy()[acetylation_rows]
+			interaction_rows = interaction_rows[(nodeDf['node1_uniprot'].iloc[interaction_rows].isin(proteins) |
+												nodeDf['node2_uniprot'].iloc[interaction_rows].isin(proteins)).to_numpy()]
+		if interaction_filter['filter']:
+			proteins = np.concatenate([nodeDf['node1_uniprot'].to_numpy()[interaction_rows], nodeDf['node2_uniprot'].to_numpy()[interaction_rows]])
+			acetylation_rows = acetylation_rows[acetylation['uniprotID'].iloc[acetylation_rows].isin(proteins).to_numpy()]
+		rows = (sort_rows(nodeDf_table, interaction_rows, interaction_filter['sort_by']),
+				sort_rows(acetylation, acetylation_rows, acetylation_filter['sort_by']))
+		rows_cache.put(key, rows)
+	return rows
+
+# Filters of the tables of a session that change the cytoscape graph (the sorting does not)
+def graph_filters(filter_state):
+	return [filter_state['interaction']['filter'] or '', filter_state['acetylation']['filter'] or '']
+
+# Returns the (filtered and sorted) interactions of a session, to make the cytoscape graph (for all cut-offs of the slider)
+def get_session_nodeDf(filter_state):
+	if filter_state == no_filters:
+		return nodeDf
+	return nodeDf.iloc[get_filtered_rows(filter_state)[0]]
 
 # Default variable declared for label
 label = 'data(label)'
@@ -157,15 +650,90 @@ default_stylesheet  = [
 			'background-color': negative_color,
 		}
 	},
+	{
+		'selector': 'node[members]',			# meta-nodes of the overview (see Overview), colored by the balance of the log fold changes of their proteins
+		'style': {
+			'label': 'data(group)',
+			'background-color': 'data(color)',
+			'width': 'data(size)',
+			'height': 'data(size)'
+		}
+	},
+	{
+		'selector': 'node.highlighted',			# proteins of a pasted list (see highlight_proteins), with a thick border
+		'style': {
+			'border-color': highlight_color,
+			'border-width': 4,
+			'border-opacity': 1
+		}
+	},
 	{
 		'selector': 'edge',						# for the edges
 		'style': {
 			'line-color': '#C5D3E2',			# very ligth blue
 			'curve-style': 'haystack'
 		}
+	},
+	{
+		'selector': 'edge[members]',			# edges between meta-nodes, wider when they combine more interactions
+		'style': {
+			'width': 'data(width)'
+		}
+	}
+]
+
+# Style of the selected (clicked) protein, its interaction partners and its interactions, and of the proteins found with the search box
+# The nodes and edges get the classes 'selected', 'neighbour' and 'searched' in the browser (see show_graph in assets/clientside.js),
+# and these rules come after the rules that make all other nodes and edges fade (see generate_stylesheet)
+selection_stylesheet = [
+	{
+		'selector': 'node.selected, node.searched',
+		'style': {
+			'border-color': 'purple',
+			'border-width': 2,
+			'border-opacity': 1,
+			'opacity': 1,
+			'label': label,
+			'text-opacity': 1,
+			'z-index': 9999						# the bigger the Z-index, the more priority it has to be in front of other nodes/labels
+		}
+	},
+	{
+		'selector': 'node.searched',
+		'style': {
+			'background-color': searched_color
+		}
+	},
+	{
+		'selector': 'node.neighbour',			# interaction partners of the selected protein, with the color of their log fold change
+		'style': {
+			'opacity': 1,
+			'label': label,
+			'text-opacity': 1,
+			'z-index': 9999
+		}
+	},
+	{
+		'selector': 'edge.neighbour',			# interactions of the selected protein
+		'style': {
+			'text-rotation': 'autorotate',
+			'line-color': selected_edge_color,
+			'opacity': 1,
+			'z-index': 5000
+		}
 	}
 ]
 
+# Labels of the nodes for the options of the node labels dropdown
+node_labels = {'pref_name': 'data(label)', 'StringDB': 'data(stringid)', 'Uniprot': 'data(UniprotID)', 'KEGG ID': 'data(KEGG_ID)'}
+
+# Stylesheet, colors and labels used by the clientside callbacks of the cytoscape graph (see assets/clientside.js), kept in the 'graph_style' store
+graph_style = {
+	'default_stylesheet': default_stylesheet,
+	'selection_stylesheet': selection_stylesheet,
+	'labels': node_labels
+}
+
 # Necessary to get more cytoscape layouts
 cyto.load_extra_layouts()
 
@@ -208,7 +776,9 @@ node_graph_layout = dbc.Row(
 						{'label': 'dagre',
 						'value': 'dagre'},
 						{'label': 'klay',
-						'value': 'klay'}
+						'value': 'klay'},
+						{'label': 'force-directed (precomputed)',
+						'value': 'precomputed'}
 					], value='grid'
 				),
 
@@ -246,7 +816,7 @@ node_graph = dbc.Row(
 			html.Div(children=[
 				cyto.Cytoscape(
 					id='cytoscape-protein',
-					elements = cy_edges + cy_nodes,
+					elements = cy_elements,
 					style = {
 						'width': '100%',				# Take up 100% of the width of the space it has been assigned
 						'height': '87vh'				# 87vh = 87% of the total screen height
@@ -259,121 +829,129 @@ node_graph = dbc.Row(
 	]
 )
 
+# Number of rows on one page of the tables, only this page is sent to the browser
+TABLE_PAGE_SIZE = 25
+
+# Returns the rows of one page of a (filtered and sorted) dataframe as records, and the number of pages
+def get_table_page(dff, page_current, page_size):
+	page_count = max(1, -(-len(dff) // page_size))
+	page_current = min(page_current or 0, page_count - 1)
+	page = dff.iloc[page_current * page_size:(page_current + 1) * page_size]
+	return page.round({'combined_score': 3}).to_dict('records'), page_count
+
+# Text under the interaction table: the number of interactions that are shown
+def interaction_count(dff, cutoff):
+	return "{} interactions with a score of at least {:g}".format(len(dff), cutoff)
+
 # columns to display in interaction table
 interaction_table_columns = ['node1', 'node1_uniprot','node1_kegg', 'node2', 'node2_uniprot', 'node2_kegg', 'interaction', 'combined_score']
 
-interaction_table =  dbc.FormGroup([
-	# Putting button on top, as sometimes you can't press this if it's at the bottom, and the table is very long
-	dbc.Button(
-		id='all_button',
-		n_clicks=0,
-		children='Show all proteins',
-		color='info',
-		block=True
-	),
-	html.Br(),
+# Interaction table, with the filter and sorting of a session (filter_state), so they are kept when the page is changed,
+# and the interactions with a combined score of at least the cut-off of the slider
+def make_interaction_table(filter_state, cutoff=NODE_CUTOFF_SCORE):
+	table_filter = filter_state['interaction']
+	dff = nodeDf_table.iloc[get_filtered_rows(filter_state, cutoff)[0]]
+	return dbc.FormGroup([
+		# Putting button on top, as sometimes you can't press this if it's at the bottom, and the table is very long
+		dbc.Button(
+			id='all_button',
+			n_clicks=0,
+			children='Show all proteins',
+			color='info',
+			block=True
+		),
+		html.Br(),
 			
-	dash_table.DataTable(
-		id='interaction_table',
-		columns=[{'name': i, 'id': i, 'deletable': False} for i in interaction_table_columns],
-		data = nodeDf.to_dict('records'),
-		page_size = 25,					# 25 rows
-		filter_action='native',
-		filter_query='',
-		sort_action='native',
-		sort_mode='multi',
-		sort_by=[],
-		style_cell={'textAlign': 'left', 'maxWidth': '350px', 'whiteSpace': 'normal'},
-		style_cell_conditional=(
-		[
-			{
-				'if': {'column_id': c},
-				'backgroundColor': '#ffffe5'
-			} for c in ['node1', 'node1_uniprot','node1_kegg']
-		]+
-		[
-			{
-				'if': {'column_id': c},
-				'backgroundColor': '#ffffcc'
-			} for c in ['node2', 'node2_uniprot','node2_kegg']
+		dash_table.DataTable(
+			id='interaction_table',
+			columns=[{'name': i, 'id': i, 'deletable': False} for i in interaction_table_columns],
+			# Only the current page is sent to the browser, filtering, sorting and paging is done in update_interaction_table
+			data = get_table_page(dff, 0, TABLE_PAGE_SIZE)[0],
+			page_current=0,
+			page_size = TABLE_PAGE_SIZE,	# 25 rows
+			page_count=get_table_page(dff, 0, TABLE_PAGE_SIZE)[1],
+			page_action='custom',
+			filter_action='custom',
+			filter_query=table_filter['filter'],
+			sort_action='custom',
+			sort_mode='multi',
+			sort_by=table_filter['sort_by'],
+			style_cell={'textAlign': 'left', 'maxWidth': '350px', 'whiteSpace': 'normal'},
+			style_cell_conditional=(
+			[
+				{
+					'if': {'column_id': c},
+					'backgroundColor': '#ffffe5'
+				} for c in ['node1', 'node1_uniprot','node1_kegg']
+			]+
+			[
+				{
+					'if': {'column_id': c},
+					'backgroundColor': '#ffffcc'
+				} for c in ['node2', 'node2_uniprot','node2_kegg']
 			
-		]+
-		[
-			{
-				'if': {'column_id': 'combined_score'},
-				'textAlign': 'right',
-			}
-		]),
-	),
-])
+			]+
+			[
+				{
+					'if': {'column_id': 'combined_score'},
+					'textAlign': 'right',
+				}
+			]),
+		),
+		html.Main(interaction_count(dff, cutoff), id='interaction_table_count'),
+	])
+
+interaction_table = make_interaction_table(no_filters)
 
 # columns to display in acetylation table
 acetylation_table_columns = ['geneName', 'uniprotID','numAcSites', 'peptides', 'protLogFC', 'keggPathways']
 
-acetylation_table =  dbc.FormGroup([
-	dbc.Button(
-		id='all_button2',
-		n_clicks=0,
-		children='Show all proteins',
-		color='info',
-		block=True
-	),
-	html.Br(),
+# Acetylation table, with the filter and sorting of a session (filter_state), so they are kept when the page is changed
+# (when the interaction table is filtered, the proteins of its interactions with a combined score of at least the cut-off of the slider)
+def make_acetylation_table(filter_state, cutoff=NODE_CUTOFF_SCORE):
+	table_filter = filter_state['acetylation']
+	dff = acetylation.iloc[get_filtered_rows(filter_state, cutoff)[1]]
+	return dbc.FormGroup([
+		dbc.Button(
+			id='all_button2',
+			n_clicks=0,
+			children='Show all proteins',
+			color='info',
+			block=True
+		),
+		html.Br(),
 			
-	dash_table.DataTable(
-		id='acetylation_table',
-		columns=[{'name': i, 'id': i, 'deletable': False} for i in acetylation_table_columns],
+		dash_table.DataTable(
+			id='acetylation_table',
+			columns=[{'name': i, 'id': i, 'deletable': False} for i in acetylation_table_columns],
 		
-		#tooltip_header={i: i for i in acetylation_table_columns}
-		# TODO: Column tooltips for extra information??
-
-		data = acetylation.to_dict('records'),
-		page_size = 25,
-		filter_action='native',
-		filter_query='',
-		sort_action='native',
-		sort_mode='multi',
-		sort_by=[],
-		style_cell={'textAlign': 'left', 'maxWidth': '350px', 'whiteSpace': 'normal'},
-		style_cell_conditional=(
-		[
-			{
-				'if': {'column_id': 'numAcSites'},
-				'textAlign': 'center',
-			}
-		])
-	),
-	
-])
-
-# Operators for filtering data from DataTables
-operators = [['ge ', '>='],
-			 ['le ', '<='],
-			 ['lt ', '<'],
-			 ['gt ', '>'],
-			 ['ne ', '!='],
-			 ['eq ', '='],
-			 ['contains ']]
-
-# Used in callback for filtering DataTables
-# returns column name where filter was applied, the operator used, and the filtervalue itself
-def split_filter_part(filter_part):
-	for operator_type in operators:
-		for operator in operator_type:
-			if operator in filter_part:
-				name_part, value_part = filter_part.split(operator, 1)
-				name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
-				value_part = value_part.strip()
-				v0 = value_part[0]
-				if (v0 == value_part[-1] and v0 in ("'", '"', '`')):
-					value = value_part[1: -1].replace('\\' + v0, v0)
-				else:
-					try:
-						value = float(value_part)
-					except ValueError:
-						value = value_part
-				return name, operator_type[0].strip(), value
-	return [None] * 3
+			#tooltip_header={i: i for i in acetylation_table_columns}
+			# TODO: Column tooltips for extra information??
+
+			# Only the current page is sent to the browser, filtering, sorting and paging is done in update_acetylation_table
+			data = get_table_page(dff, 0, TABLE_PAGE_SIZE)[0],
+			page_current=0,
+			page_size = TABLE_PAGE_SIZE,
+			page_count=get_table_page(dff, 0, TABLE_PAGE_SIZE)[1],
+			page_action='custom',
+			filter_action='custom',
+			filter_query=table_filter['filter'],
+			sort_action='custom',
+			sort_mode='multi',
+			sort_by=table_filter['sort_by'],
+			style_cell={'textAlign': 'left', 'maxWidth': '350px', 'whiteSpace': 'normal'},
+			style_cell_conditional=(
+			[
+				{
+					'if': {'column_id': 'numAcSites'},
+					'textAlign': 'center',
+				}
+			])
+		),
+		html.Main("{} proteins".format(len(dff)), id='acetylation_table_count'),
+	])
+
+acetylation_table = make_acetylation_table(no_filters)
 
 # Middle window contains cytoscape graph and tables
 middle_window = html.Div(
@@ -433,13 +1011,27 @@ controls = dbc.FormGroup(
 
 		# search function input bar and button
 		html.Div('Search a protein:'),
+		# gene name, UniProt, STRING or KEGG ID, or a part of it, or a word of the annotation (suggestions are shown while typing)
 		dcc.Input(
 			id='searchvalue',
 			type='search',
 			placeholder='Search protein',
+			list='search_suggestions',
 			style={'maxWidth':'50%'}
 		),
+		html.Datalist(id='search_suggestions'),
 		html.Button(id='searchbutton', n_clicks=0, children='Search'),
+		html.Br(),
+
+		# list of gene names or IDs (e.g. the hits of another experiment) of which the proteins are highlighted, see highlight_proteins
+		html.Div('Highlight a list of proteins:'),
+		dcc.Textarea(
+			id='bulk_ids',
+			placeholder='Paste gene names or IDs (one per line, or separated by commas or spaces)',
+			style={'width': '100%', 'height': 80}
+		),
+		html.Button(id='bulk_button', n_clicks=0, children='Highlight'),
+		html.Div(id='bulk_report', style={'maxHeight': 120, 'overflowY': 'auto'}),
 
 		html.Br(),
 		html.Hr(),
@@ -452,8 +1044,36 @@ controls = dbc.FormGroup(
 			]
 		),
 
+		# What the graph shows: all proteins, the neighbourhood of the selected or searched protein (which can be expanded one hop at a time)
+		# or an overview with the proteins grouped by KEGG pathway or community (see update_graph_elements)
+		html.Div('Show:'),
+		dcc.RadioItems(
+			id='graph_mode',
+			options=[
+				{'label': '  All proteins', 'value': 'all'},
+				{'label': '  Neighbourhood of selected protein', 'value': 'focus'},
+				{'label': '  Overview: KEGG pathways', 'value': 'kegg'},
+				{'label': '  Overview: communities', 'value': 'community'}
+			], value='all', labelStyle={'display': 'block'}
+		),
+		dbc.Button('Expand neighbourhood by one hop', id='expand_focus', n_clicks=0, block=True, color='secondary', size='sm'),
+
 		html.Br(),
 		
+		# Slider for the minimal combined_score of the interactions shown in the cytoscape graph
+		html.Div('Minimal interaction score:'),
+		dcc.Slider(
+			id='cutoff_slider',
+			min=MIN_CUTOFF_SCORE,
+			max=1,
+			step=0.01,
+			value=NODE_CUTOFF_SCORE,
+			marks={score: '{:g}'.format(score) for score in [MIN_CUTOFF_SCORE, 0.7, 0.9, 1] if score >= MIN_CUTOFF_SCORE},
+			tooltip={'placement': 'bottom'},
+			updatemode='drag'
+		),
+		html.Br(),
+
 		# Button that hides all nodes that do not have any annotated data // shows them again when pressed a second time
 		html.Div('Switch between full or subset of data:'),
 		dbc.Button(
@@ -633,11 +1253,54 @@ right_side_panel = html.Div(
 ############################
 """
 
-# Define app itself
-app = dash.Dash(external_stylesheets=[dbc.themes.BOOTSTRAP])
-
-# Set app layout
-app.layout = html.Div([dcc.Location(id="url"), left_side_panel, right_side_panel, middle_window])
+# Settings of the Dash app: keyword arguments of dash.Dash, which can be changed with the config of create_app
+# The assets folder (with the clientside callbacks) is the one next to main.py, also when main.py is imported from another folder (wsgi.py)
+default_app_config = {'external_stylesheets': [dbc.themes.BOOTSTRAP], 'assets_folder': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')}
+
+# Makes the Dash app, with its layout and callbacks
+# The data (dataframes, elements, dictionaries) is read only once, when main.py is imported, and is shared by all apps made here
+# config: dictionary that replaces (some of) the default_app_config, e.g. {'compress': True} (see wsgi.py)
+def create_app(config=None):
+	app = dash.Dash(**dict(default_app_config, **(config or {})))
+
+	# Set app layout
+	# The stores keep the filters and sorting of the tables of this session (browser tab), see update_filter_state,
+	# and the elements of the cytoscape graph and what it shows (neighbourhood in focus mode, expanded meta-nodes of the overview), see update_graph_elements
+	app.layout = html.Div([
+		dcc.Location(id="url"),
+		dcc.Store(id='filter_state', data=no_filters),
+		dcc.Store(id='interaction_filter'),
+		dcc.Store(id='acetylation_filter'),
+		dcc.Store(id='graph_style', data=graph_style),
+		dcc.Store(id='graph_update'),
+		dcc.Store(id='graph_elements'),
+		dcc.Store(id='graph_view'),
+		dcc.Store(id='tapped_node'),
+		dcc.Store(id='graph_layout', data='grid'),
+		dcc.Store(id='search_result'),
+		dcc.Store(id='highlighted'),
+		dcc.Store(id='selection'),
+		left_side_panel, right_side_panel, middle_window])
+
+	register_callbacks(app)
+
+	# The hits and misses of the caches, as plain text (to choose ELEMENT_CACHE_SIZE and FILTER_CACHE_SIZE)
+	# Every worker process of the server has its own caches, so the page shows the ones of the process that answers it
+	@app.server.route('/cache-info')
+	def show_cache_info():
+		return flask.Response(cache_info() + '\n', mimetype='text/plain')
+
+	return app
+
+# Builds the indexes and caches that are otherwise built the first time they are used (text indexes, score index of the graph, rows of the tables)
+# wsgi.py calls this before the worker processes are started, so the workers share them instead of each building their own
+def warm_up():
+	for text_index in list(interaction_text_indexes.values()) + list(acetylation_text_indexes.values()):
+		if not text_index.built:
+			text_index.build()
+	get_filtered_rows(no_filters, NODE_CUTOFF_SCORE)
+	for annotated_only in (False, True):
+		get_elements(nodeDf, annotated_only, NODE_CUTOFF_SCORE)
 
 
 """
@@ -646,428 +1309,411 @@ app.layout = html.Div([dcc.Location(id="url"), left_side_panel, right_side_panel
 ####################
 """
 
-# Changes layout of the cytoscape node graph
-@app.callback(
-	Output('cytoscape-protein', 'layout'),
-	[Input('dropdown-layout', 'value')
-])
-def update_cytoscape_layout(layout):
-	return {'name': layout}
-
-
-# Displays total number of nodes in cytoscape node graph
-@app.callback(Output('total_nodes','children'),
-			Input('cytoscape-protein', 'elements'))
-def num_nodes(elz):
-	nodes=[]
-	for item in elz:
-		if 'source' in str(item):
-			nodes.append(item['data']['source'])
-			nodes.append(item['data']['target'])
-	return "Currently displaying {} nodes ".format(len(set(nodes)))
-
-
-# This function gets all information of the selected node, converts it to strings, makes links to databases, and displays it in the right side panel
-@app.callback( Output('selectedNode-id', 'children'),
-				Output('selectedNode-uniprot', 'children'),
-				Output('selectedNode-uniprot', 'href'),
-				Output('selectedNode-string', 'children'),
-				Output('selectedNode-string', 'href'),
-				Output('selectedNode-kegg', 'children'),
-				Output('selectedNode-kegg', 'href'),
-				Output('selectedNode-acetylation_sites', 'children'),
-				Output('selectedNode-logFC', 'children'),
-				Output('selectedNode-annotation', 'children'),
-				Output('selectedNode-kegganno', 'children'),
-				[Input('cytoscape-protein', 'tapNodeData')])
-def displaySelectedNodeData(data):   
-# data is a dictionary, can be returned as json with 'return json.dumps(data, indent=2)'
-
-	if data:	# This is necessary, if not here, then data will not be dictionary but a NoneType
-		prot_id = str(data.get('id'))
-		uniprot_id = str(data.get('UniprotID'))
-		uniprot_link = "https://www.uniprot.org/uniprot/{}".format(uniprot_id)
-		string_id = str(data.get('stringid'))
-		string_link = "https://string-db.org/network/{}".format(string_id)
-		kegg_id = str(data.get('KEGG_ID'))
-		kegg_link = "https://www.genome.jp/dbget-bin/www_bget?pae:{}".format(kegg_id)
-
-		acetylation_sites = str(acet_sites.get(uniprot_id))
-		logfc = str(data.get('logFC'))
-
-		if prot_id in unique_keys:
-			annotation = str(protein_annotation.get(string_id))
-		else:
-			annotation = "Annotation not available"
-		
-		# (Try, expect) has to be used here else a TypeError will occur when there is no KEGG pathways for the node
-		try:
-			kegg_annotation = '<br>'.join(kegg_dict.get(kegg_id))
-		except TypeError:
-			kegg_annotation = "No path"
-
-		return prot_id, uniprot_id, uniprot_link, string_id, string_link, kegg_id, kegg_link, acetylation_sites, logfc, annotation, kegg_annotation
-	else:
-		return 'Nothing selected', 'Nothing selected', '', 'Nothing selected', '', 'Nothing selected', '', 'Nothing selected', 'Nothing selected', 'Nothing selected', 'Nothing selected'				
-
-
-# Makes new cy_edges cy_nodes with only nodes that have annotation data to pass to cytoscape graph
-@app.callback(
-	Output('cytoscape-protein', 'elements'),
-	Output('unique_button', 'children'),
-	[Input('unique_button', 'n_clicks')
-])	
-def only_show_annotated_cytoscape(clix):
-	ctx = dash.callback_context
-	nodes=set()
-	cy_edges = []
-	cy_nodes = []
-
-	if ctx.inputs['unique_button.n_clicks']%2 == 1:
-		#If its the unique nodes		
-		for index, row in nodeDf.iterrows():
-			source, target, score, interaction = row['node1'], row['node2'], row['combined_score'], row['interaction']
-			source_uniprot = row['node1_uniprot']
-			target_uniprot = row['node2_uniprot']
-
-			source_logFC = get_logFC_as_string(logfc_anno.get(source_uniprot))
-			target_logFC = get_logFC_as_string(logfc_anno.get(target_uniprot))
-
-			if source not in nodes and source in unique_keys:
-				nodes.add(source)
-				cy_nodes.append({'data': {'id': source, 'label': source, 'UniprotID': source_uniprot, 'logFC': source_logFC}})	  # data: { [here comes that data contained for the node as a dictionary] }
-			if target not in nodes and target in unique_keys:
-				nodes.add(target)
-				cy_nodes.append({'data': {'id': target, 'label': target, 'UniprotID': target_uniprot, 'logFC': target_logFC}})
-
-			if row['combined_score'] >= NODE_CUTOFF_SCORE and source in unique_keys and target in unique_keys:
-				cy_edges.append({'data': {'source': source, 'target': target, 'score': score, 'interaction': interaction, 'source_logFC': source_logFC, 'target_logFC': target_logFC}})	 # same for the edge	
-			
-	else:
-			#Return all nodes back to original graph
-		for index, row in nodeDf.iterrows():
-			source, target, score, interaction = row['node1'], row['node2'], row['combined_score'], row['interaction']
-			source_uniprot = row['node1_uniprot']
-			target_uniprot = row['node2_uniprot']
-			
-			source_logFC = get_logFC_as_string(logfc_anno.get(source_uniprot))
-			target_logFC = get_logFC_as_string(logfc_anno.get(target_uniprot))
-
-			if source not in nodes:
-				nodes.add(source)
-				cy_nodes.append({'data': {'id': source, 'label': source, 'UniprotID': source_uniprot, 'logFC': source_logFC}})	  # data: { [here comes that data contained for the node as a dictionary] }
-			if target not in nodes:
-				nodes.add(target)
-				cy_nodes.append({'data': {'id': target, 'label': target, 'UniprotID': target_uniprot, 'logFC': target_logFC}})
-
-			cy_edges.append({'data': {'id': source+target, 'source': source, 'target': target, 'score': score, 'interaction': interaction, 'source_logFC': source_logFC, 'target_logFC': target_logFC}})	 # same for the edge	
-
-	button_text = 'Show only annotated proteins' if ctx.inputs['unique_button.n_clicks']%2 == 0 else 'Show all proteins'
-	
-	elements = cy_edges + cy_nodes
-	return elements, button_text
-				
-
-# Changes layout of middle-window depending on url
-@app.callback(Output('middle-window', 'children'),
-				[Input('url', 'pathname')])
-def updateMiddleWindow(pathname):
-	if pathname == '/':
-		page=html.Div([html.P(
-		html.H3("Welcome to PACES webpage by Adi, Ben, Stefaan & Hannelore!"),style={'color':'#007fff','text-align':'center'}),
-		html.Br(),
-		html.P("Note: Any changes made to the tabular view (Interaction data table/ Acetylation data table) automatically reflect on the graphical view (Cytoscape)",style={'text-align':'center'})
-		])
-		return page
-	if pathname == '/cytoscape':
-		return (node_graph_layout, node_graph)
-	if pathname == '/interaction_table':
-		return interaction_table
-	if pathname == '/acetylation_table':
-		return acetylation_table
-	
-	
-# callback for interaction table
-@app.callback(
-	Output('interaction_table', 'data'),
-	[Input('interaction_table', 'sort_by'),
-	 Input('interaction_table', 'filter_query'),
-	 Input("all_button", "n_clicks")
-	 ])
-def update_interaction_table(sort_by, filter,n_clicks):
-	global nodeDf
-	global acetylation
-
-	changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
-	if 'all_button' in changed_id:
-		nodeDf = nodeDf_orig
-		acetylation = acetylation_orig
-		
-	filtering_expressions = filter.split(' && ')
-
-	dff = nodeDf
-	# Do this before search, else some results might get excluded
-	dff = dff.round({'combined_score': 3})
-	for filter_part in filtering_expressions:
-		col_name, operator, filter_value = split_filter_part(filter_part)
-		if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
-			# these operators match pandas series operator method names
-			dff = dff.loc[getattr(dff[col_name], operator)(filter_value)]
-		elif operator == 'contains':	
-			if 'kegg' in col_name:
-				dff_na = dff.dropna()
-				dff = dff_na.loc[dff_na[col_name].str.contains(str(filter_value))]
+# Adds all callbacks to app
+def register_callbacks(app):
+
+	# Keeps the layout of the dropdown in the 'graph_layout' store, which is also there when the cytoscape page is not shown (in the browser)
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='layout_name'),
+		Output('graph_layout', 'data'),
+		[Input('dropdown-layout', 'value')])
+
+
+	# Displays total number of nodes in cytoscape node graph (in the browser, see num_nodes in assets/clientside.js)
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='num_nodes'),
+		Output('total_nodes','children'),
+		[Input('cytoscape-protein', 'elements')])
+
+
+	# This function gets all information of the selected node, converts it to strings, makes links to databases, and displays it in the right side panel
+	@app.callback( Output('selectedNode-id', 'children'),
+					Output('selectedNode-uniprot', 'children'),
+					Output('selectedNode-uniprot', 'href'),
+					Output('selectedNode-string', 'children'),
+					Output('selectedNode-string', 'href'),
+					Output('selectedNode-kegg', 'children'),
+					Output('selectedNode-kegg', 'href'),
+					Output('selectedNode-acetylation_sites', 'children'),
+					Output('selectedNode-logFC', 'children'),
+					Output('selectedNode-annotation', 'children'),
+					Output('selectedNode-kegganno', 'children'),
+					[Input('cytoscape-protein', 'tapNodeData')])
+	def displaySelectedNodeData(data):   
+	# data is a dictionary, can be returned as json with 'return json.dumps(data, indent=2)'
+
+		if data and 'members' in data:	# meta-node of the overview (see Overview)
+			annotation = "Number of proteins: {} ({} with a positive and {} with a negative log fold change)".format(data['members'], data['positive'], data['negative'])
+			return data['group'], '-', '', '-', '', '-', '', '-', data['logFC'], annotation, '-'
+		elif data:	# This is necessary, if not here, then data will not be dictionary but a NoneType
+			prot_id = str(data.get('id'))
+			uniprot_id = str(data.get('UniprotID'))
+			uniprot_link = "https://www.uniprot.org/uniprot/{}".format(uniprot_id)
+			string_id = str(data.get('stringid'))
+			string_link = "https://string-db.org/network/{}".format(string_id)
+			kegg_id = str(data.get('KEGG_ID'))
+			kegg_link = "https://www.genome.jp/dbget-bin/www_bget?pae:{}".format(kegg_id)
+
+			acetylation_sites = str(acet_sites.get(uniprot_id))
+			logfc = str(data.get('logFC'))
+
+			if prot_id in unique_keys:
+				annotation = str(protein_annotation.get(string_id))
 			else:
-				dff = dff.loc[dff[col_name].str.contains(str(filter_value))]
-			
-	if len(sort_by):
-		dff = dff.sort_values(
-			[col['column_id'] for col in sort_by],
-			ascending=[
-				col['direction'] == 'asc'
-				for col in sort_by
-			],
-			inplace=False
-		)
-
-	# make the filtered dataframe the nodeDf which is then also used in the cytoscape graph
-	nodeDf=dff
-
-	# updates acetylation dataframe with filtered entries from nodeDf (so filter from interatction table also applies to acetylation table)
-	proteins = sum([ nodeDf['node1_uniprot'].tolist(), nodeDf['node2_uniprot'].tolist()], [])
-	acetylation = acetylation[acetylation['uniprotID'].isin(proteins)]
+				annotation = "Annotation not available"
 
-	# Rounds float of combined score in table view
-	dff = dff.round({'combined_score': 3})
+			# (Try, expect) has to be used here else a TypeError will occur when there is no KEGG pathways for the node
+			try:
+				kegg_annotation = '<br>'.join(kegg_dict.get(kegg_id))
+			except TypeError:
+				kegg_annotation = "No path"
 
-	return dff.to_dict('records')
-
-# callback for acetylation table
-@app.callback(
-	Output('acetylation_table', 'data'),
-	[Input('acetylation_table', 'sort_by'),
-	 Input('acetylation_table', 'filter_query'),
-	 Input("all_button2", "n_clicks")
-	 ])
-def update_acetylation_table(sort_by, filter,n_clicks):
-	global acetylation
-	global nodeDf
-		
-	filtering_expressions = filter.split(' && ')
-
-	changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
-	if 'all_button2' in changed_id:
-		nodeDf = nodeDf_orig
-		acetylation = acetylation_orig
-
-	dff = acetylation
-	for filter_part in filtering_expressions:
-		col_name, operator, filter_value = split_filter_part(filter_part)
-		if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
-			# these operators match pandas series operator method names
-			dff = dff.loc[getattr(dff[col_name], operator)(filter_value)]
-		elif operator == 'contains':
-			dff = dff.loc[dff[col_name].str.contains(str(filter_value))]
-			
-	if len(sort_by):
-		dff = dff.sort_values(
-			[col['column_id'] for col in sort_by],
-			ascending=[
-				col['direction'] == 'asc'
-				for col in sort_by
-			],
-			inplace=False
-		)
-	# make the filtered dataframe the acetlylation dataframe which is then also used to filter the nodeDf
-	acetylation=dff
-	
-	# updates nodeDf with filtered entries from acetylation
-	proteins = acetylation['uniprotID'].tolist()
-	nodeDf = nodeDf[nodeDf['node1_uniprot'].isin(proteins) | nodeDf['node2_uniprot'].isin(proteins)]
-
-	# Rounds float of combined score in table view
-	dff = dff.round({'combined_score': 3})
-
-	return dff.to_dict('records')
+			return prot_id, uniprot_id, uniprot_link, string_id, string_link, kegg_id, kegg_link, acetylation_sites, logfc, annotation, kegg_annotation
+		else:
+			return 'Nothing selected', 'Nothing selected', '', 'Nothing selected', '', 'Nothing selected', '', 'Nothing selected', 'Nothing selected', 'Nothing selected', 'Nothing selected'				
+
+
+	# Makes new elements with only nodes that have annotation data to pass to cytoscape graph (or all nodes again), for the cut-off of the slider
+	# and the interactions that are left after the filters of the tables of the session
+	# In focus mode only the neighbourhood of the protein in focus (clicked, searched or selected before focus mode was switched on) is sent,
+	# and expanding it by one hop only sends the elements that are new
+	# In the overview the meta-nodes are sent (see Overview), and a meta-node that is clicked shows (more of) its proteins
+	# With the 'precomputed' layout, the positions of all nodes that are shown are sent as well (see get_positions, the layout of the whole graph is computed once)
+	# What is shown is kept in the 'graph_view' store: {'mode': 'focus', 'centers': [...], 'hops': ...}, {'mode': 'kegg' or 'community', 'expanded': [...]} or {'mode': 'all'},
+	# with the filters of the tables it was made with ('filters', see graph_filters): when the cytoscape page is opened again after a filter of a table changed,
+	# the graph is made again for the new filters (what is shown in the current mode is kept)
+	# The elements go to the 'graph_update' store as {'elements': [...] (None when only the positions changed), 'append': True or False, 'positions': {...} or None},
+	# and are added to the graph in the browser (see merge_elements)
+	@app.callback(
+		Output('graph_update', 'data'),
+		Output('graph_view', 'data'),
+		Output('unique_button', 'children'),
+		[Input('unique_button', 'n_clicks'),
+		 Input('cutoff_slider', 'value'),
+		 Input('graph_mode', 'value'),
+		 Input('tapped_node', 'data'),
+		 Input('search_result', 'data'),
+		 Input('expand_focus', 'n_clicks'),
+		 Input('graph_layout', 'data'),
+		 Input('url', 'pathname')
+		 ],
+		[State('selectedNode-id', 'children'),
+		 State('graph_view', 'data'),
+		 State('filter_state', 'data')])
+	def update_graph_elements(clix, cutoff, graph_mode, tapped_node, search_result, expand_clicks, layout, pathname, selected_node, view, filter_state):
+		changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
+		filter_state = filter_state or no_filters
+
+		# another page is opened, or the cytoscape page is opened again and the tables were not filtered differently since the graph was made
+		if 'url' in changed_id and (pathname != '/cytoscape' or (view and view.get('filters') == graph_filters(filter_state))):
+			raise PreventUpdate
+
+		# the other layouts are made in the browser (see show_graph in assets/clientside.js)
+		if 'graph_layout' in changed_id and layout != 'precomputed':
+			raise PreventUpdate
+
+		# If its the unique nodes (odd number of clicks), else all nodes back to original graph
+		annotated_only = clix%2 == 1
+		button_text = 'Show only annotated proteins' if clix%2 == 0 else 'Show all proteins'
+		df = get_session_nodeDf(filter_state)
+		view = view if view and view['mode'] == graph_mode else None
+		append = False
+
+		# overview: a meta-node that is clicked is expanded (a meta-node can be clicked more than once, see Overview.elements)
+		if graph_mode in ('kegg', 'community'):
+			if 'search_result' in changed_id or 'expand_focus' in changed_id:
+				raise PreventUpdate
+			expanded = view['expanded'] if view else []
+			if 'tapped_node' in changed_id:
+				expanded = expanded + [tapped_node]
+			view = {'mode': graph_mode, 'expanded': expanded}
+			elements = get_overview(df, annotated_only, cutoff, graph_mode).elements(expanded)
+
+		elif graph_mode == 'focus':
+			if 'expand_focus' in changed_id:
+				if not view:
+					raise PreventUpdate
+				view = dict(view, hops=view['hops'] + 1)
+				append = True
+			elif 'tapped_node' in changed_id:
+				view = {'mode': 'focus', 'centers': [tapped_node], 'hops': FOCUS_HOPS}
+			elif 'search_result' in changed_id:
+				if not search_result or not search_result['ids']:
+					raise PreventUpdate
+				view = {'mode': 'focus', 'centers': search_result['ids'], 'hops': FOCUS_HOPS}
+			elif not view:
+				# focus mode was just switched on: the selected protein (if any) is in focus
+				view = {'mode': 'focus', 'centers': [selected_node] if selected_node in search_index.proteins else [], 'hops': FOCUS_HOPS}
+			elements = get_score_index(df).focus_elements(annotated_only, cutoff, view['centers'], view['hops'])
 
-# Export current cytoscape graph as an image when button is clicked
-@app.callback(
-	Output("cytoscape-protein", "generateImage"),
-	[
-		Input("btn-get-jpg", "n_clicks"),
-		Input("btn-get-png", "n_clicks"),
-		Input("btn-get-svg", "n_clicks"),
-	])
-def getImage(jpg, png, svg):
-	ftype=''
-	action = 'download'
-	if dash.callback_context.triggered:
-		input_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
-		if input_id != "tabs":
-			action = "download"
-			ftype = input_id.split("-")[-1]
-	return {'type': ftype, 'action':action}
-
-
-""" Change layout of cytoscape node graph
-
-inputs used to change layout:
- - selecting a node:											Colors selected node, and the nodes and edges connected to it
- - clicking 'Return to default look' button:					Changes cytoscape stylesheet to the default look
- - selecting a different label in the node labels dropdown:		Changes label of nodes
- - clicking search button:										Uses state of the 'searchvalue' field to look for a node and color it purple
- - clicking edgelabel checklist:								Displays interactions atributes of an edge as an edge label.
-"""
-@app.callback(Output('cytoscape-protein', 'stylesheet'),
-			  [Input('cytoscape-protein', 'tapNode'),
-			  Input("to_default_stylesheet", "n_clicks"),
-			  Input('change_label', 'value'),
-			  Input('searchbutton', 'n_clicks'),
-			  Input('edgelabel-options', 'value'),
-			  State('searchvalue', 'value'),])
-def generate_stylesheet(node, button, new_label, searchbutton, edgelabelvalue, searchvalue):
-
-	global label						# globally changes label value (= also outside of this function)
-	if new_label == 'pref_name':
-		label = 'data(label)'
-	if new_label == 'StringDB':
-		label = 'data(stringid)'
-	if new_label == 'Uniprot':
-		label = 'data(UniprotID)'
-	if new_label == 'KEGG ID':
-		label = 'data(KEGG_ID)'
-	
-	# Default stylesheet has to be defined again so that label value is updated
-	new_default_stylesheet = default_stylesheet
-	
-	# returns to default stylesheet
-	changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
-	if 'to_default_stylesheet' in changed_id:
-		return new_default_stylesheet
-
-	# if no node is selected, and search button is not selected, return to default stylesheet
-	if not node and not 'searchbutton' in changed_id:
-		return new_default_stylesheet
-
-	# Defines value of edge label
-	edge_label = ''
-	try:
-		if 'show_interaction' in edgelabelvalue:
-			edge_label = "data(interaction)"	
-	except:
-		pass
-	
-	# beginning of new stylesheet. Everything is very opaque
-	stylesheet = [{
-		"selector": 'node',
-		'style': {
-			'opacity': 0.3
-		}
-	}, {
-		'selector': 'edge',
-		'style': {
-			'opacity': 0.2,
-			"curve-style": "bezier",
-		}
-	}]
-
-	# If searchbutton was pressed, change color of node that matches search value
-	if 'searchbutton' in changed_id:
-		search_id = ''
-		if str(searchvalue) in nodes:
-			search_id = 'id'
-		if str(searchvalue)[0].isalpha() and str(searchvalue[1]).isdigit():
-			search_id = 'UniprotID'
-		if 'DR' in str(searchvalue).upper():
-			search_id = 'stringid'
-		if 'PA' in str(searchvalue).upper():
-			search_id = 'KEGG_ID'
-
-		if not search_id:
-			return stylesheet
 		else:
-			stylesheet.append({
-					"selector": 'node[{} = "{}"]'.format(search_id, str(searchvalue)),
-					"style": {
-						'background-color': '#B10DC9',
-						"border-color": "purple",
-						"border-width": 2,
-						"border-opacity": 1,
-						"opacity": 1,
-
-						"label": label,
-						"text-opacity": 1,
-						'z-index': 9999			# the bigger the Z-index, the more priority it has to be in front of other nodes/labels
-					}
-				})
-			return stylesheet
-
-	# if searchbutton was not pressed
-	elif 'searchbutton' not in changed_id:
-		stylesheet.append({
-			"selector": 'node[id = "{}"]'.format(node['data']['id']),
-			"style": {
-				'background-color': '{}'.format(colordict.get(node['data']['logFC'])),
-				"border-color": "purple",
-				"border-width": 2,
-				"border-opacity": 1,
-				"opacity": 1,
-
-				"label": label,
-				"text-opacity": 1,
-				'z-index': 9999
-			}
-		})
-		
+			if 'tapped_node' in changed_id or 'search_result' in changed_id or 'expand_focus' in changed_id:
+				raise PreventUpdate
+			view = {'mode': 'all'}
+			elements = get_elements(df, annotated_only, cutoff)
+		view = dict(view, filters=graph_filters(filter_state))
+
+		update = {'elements': elements, 'append': False, 'positions': get_positions(df, elements) if layout == 'precomputed' else None}
+		if 'graph_layout' in changed_id:
+			update['elements'] = None
+		elif append:
+			# expanding by one hop: only the elements of the new hop are added to the graph
+			update['elements'] = get_score_index(df).focus_elements(annotated_only, cutoff, view['centers'], view['hops'], known=view['hops'] - 1)
+			update['append'] = True
+		return update, view, button_text
+
+
+	# The protein that is clicked in focus mode (the new center of the neighbourhood that is shown), or the meta-node that is clicked in the overview
+	# (in the browser, see tapped_node in assets/clientside.js)
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='tapped_node'),
+		Output('tapped_node', 'data'),
+		[Input('cytoscape-protein', 'tapNodeData')],
+		[State('graph_mode', 'value')])
+
+
+	# Adds the elements sent by update_graph_elements to the elements of the graph, or replaces them (in the browser, see merge_elements in assets/clientside.js)
+	# They are kept in the 'graph_elements' store ({'elements': [...], 'positions': {...} or None}), so the graph gets them back when the cytoscape page is opened again
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='merge_elements'),
+		Output('graph_elements', 'data'),
+		[Input('graph_update', 'data')],
+		[State('graph_elements', 'data')])
+
+	# The selected proteins of the graph: the clicked node, or the proteins found with the search box ({'ids': [...], 'searched': True or False}),
+	# None after 'Return to default look' (in the browser, see selection in assets/clientside.js)
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='selection'),
+		Output('selection', 'data'),
+		[Input('cytoscape-protein', 'tapNodeData'),
+		 Input('to_default_stylesheet', 'n_clicks'),
+		 Input('search_result', 'data')])
+
+	# Shows the elements of the 'graph_elements' store in the graph, with the layout of the dropdown
+	# (a 'preset' layout with the positions computed on the server for the 'precomputed' layout, in the browser, see show_graph in assets/clientside.js)
+	# The proteins of the 'highlighted' store get the class 'highlighted', and the selected proteins (the 'selection' store) and their partners
+	# the classes 'selected' or 'searched' and 'neighbour', so the stylesheet only needs one rule for each of them
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='show_graph'),
+		Output('cytoscape-protein', 'elements'),
+		Output('cytoscape-protein', 'layout'),
+		[Input('graph_elements', 'data'),
+		 Input('dropdown-layout', 'value'),
+		 Input('highlighted', 'data'),
+		 Input('selection', 'data')])
+
+
+	# Changes layout of middle-window depending on url (the tables are made with the filters and sorting of the session, and the cut-off of the slider)
+	@app.callback(Output('middle-window', 'children'),
+					[Input('url', 'pathname')],
+					[State('filter_state', 'data'),
+					 State('cutoff_slider', 'value')])
+	def updateMiddleWindow(pathname, filter_state, cutoff):
+		if pathname == '/':
+			page=html.Div([html.P(
+			html.H3("Welcome to PACES webpage by Adi, Ben, Stefaan & Hannelore!"),style={'color':'#007fff','text-align':'center'}),
+			html.Br(),
+			html.P("Note: Any changes made to the tabular view (Interaction data table/ Acetylation data table) automatically reflect on the graphical view (Cytoscape)",style={'text-align':'center'})
+			])
+			return page
+		if pathname == '/cytoscape':
+			return (node_graph_layout, node_graph)
+		if pathname == '/interaction_table':
+			return make_interaction_table(filter_state or no_filters, cutoff)
+		if pathname == '/acetylation_table':
+			return make_acetylation_table(filter_state or no_filters, cutoff)
+
+
+	# Goes back to the first page of a table when its filter or sorting changes
+	@app.callback(
+		Output('interaction_table', 'page_current'),
+		[Input('interaction_table', 'sort_by'),
+		 Input('interaction_table', 'filter_query')
+		 ])
+	def reset_interaction_page(sort_by, filter):
+		return 0
+
+	@app.callback(
+		Output('acetylation_table', 'page_current'),
+		[Input('acetylation_table', 'sort_by'),
+		 Input('acetylation_table', 'filter_query')
+		 ])
+	def reset_acetylation_page(sort_by, filter):
+		return 0
+
+	# Empties the filter box and removes the sorting of a table when its 'Show all proteins' button is clicked
+	@app.callback(
+		Output('interaction_table', 'filter_query'),
+		Output('interaction_table', 'sort_by'),
+		[Input('all_button', 'n_clicks')])
+	def clear_interaction_table(n_clicks):
+		if not n_clicks:
+			raise PreventUpdate
+		return '', []
+
+	@app.callback(
+		Output('acetylation_table', 'filter_query'),
+		Output('acetylation_table', 'sort_by'),
+		[Input('all_button2', 'n_clicks')])
+	def clear_acetylation_table(n_clicks):
+		if not n_clicks:
+			raise PreventUpdate
+		return '', []
+
+	# Filter and sorting of one table as they are stored in the session, reset is True when all filters of the session are removed ('Show all proteins')
+	def table_filter(filter, sort_by, reset=False):
+		return {'filter': '' if reset else filter or '', 'sort_by': [] if reset else sort_by or [], 'reset': reset}
+
+	# callback for interaction table: filters and sorts the interactions for the filters of the session and the cut-off of the slider, and returns the current page, the number of pages and the number of rows
+	# the new filter and sorting of the table are stored in 'interaction_filter', which updates the filters of the session (see update_filter_state)
+	@app.callback(
+		Output('interaction_table', 'data'),
+		Output('interaction_table', 'page_count'),
+		Output('interaction_table_count', 'children'),
+		Output('interaction_filter', 'data'),
+		[Input('interaction_table', 'page_current'),
+		 Input('interaction_table', 'page_size'),
+		 Input('interaction_table', 'sort_by'),
+		 Input('interaction_table', 'filter_query'),
+		 Input("all_button", "n_clicks"),
+		 Input('cutoff_slider', 'value')
+		 ],
+		[State('filter_state', 'data')])
+	def update_interaction_table(page_current, page_size, sort_by, filter, n_clicks, cutoff, filter_state):
+		changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
+		new_filter = table_filter(filter, sort_by, 'all_button' in changed_id)
+		filter_state = no_filters if new_filter['reset'] else dict(filter_state or no_filters, interaction=new_filter)
 
-	for edge in node['edgesData']:
-		if edge['source'] == node['data']['id']:
-			stylesheet.append({
-				"selector": 'node[id = "{}"][logFC = "{}"]'.format(edge['target'], edge['target_logFC']),
-				"style": {
-					'background-color': '{}'.format(colordict.get(edge['target_logFC'])),
-					"opacity": 1,
-					"label": label,
-					"text-opacity": 1,
-					'z-index': 9999
-				}
-			})
-			stylesheet.append({
-				"selector": 'edge[id= "{}"]'.format(edge['id']),
-				"style": {
-					"label": "{}".format(edge_label),
-					"text-rotation": "autorotate",
-					"line-color": selected_edge_color,
-					'opacity': 1,
-					'z-index': 5000
-				}
-			})
-
-		if edge['target'] == node['data']['id']:
-			stylesheet.append({
-				"selector": 'node[id = "{}"][logFC = "{}"]'.format(edge['source'], edge['source_logFC']),
-				"style": {
-					'background-color': '{}'.format(colordict.get(edge['source_logFC'])),
-					"opacity": 1,
-
-					"label": label,
-					"text-opacity": 1,
-					'z-index': 9999
-				}
-			})
-			stylesheet.append({
-				"selector": 'edge[id= "{}"]'.format(edge['id']),
-				"style": {
-					"label": "{}".format(edge_label),
-					"text-rotation": "autorotate",
-					"line-color": selected_edge_color,
-					'opacity': 1,
-					'z-index': 5000
-				}
-			})
-	return stylesheet
-		
+		try:
+			rows = get_filtered_rows(filter_state, cutoff)[0]
+		except ValueError:
+			# the filter query can not be used (yet, e.g. while typing), so the table stays as it is
+			raise PreventUpdate
+		dff = nodeDf_table.iloc[rows]
+
+		# Only the current page is returned
+		return get_table_page(dff, page_current, page_size) + (interaction_count(dff, cutoff), new_filter)
+
+	# callback for acetylation table: filters and sorts the proteins for the filters of the session, and returns the current page, the number of pages and the number of rows
+	# the new filter and sorting of the table are stored in 'acetylation_filter', which updates the filters of the session (see update_filter_state)
+	@app.callback(
+		Output('acetylation_table', 'data'),
+		Output('acetylation_table', 'page_count'),
+		Output('acetylation_table_count', 'children'),
+		Output('acetylation_filter', 'data'),
+		[Input('acetylation_table', 'page_current'),
+		 Input('acetylation_table', 'page_size'),
+		 Input('acetylation_table', 'sort_by'),
+		 Input('acetylation_table', 'filter_query'),
+		 Input("all_button2", "n_clicks"),
+		 Input('cutoff_slider', 'value')
+		 ],
+		[State('filter_state', 'data')])
+	def update_acetylation_table(page_current, page_size, sort_by, filter, n_clicks, cutoff, filter_state):
+		changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
+		new_filter = table_filter(filter, sort_by, 'all_button2' in changed_id)
+		filter_state = no_filters if new_filter['reset'] else dict(filter_state or no_filters, acetylation=new_filter)
 
-# run app
+		try:
+			rows = get_filtered_rows(filter_state, cutoff)[1]
+		except ValueError:
+			# the filter query can not be used (yet, e.g. while typing), so the table stays as it is
+			raise PreventUpdate
+		dff = acetylation.iloc[rows]
+
+		# Only the current page is returned
+		return get_table_page(dff, page_current, page_size) + ("{} proteins".format(len(dff)), new_filter)
+
+	# Keeps the filters and sorting of both tables of the session in 'filter_state' (used by the other table, the cytoscape graph and when a table is shown again)
+	# Each table has its own store, as the tables are not shown at the same time and a callback can only use the components that are shown
+	@app.callback(
+		Output('filter_state', 'data'),
+		[Input('interaction_filter', 'data'),
+		 Input('acetylation_filter', 'data')
+		 ],
+		[State('filter_state', 'data')])
+	def update_filter_state(interaction_filter, acetylation_filter, filter_state):
+		changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
+		table = 'interaction' if 'interaction_filter' in changed_id else 'acetylation'
+		new_filter = interaction_filter if table == 'interaction' else acetylation_filter
+		if new_filter is None:
+			raise PreventUpdate
+		if new_filter['reset']:
+			return no_filters
+		return dict(filter_state or no_filters, **{table: {'filter': new_filter['filter'], 'sort_by': new_filter['sort_by']}})
+
+	# Export current cytoscape graph as an image when button is clicked
+	@app.callback(
+		Output("cytoscape-protein", "generateImage"),
+		[
+			Input("btn-get-jpg", "n_clicks"),
+			Input("btn-get-png", "n_clicks"),
+			Input("btn-get-svg", "n_clicks"),
+		])
+	def getImage(jpg, png, svg):
+		ftype=''
+		action = 'download'
+		if dash.callback_context.triggered:
+			input_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+			if input_id != "tabs":
+				action = "download"
+				ftype = input_id.split("-")[-1]
+		return {'type': ftype, 'action':action}
+
+
+	# Suggests proteins while a protein is typed in the search box (the best matches of search_index, see SearchIndex.search)
+	# Choosing a suggestion fills in its gene name or ID
+	@app.callback(Output('search_suggestions', 'children'), [Input('searchvalue', 'value')])
+	def suggest_proteins(value):
+		if not value or not value.strip():
+			return []
+		return [html.Option(value=match['key'], label='{} ({})'.format(match['id'], match['kind']))
+				for match in search_index.search(value, SEARCH_SUGGESTIONS)]
+
+	# Finds the searched protein when the search button is clicked (or enter is pressed in the search box), see SearchIndex.find:
+	# the proteins of which the gene name or an ID is the searched text, or the best matches when there are none
+	# The proteins go to the 'search_result' store, they are colored (see generate_stylesheet) and are the center of the neighbourhood in focus mode
+	@app.callback(
+		Output('search_result', 'data'),
+		[Input('searchbutton', 'n_clicks'),
+		 Input('searchvalue', 'n_submit')],
+		[State('searchvalue', 'value')])
+	def search_protein(n_clicks, n_submit, value):
+		if not (n_clicks or n_submit) or not value or not value.strip():
+			raise PreventUpdate
+		return {'value': value, 'ids': search_index.find(value, SEARCH_SUGGESTIONS)}
+
+	# Highlights the proteins of the pasted list of gene names and IDs (see resolve_proteins) when the highlight button is clicked:
+	# their ids go to the 'highlighted' store, and the nodes get the class 'highlighted' in the browser (see show_graph),
+	# so one rule of the stylesheet colors all of them. The IDs that are not found are reported below the button
+	@app.callback(
+		Output('highlighted', 'data'),
+		Output('bulk_report', 'children'),
+		[Input('bulk_button', 'n_clicks')],
+		[State('bulk_ids', 'value')])
+	def highlight_proteins(n_clicks, text):
+		if not n_clicks:
+			raise PreventUpdate
+		proteins, not_in_graph, unknown = resolve_proteins(text or '')
+		report = [html.Div('{} proteins highlighted'.format(len(proteins)))]
+		if not_in_graph:
+			report.append(html.Div('Without interactions ({}): {}'.format(len(not_in_graph), ', '.join(not_in_graph))))
+		if unknown:
+			report.append(html.Div('Not found ({}): {}'.format(len(unknown), ', '.join(unknown))))
+		return proteins, report
+
+	# Changes the stylesheet of the cytoscape node graph (in the browser, see generate_stylesheet in assets/clientside.js)
+	# when proteins are selected or searched (or not anymore), the node labels are changed or the edge labels are switched on or off
+	app.clientside_callback(
+		ClientsideFunction(namespace='paces', function_name='generate_stylesheet'),
+		Output('cytoscape-protein', 'stylesheet'),
+		[Input('selection', 'data'),
+		 Input('change_label', 'value'),
+		 Input('edgelabel-options', 'value')
+		 ],
+		[State('graph_style', 'data')])
+
+
+# run app (with the development server of Dash, see wsgi.py to run it with a production server)
 if __name__ == '__main__':
-	app.run_server(debug=True)
\ No newline at end of file
+	create_app().run_server(debug=True)
@@ -0,0 +1,122 @@
+"""
+;===================================================================================================
+; Title:   Search index of the proteins, for the search box and its suggestions (autocompletion)
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+Every protein can be found by its gene name, UniProt ID, STRING ID, KEGG ID and the text of its annotation:
+	- the names and IDs (keys) are sorted (lower case), so the keys that start with the searched text are next to each other,
+	  and are found with a binary search
+	- the annotations are searched with a TextIndex (see text_index.py)
+	- when nothing starts with the searched text and no annotation contains it, the keys that are most like it are returned (fuzzy search):
+	  the keys that have most trigrams (3 characters) in common with it (rare trigrams count more), sorted by their edit distance to it
+
+"""
+import numpy as np
+import pandas as pd
+from text_index import TextIndex, gram_codes
+
+
+# Returns the edit (Levenshtein) distance between two texts: the number of characters that have to be added, removed or changed
+def edit_distance(a, b):
+	previous = list(range(len(b) + 1))
+	for i, char_a in enumerate(a):
+		current = [i + 1]
+		for j, char_b in enumerate(b):
+			current.append(min(previous[j + 1] + 1, current[j] + 1, previous[j] + (char_a != char_b)))
+		previous = current
+	return previous[-1]
+
+
+# Returns the trigrams (see gram_codes) of a key or searched text, with a character added at the start and end,
+# so that the start and end of a short key count in the fuzzy search as well
+def key_grams(text):
+	return np.unique(gram_codes('^' + text + '$')[0])
+
+
+# Search index of the proteins (node ids, the gene names)
+# keys: dataframe with columns 'id' (protein), 'key' (name or ID of the protein) and 'kind' (e.g. 'UniProt ID'), one row per key
+# annotations: dictionary with the id of a protein as key and the text of its annotation as value
+class SearchIndex:
+	def __init__(self, keys, annotations):
+		keys = keys.dropna().astype(str)
+		keys = keys.assign(lower=keys['key'].str.lower()).drop_duplicates(['lower', 'id']).sort_values(['lower', 'id'])
+		self.lower = keys['lower'].to_numpy().astype(str)
+		self.keys = keys['key'].to_numpy()
+		self.ids = keys['id'].to_numpy()
+		self.kinds = keys['kind'].to_numpy()
+		self.proteins = set(self.ids)
+
+		# trigrams of the keys (for the fuzzy search): the positions of the keys of every trigram, as slices of one sorted array
+		grams = [key_grams(key) for key in self.lower]
+		positions = np.repeat(np.arange(len(grams)), [len(g) for g in grams])
+		grams = np.concatenate(grams) if grams else np.zeros(0, dtype=np.int64)
+		order = np.argsort(grams, kind='stable')
+		self.grams, self.gram_keys = grams[order], positions[order]
+
+		# annotations, with the position of the protein in self.annotated as index label (the words are the tokens of the index)
+		self.annotated = np.array(list(annotations.keys()), dtype=object)
+		self.annotations = TextIndex(pd.Series(list(annotations.values()), dtype=object), ' ')
+
+	# Returns the positions of the keys that start with text (lower case), as a range
+	def prefix(self, text):
+		return range(np.searchsorted(self.lower, text, side='left'), np.searchsorted(self.lower, text + '\U0010ffff', side='left'))
+
+	# Returns the positions of the keys that are most like text (lower case): with at most max_distance edits, the closest first
+	def fuzzy(self, text, max_distance, candidates=50):
+		grams = key_grams(text)
+		starts = np.searchsorted(self.grams, grams, side='left')
+		ends = np.searchsorted(self.grams, grams, side='right')
+		used = ends > starts
+		if not used.any():
+			return []
+		starts, ends = starts[used], ends[used]
+
+		# every trigram counts 1 / (number of keys with the trigram), so a rare trigram in common says more than a common one
+		positions = np.concatenate([self.gram_keys[start:end] for start, end in zip(starts, ends)])
+		shared = np.bincount(positions, weights=np.repeat(1.0 / (ends - starts), ends - starts), minlength=len(self.lower))
+		best = np.flatnonzero(shared)
+		if len(best) > candidates:
+			best = best[np.argpartition(-shared[best], candidates)[:candidates]]
+		distances = [(edit_distance(text, self.lower[position]), position) for position in best]
+		return [position for distance, position in sorted(distances) if distance <= max_distance]
+
+	# Returns the best (at most k) matches of text as a list of dictionaries {'id': protein, 'key': name or ID that matches, 'kind': kind of the key},
+	# one per protein: first the keys that start with text (an exact match first), then the proteins with text in their annotation,
+	# and only when there are none of these, the keys that are most like text (with at most 1 edit for every 4 characters)
+	def search(self, text, k=10):
+		text = text.strip().lower()
+		if not text:
+			return []
+		matches, found = [], set()
+
+		def add(protein, key, kind):
+			if protein not in found and len(matches) < k:
+				found.add(protein)
+				matches.append({'id': protein, 'key': key, 'kind': kind})
+
+		for position in self.prefix(text):
+			if len(matches) == k:
+				break
+			add(self.ids[position], self.keys[position], self.kinds[position])
+		if len(matches) < k and len(text) >= 3:
+			for label in self.annotations.contains(text, case_insensitive=True)[:k]:
+				add(self.annotated[label], self.annotated[label], 'annotation')
+		if not matches:
+			for position in self.fuzzy(text, max(1, len(text) // 4)):
+				add(self.ids[position], self.keys[position], self.kinds[position])
+		return matches
+
+	# Returns for every text of texts (a list) the proteins of which a name or ID is that text (not case sensitive), all texts are looked up at once
+	def exact(self, texts):
+		lower = np.array([text.strip().lower() for text in texts] or [''], dtype=str)
+		starts = np.searchsorted(self.lower, lower, side='left')
+		ends = np.searchsorted(self.lower, lower, side='right')
+		return [list(dict.fromkeys(self.ids[start:end])) for start, end in zip(starts[:len(texts)], ends[:len(texts)])]
+
+	# Returns the proteins of which a name or ID is text (not case sensitive), or when there are none, the proteins of the best matches (see search)
+	def find(self, text, k=10):
+		exact = self.exact([text])[0]
+		if exact:
+			return exact
+		return [match['id'] for match in self.search(text, k)]
@@ -0,0 +1,132 @@
+"""
+;===================================================================================================
+; Title:   Index of the text columns of the tables, for fast 'contains' filters
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+The text of every row is split into tokens (e.g. the pathways of keggPathways, split on ' // '):
+	- inverted index: for every distinct token, the (sorted) index labels of the rows that contain it
+	- n-gram index: for every trigram (3 characters, lower case), the tokens that contain it
+A 'contains' filter then looks up the tokens that contain the value (intersecting the token lists of the trigrams of the value
+and checking only these tokens), and takes the rows of these tokens, without going over the text of every row.
+When this would mean checking more tokens than there are rows (e.g. a value of 1 or 2 characters), the text of the rows is checked instead.
+
+"""
+import numpy as np
+import pandas as pd
+
+
+# Length of the n-grams
+gram_length = 3
+
+
+# Returns the trigrams of a text as integers (the unicode code points of the 3 characters, 21 bits each)
+def gram_codes(text):
+	points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+	if len(points) < gram_length:
+		return points[:0], points[:0]
+	return (points[:-2] << 42) | (points[1:-1] << 21) | points[2:], points
+
+
+# Index of one text column (a Series, with the integer index labels of the full, unfiltered dataframe)
+# separator: text between the tokens of a row, None to use the whole text of a row as one token
+# The index is only built the first time it is used
+class TextIndex:
+	def __init__(self, series, separator=None):
+		self.series = series
+		self.separator = separator
+		self.built = False
+
+	def build(self):
+		text = self.series.dropna().astype(str)
+		tokens = text.str.split(self.separator, regex=False).explode() if self.separator else text
+		codes, vocabulary = pd.factorize(tokens)
+
+		# inverted index: the labels of the rows of every token, as slices of one sorted array
+		order = np.lexsort((tokens.index.to_numpy(), codes))
+		self.labels = tokens.index.to_numpy()[order]
+		self.starts = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+		self.vocabulary = list(vocabulary)
+		self.lower_vocabulary = '\0'.join(self.vocabulary).lower().split('\0')
+
+		# n-gram index: the trigrams of all tokens at once (from the tokens joined by \0), with the position in the vocabulary of their token
+		grams, points = gram_codes('\0'.join(self.lower_vocabulary))
+		positions = np.cumsum(points == 0)[:len(grams)]
+		inside = (points[:-2] != 0) & (points[1:-1] != 0) & (points[2:] != 0) if len(grams) else grams.astype(bool)
+		grams, positions = grams[inside], positions[inside]
+		order = np.lexsort((positions, grams))
+		grams, positions = grams[order], positions[order]
+		# a trigram that occurs more than once in a token is only kept once
+		first = np.ones(len(grams), dtype=bool)
+		first[1:] = (grams[1:] != grams[:-1]) | (positions[1:] != positions[:-1])
+		grams, positions = grams[first], positions[first]
+		new_gram = np.ones(len(grams), dtype=bool)
+		new_gram[1:] = grams[1:] != grams[:-1]
+		self.grams = grams[new_gram]
+		self.gram_starts = np.append(np.flatnonzero(new_gram), len(grams))
+		self.gram_tokens = positions
+
+		self.rows = len(text)
+		self.size = int(self.series.index.max()) + 1 if len(self.series) else 0
+		self.built = True
+
+	# True when a match of value could start or end in the separator, so it is not found by looking at single tokens
+	def crosses_separator(self, value):
+		separator = self.separator
+		if not separator:
+			return False
+		return (separator in value or value in separator
+				or any(value.endswith(separator[:i]) or value.startswith(separator[-i:]) for i in range(1, len(separator))))
+
+	# Returns the positions in the vocabulary of the tokens that contain value,
+	# or None when there are more tokens to check than rows (checking the text of the rows is faster then)
+	def matching_tokens(self, value, case_insensitive):
+		lower = value.lower()
+		grams = np.unique(gram_codes(lower)[0])
+		if len(grams) == 0:
+			if len(self.vocabulary) > self.rows:
+				return None
+			candidates = range(len(self.vocabulary))
+		else:
+			found = np.searchsorted(self.grams, grams)
+			if np.any(found == len(self.grams)) or np.any(self.grams[np.minimum(found, len(self.grams) - 1)] != grams):
+				return []
+			postings = sorted((self.gram_tokens[self.gram_starts[i]:self.gram_starts[i + 1]] for i in found), key=len)
+			candidates = postings[0]
+			for other in postings[1:]:
+				candidates = np.intersect1d(candidates, other, assume_unique=True)
+			if len(candidates) > self.rows:
+				return None
+		# the trigrams only select candidates, so check that the value is really in the token
+		if case_insensitive:
+			return [position for position in candidates if lower in self.lower_vocabulary[position]]
+		return [position for position in candidates if value in self.vocabulary[position]]
+
+	# Returns a boolean numpy array with an element for every index label: True for the rows whose text contains value,
+	# or None when the index can not be used for value (see matching_tokens and crosses_separator)
+	def found(self, value, case_insensitive):
+		if not self.built:
+			self.build()
+		tokens = None if self.crosses_separator(value) else self.matching_tokens(value, case_insensitive)
+		if tokens is None:
+			return None
+		found = np.zeros(self.size, dtype=bool)
+		if tokens:
+			found[np.concatenate([self.labels[self.starts[t]:self.starts[t + 1]] for t in tokens])] = True
+		return found
+
+	# Returns the sorted index labels of the rows whose text contains value
+	def contains(self, value, case_insensitive=False):
+		found = self.found(value, case_insensitive)
+		if found is not None:
+			return np.flatnonzero(found)
+		text = self.series.dropna().astype(str)
+		if case_insensitive:
+			return np.sort(text.index.to_numpy()[text.str.lower().str.contains(value.lower(), regex=False).to_numpy()])
+		return np.sort(text.index.to_numpy()[text.str.contains(value, regex=False).to_numpy()])
+
+	# Returns a boolean numpy array: True for the labels (of some rows of the full dataframe) whose text contains value,
+	# or None when the index can not be used for value, so the text of these rows has to be checked by the caller
+	def mask(self, value, case_insensitive, labels):
+		found = self.found(value, case_insensitive)
+		return None if found is None else found[labels]
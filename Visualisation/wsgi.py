@@ -0,0 +1,27 @@
+"""
+;===================================================================================================
+; Title:   Production entry point of the PACES visualisation, for a WSGI server with several worker processes
+; Authors: Stefaan Verwimp, Aditya Badola, Hannelore Longin, Ben De Maesschalck
+;===================================================================================================
+
+Run from the PACES folder (the data is read from Preprocessing/), e.g. with gunicorn (Linux/macOS) and 4 worker processes:
+	gunicorn --preload --workers 4 --threads 4 --pythonpath Visualisation --bind 0.0.0.0:8050 wsgi:server
+
+With --preload this file is imported once, before the worker processes are started (forked):
+	- the data is read, and the indexes and caches are built, only once (see main.warm_up)
+	- gc.freeze() moves all objects made until then out of the reach of the garbage collector, so the workers do not write to
+	  (and with that copy) the memory pages of the shared data when they collect garbage
+The workers then share this memory with the main process, until they change it (copy-on-write).
+The filters of the users are kept in their browser (see main.update_filter_state), so any worker can answer any request.
+
+"""
+import gc
+from main import create_app, warm_up
+
+
+# Production settings of the Dash app: responses are compressed (gzip)
+app = create_app({'compress': True})
+server = app.server
+
+warm_up()
+gc.freeze()
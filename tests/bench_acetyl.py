@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of Scripts/acetyl.py: time of the protein level rollup (makeProtDf) for 10k up to 1M peptide rows,
+with one protein per 5 peptides (generated as in test_acetyl.py). The time per row should stay about the same (linear scaling).
+The original per-protein loop (tests/data/acetyl_loop.py) is timed as well for the smallest sizes (--loop).
+
+Usage: python tests/bench_acetyl.py [--sizes 10000 100000 1000000] [--loop]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from test_acetyl import LOOP_SCRIPT, SCRIPT, makeFilteredData, runScript, writeFilteredData
+
+parser = argparse.ArgumentParser(description='Benchmark of the protein level rollup of acetyl.py.')
+parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='numbers of peptide rows')
+parser.add_argument('--loop', action='store_true', help='also time the original per-protein loop (only for at most 10000 rows)')
+args = parser.parse_args()
+
+# Returns the time (in seconds) of the rollup of acetyl.py (acWhichConditions, acLogFold and makeProtDf), without reading and writing the files
+# The part of acetyl.py before the functions are applied (options, reading filteredData.tsv and the functions) is run first, in the Scripts folder
+def timeRollup():
+    sys.argv = ['acetyl.py']
+    namespace = {'__name__': 'acetyl_bench'}
+    with open(SCRIPT) as f:
+        source = f.read()
+    exec(compile(source[:source.index('##Applying functions')], SCRIPT, 'exec'), namespace)
+    data = namespace['data']
+    start = time.perf_counter()
+    namespace['acWhichConditions'](data)
+    namespace['acLogFold'](data)
+    namespace['makeProtDf'](data, 'Protein')
+    return time.perf_counter() - start
+
+print('{:>10} {:>10} {:>12} {:>14}'.format('rows', 'proteins', 'rollup (s)', 'per 1M rows (s)'))
+for size in args.sizes:
+    with tempfile.TemporaryDirectory() as root:
+        cwd = os.getcwd()
+        writeFilteredData(root, makeFilteredData(size // 5, size))
+        os.chdir(os.path.join(root, 'Scripts'))
+        try:
+            seconds = timeRollup()
+        finally:
+            os.chdir(cwd)
+        print('{:>10} {:>10} {:>12.2f} {:>14.2f}'.format(size, size // 5, seconds, seconds / size * 1e6))
+        if args.loop and size <= 10000:
+            start = time.perf_counter()
+            runScript(LOOP_SCRIPT, root)
+            print('{:>10} {:>10} {:>12.2f}  (original per-protein loop, with reading and writing)'.format(size, size // 5, time.perf_counter() - start))
@@ -0,0 +1,69 @@
+"""
+Fixtures of the tests of Visualisation/main.py: main.py reads its data at import,
+so it is imported in a temporary folder with the files of a fixture network (Preprocessing/...).
+"""
+
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+VISUALISATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Visualisation')
+
+
+# Writes the input files of main.py for a network of numNodes proteins and numEdges interactions in root
+# Some scores are exactly 0.7 (the boundary of the default cut-off), some proteins have no annotation, KEGG ID or log fold change
+def writeNetwork(root, numNodes=40, numEdges=160, seed=0):
+    random = np.random.RandomState(seed)
+    pairs = set()
+    while len(pairs) < numEdges:
+        a, b = random.randint(0, numNodes, 2)
+        if a != b:
+            pairs.add((min(a, b), max(a, b)))
+    pairs = sorted(pairs, key=lambda pair: random.rand())
+    scores = random.choice([0.4, 0.55, 0.69, 0.7, 0.7, 0.71, 0.85, 0.999], len(pairs))
+    kegg = lambda n: 'PA{:04d}'.format(n) if n % 5 else None
+    rows = [{'node1': 'g{}'.format(a), 'node2': 'g{}'.format(b), 'node1_string_id': '287.DR97_{}'.format(a), 'node2_string_id': '287.DR97_{}'.format(b),
+             'combined_score': score, 'interaction': random.choice(['binding', 'activation, catalysis', 'reaction']),
+             'node1_uniprot': 'P{:05d}'.format(a), 'node2_uniprot': 'P{:05d}'.format(b), 'node1_kegg': kegg(a), 'node2_kegg': kegg(b)}
+            for (a, b), score in zip(pairs, scores)]
+    logFCs = ['positive', 'negative', 'depends on peptide', 'positive !NaN in peptide(s)', ' !NaN in peptide(s)']
+
+    os.makedirs(os.path.join(root, 'Preprocessing', 'Output'))
+    os.makedirs(os.path.join(root, 'Preprocessing', 'String_man'))
+    pd.DataFrame(rows).to_csv(os.path.join(root, 'Preprocessing', 'Output', 'nodeDf.tsv'), sep='\t', index=False)
+    pd.DataFrame({'node': ['g{}'.format(n) for n in range(numNodes)], 'identifier': ['287.DR97_{}'.format(n) for n in range(numNodes)],
+                  'annotation': ['Protein {}'.format(n) if n % 3 else 'annotation not available' for n in range(numNodes)]}
+                 ).to_csv(os.path.join(root, 'Preprocessing', 'String_man', 'string_protein_annotations.tsv'), sep='\t', index=False)
+    acetylated = [n for n in range(numNodes) if n % 4]
+    pd.DataFrame({'uniprotID': ['P{:05d}'.format(n) for n in acetylated], 'keggID': [kegg(n) for n in acetylated],
+                  'keggPathways': ['pae00010:glycolysis / gluconeogenesis' for n in acetylated]}
+                 ).to_csv(os.path.join(root, 'Preprocessing', 'Output', 'pathways.tsv'), sep='\t')
+    pd.DataFrame({'uniprotID': ['P{:05d}'.format(n) for n in acetylated], 'geneName': ['gene{}'.format(n) for n in acetylated],
+                  'numAcSites': 1.0, 'peptides': 'peptide 1: _AK(ac)R_', 'detectCondition': 'all peptides: both', 'peptLogFC': 'peptide 1: 1.0',
+                  'protLogFC': [logFCs[n % len(logFCs)] for n in acetylated], 'keggID': [kegg(n) for n in acetylated],
+                  'keggPathways': 'pae00010:glycolysis / gluconeogenesis'}
+                 ).to_csv(os.path.join(root, 'Preprocessing', 'Output', 'ackegg.tsv'), sep='\t', index=False)
+
+
+@pytest.fixture(scope='module')
+def main(tmp_path_factory):
+    pytest.importorskip('dash')
+    pytest.importorskip('dash_cytoscape')
+    root = str(tmp_path_factory.mktemp('network'))
+    writeNetwork(root)
+    cwd, argv = os.getcwd(), sys.argv
+    os.chdir(root)
+    sys.argv = ['main.py']
+    sys.path.insert(0, VISUALISATION)
+    try:
+        sys.modules.pop('main', None)
+        yield importlib.import_module('main')
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+        sys.path.remove(VISUALISATION)
+        sys.modules.pop('main', None)
@@ -0,0 +1,69 @@
+"""
+Regression test of Scripts/acetyl.py: acetylation.tsv has to be byte-identical to the output of the original per-protein loop
+(tests/data/acetyl_loop.py, the acetyl.py of the first version of the pipeline), on generated filtered data.
+Both scripts are run as scripts (as pipeline.py does), in a temporary copy of the folder layout (Scripts, Output).
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, '..', 'Scripts', 'acetyl.py')
+LOOP_SCRIPT = os.path.join(HERE, 'data', 'acetyl_loop.py')
+
+
+# Returns filtered data (as made by filter.py) with numRows peptides of numProteins proteins, in a random order, with:
+# peptides detected in one or both conditions, NaN and zero log fold changes, and proteins without a gene name in their description
+def makeFilteredData(numProteins, numRows, seed=0):
+    random = np.random.RandomState(seed)
+    proteins = np.concatenate([np.arange(numProteins), random.randint(0, numProteins, numRows - numProteins)])
+    random.shuffle(proteins)
+    # the first protein always has a gene name (the original loop fails on a first protein without one)
+    first = proteins[0]
+    light = random.choice([0, 1.5e6, 2e7], numRows)
+    heavy = np.where(light == 0, random.choice([1e6, 3e7], numRows), random.choice([0, 0, 4e6, 1e7], numRows))
+    ratio = random.choice([0.25, 0.8, 1.0, 1.7, 3.0, np.nan], numRows)
+    descriptions = ['Protein {0} OS=Pseudomonas aeruginosa OX=208964 GN=gene{0} PE=1 SV=1'.format(p) if p % 7 or p == first
+                    else 'Uncharacterized protein {} OS=Pseudomonas aeruginosa OX=208964 PE=4 SV=1'.format(p) for p in proteins]
+    return pd.DataFrame({'Protein': ['P{:05d}'.format(p) for p in proteins],
+                         'Protein.Descriptions': descriptions,
+                         'Modified.Sequence': ['_AAK(ac){}R_'.format(i) for i in range(numRows)],
+                         'Intensity.L.': light,
+                         'Intensity.H.': heavy,
+                         'Ratio.H.L.Normalized': ratio})
+
+
+# Runs a version of acetyl.py (script) in the folder layout at root
+def runScript(script, root, *options):
+    result = subprocess.run([sys.executable, script] + list(options), cwd=os.path.join(root, 'Scripts'),
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert result.returncode == 0, result.stdout
+
+
+def writeFilteredData(root, data):
+    os.makedirs(os.path.join(root, 'Scripts'), exist_ok=True)
+    os.makedirs(os.path.join(root, 'Output'), exist_ok=True)
+    data.to_csv(os.path.join(root, 'Output', 'filteredData.tsv'), sep='\t', index=False)
+
+
+def test_acetylation_is_identical_to_the_per_protein_loop(tmp_path):
+    root = str(tmp_path)
+    writeFilteredData(root, makeFilteredData(150, 600))
+    output = os.path.join(root, 'Output', 'acetylation.tsv')
+
+    runScript(LOOP_SCRIPT, root)
+    with open(output, 'rb') as f:
+        expected = f.read()
+    os.remove(output)
+    runScript(SCRIPT, root)
+    with open(output, 'rb') as f:
+        assert f.read() == expected
+
+    # the fixture covers all cases of the protein level columns
+    acetylation = pd.read_csv(output, sep='\t')
+    assert set(acetylation['protLogFC']) >= {'positive', 'negative', 'depends on peptide', 'positive !NaN in peptide(s)', 'depends on peptide !NaN in peptide(s)'}
+    assert acetylation['detectCondition'].str.startswith('all peptides: ').any() and acetylation['detectCondition'].str.startswith('peptide 1: ').any()
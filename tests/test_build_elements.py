@@ -0,0 +1,94 @@
+"""
+Test of build_elements in Visualisation/main.py: its elements have to be the same as the ones of the original iterrows loop
+(the loop that made the elements at startup, with the annotated filter of only_show_annotated_cytoscape), on a fixture network.
+main.py is imported in a temporary folder with the fixture network (see the main fixture in conftest.py).
+"""
+
+import ast
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+AGGREGATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scripts', 'aggregate.py')
+
+
+# logFC string of the original loop
+def get_logFC_as_string(logfc_anno):
+    logfc = str(logfc_anno)
+    if 'positive' in logfc:
+        return 'positive'
+    if 'negative' in logfc:
+        return 'negative'
+    else:
+        return 'similar'
+
+
+# Elements of the original iterrows loop, with the interactions with combined_score >= cutoff
+# annotated_only: only the proteins in unique_keys, and the interactions between them (as in only_show_annotated_cytoscape)
+# NaN values are None, as in build_elements (the elements are sent as JSON, which has no NaN)
+def loop_elements(main, df, annotated_only, cutoff):
+    nodes = set()
+    cy_edges = []
+    cy_nodes = []
+    clean = lambda data: {key: None if isinstance(value, float) and math.isnan(value) else value for key, value in data.items()}
+    for index, row in df[df.combined_score >= cutoff].iterrows():
+        source = row['node1']
+        source_logFC = get_logFC_as_string(main.logfc_anno.get(row['node1_uniprot']))
+        target = row['node2']
+        target_logFC = get_logFC_as_string(main.logfc_anno.get(row['node2_uniprot']))
+
+        cy_source = {'data': clean({'id': source, 'label': source, 'stringid': row['node1_string_id'], 'UniprotID': row['node1_uniprot'], 'KEGG_ID': row['node1_kegg'], 'logFC': source_logFC})}
+        cy_target = {'data': clean({'id': target, 'label': target, 'stringid': row['node2_string_id'], 'UniprotID': row['node2_uniprot'], 'KEGG_ID': row['node2_kegg'], 'logFC': target_logFC})}
+        cy_edge = {'data': {'id': source+target, 'source': source, 'target': target, 'score': row['combined_score'], 'interaction': row['interaction'], 'source_logFC': source_logFC, 'target_logFC': target_logFC}}
+
+        if source not in nodes and (not annotated_only or source in main.unique_keys):
+            nodes.add(source)
+            cy_nodes.append(cy_source)
+        if target not in nodes and (not annotated_only or target in main.unique_keys):
+            nodes.add(target)
+            cy_nodes.append(cy_target)
+        if not annotated_only or (source in main.unique_keys and target in main.unique_keys):
+            cy_edges.append(cy_edge)
+    return cy_edges + cy_nodes
+
+
+@pytest.mark.parametrize('annotated_only', [False, True])
+@pytest.mark.parametrize('cutoff', [0.4, 0.69, 0.7, 0.71, 1.0])
+def test_build_elements_matches_the_iterrows_loop(main, annotated_only, cutoff):
+    assert main.build_elements(main.nodeDf, annotated_only, cutoff) == loop_elements(main, main.nodeDf, annotated_only, cutoff)
+
+
+def test_cutoff_boundary_is_inclusive(main):
+    scores = lambda cutoff: set(element['data']['score'] for element in main.build_elements(main.nodeDf, False, cutoff) if 'source' in element['data'])
+    assert 0.7 in scores(0.7) and 0.69 not in scores(0.7)
+    assert 0.7 not in scores(0.71) and 0.71 in scores(0.71)
+    assert main.build_elements(main.nodeDf, False, 1.0) == []
+
+
+def test_annotated_only_keeps_annotated_proteins(main):
+    elements = main.build_elements(main.nodeDf, True, 0.4)
+    nodes = set(element['data']['id'] for element in elements if 'source' not in element['data'])
+    assert nodes and nodes <= main.unique_keys
+    assert all(element['data']['source'] in nodes and element['data']['target'] in nodes for element in elements if 'source' in element['data'])
+    assert len(elements) < len(main.build_elements(main.nodeDf, False, 0.4))
+
+
+# logFCString of Scripts/aggregate.py (which makes elements.json), taken from the script without running it (it reads the data when it starts)
+def aggregate_logFCString():
+    with open(AGGREGATE) as f:
+        tree = ast.parse(f.read())
+    function, = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == 'logFCString']
+    namespace = {'np': np}
+    exec(compile(ast.Module(body=[function], type_ignores=[]), AGGREGATE, 'exec'), namespace)
+    return namespace['logFCString']
+
+
+def test_aggregate_logFC_strings_are_the_same(main):
+    uniprot = pd.concat([main.nodeDf['node1_uniprot'], main.nodeDf['node2_uniprot'], pd.Series(['P99999', None])], ignore_index=True)
+    logFC = main.get_logFC_as_strings(uniprot)
+    assert set(logFC) == {'positive', 'negative', 'similar'}
+    assert list(logFC) == list(aggregate_logFCString()(uniprot, main.logfc_anno))
+    assert list(logFC) == [get_logFC_as_string(main.logfc_anno.get(protein)) for protein in uniprot]
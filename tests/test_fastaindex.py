@@ -0,0 +1,32 @@
+"""
+Tests of the .fai index of a multifasta file (Scripts/fastaindex.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Scripts'))
+from fastaindex import buildIndex, getSequence, missingProteins
+
+
+def writeFasta(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_sequences_are_read_with_the_index(tmp_path):
+    path = writeFasta(tmp_path / 'seq.fasta', '>sp|P00001|A\nMKTAY\nIAKQR\nQI\n>sp|P00002|B\nMSTNP\nKPQRK\n>sp|P00003|C\nMA\n')
+    index = buildIndex(path)
+    assert index['P00001'] == (12, len('>sp|P00001|A\n'), 5, 6)
+    assert [getSequence(path, x) for x in ['P00001', 'P00002', 'P00003']] == ['MKTAYIAKQRQI', 'MSTNPKPQRK', 'MA']
+    assert missingProteins(path, ['P00002', 'P00004']) == {'P00004'}
+
+
+@pytest.mark.parametrize('record', ['MKTAY\nIAK\nQRQI\n', 'MKTAY\nIAKQR\nQIQIQI\n', 'MKTAY\nIAKQRQ\n'])
+def test_lines_of_other_lengths_are_rejected(tmp_path, record):
+    path = writeFasta(tmp_path / 'seq.fasta', '>sp|P00001|A\n' + record + '>sp|P00002|B\nMSTNP\n')
+    with pytest.raises(ValueError):
+        buildIndex(path)
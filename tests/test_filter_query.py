@@ -0,0 +1,120 @@
+"""
+Tests of the filter queries of the DataTables (Visualisation/filter_query.py): parse, and the rows of QueryCache.filter_rows,
+which reuses the rows of an earlier query that the new query only adds a clause to, or of a shorter 'contains' value.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Visualisation'))
+import filter_query
+from filter_query import QueryCache, parse
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'node1': ['acsA1', 'acsB', 'lasR', 'rhlR', 'acsA2', None],
+                         'keggPathways': ['biofilm formation', 'quorum sensing', 'Biofilm', 'biofilm // quorum sensing', None, 'glycolysis'],
+                         'combined_score': [0.9, 0.75, 0.7, 0.95, 0.4, 0.8]},
+                        index=[10, 11, 12, 13, 14, 15])
+
+
+# Counts the rows that every clause is checked for, while filter_rows runs
+@pytest.fixture
+def checked(monkeypatch):
+    checked = []
+    plan_mask = filter_query.plan_mask
+
+    def counting_plan_mask(df, plan, rows, text_indexes):
+        checked.append((plan, len(rows)))
+        return plan_mask(df, plan, rows, text_indexes)
+
+    monkeypatch.setattr(filter_query, 'plan_mask', counting_plan_mask)
+    return checked
+
+
+def test_parse_clauses_of_the_filter_boxes():
+    assert parse('') == ('and',)
+    assert parse('{node1} contains acs') == ('compare', 'node1', 'contains', 'acs', False)
+    assert parse('{combined_score} >= 0.9') == ('compare', 'combined_score', 'ge', 0.9, False)
+    assert parse('{combined_score} eq 1') == ('compare', 'combined_score', 'eq', 1.0, False)
+    assert parse('{keggPathways} is blank') == ('is', 'keggPathways', 'blank')
+    assert parse('{node1} contains acs && {combined_score} > 0.7 && {keggPathways} contains quorum sensing') == (
+        'and', ('compare', 'node1', 'contains', 'acs', False), ('compare', 'combined_score', 'gt', 0.7, False),
+        ('compare', 'keggPathways', 'contains', 'quorum sensing', False))
+
+
+def test_parse_values():
+    # quoted values, and numbers as they were typed for the text operators
+    assert parse('{node1} = "acs A1"') == ('compare', 'node1', 'eq', 'acs A1', False)
+    assert parse('{combined_score} contains 3') == ('compare', 'combined_score', 'contains', '3', False)
+    assert parse('{combined_score} datestartswith 0.90') == ('compare', 'combined_score', 'datestartswith', '0.90', False)
+
+
+@pytest.mark.parametrize('query', ['{node1} likes acs', '{node1} contains', '{node1} is odd', 'acs', '{node1} contains acs &&'])
+def test_parse_errors(query):
+    with pytest.raises(ValueError):
+        parse(query)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', [10, 11, 12, 13, 14, 15]),
+    ('{node1} contains acs', [10, 11, 14]),
+    ('{keggPathways} contains biofilm', [10, 13]),
+    ('{keggPathways} contains biofilm && {combined_score} > 0.9', [13]),
+    ('{combined_score} <= 0.75', [11, 12, 14]),
+    ('{keggPathways} is blank', [14]),
+    ('{node1} = rhlR', [13]),
+])
+def test_filter_rows(df, query, expected):
+    rows = QueryCache(8).filter_rows(df, query, 'data')
+    assert df.index[rows].tolist() == expected
+
+
+def test_unknown_column(df):
+    with pytest.raises(ValueError):
+        QueryCache(8).filter_rows(df, '{node3} contains acs', 'data')
+
+
+def test_and_prefix_is_reused(df, checked):
+    cache = QueryCache(8)
+    first = cache.filter_rows(df, '{keggPathways} contains biofilm', 'data')
+    checked.clear()
+
+    # only the new clause is checked, for the rows of the earlier query
+    rows = cache.filter_rows(df, '{keggPathways} contains biofilm && {combined_score} > 0.9', 'data')
+    assert checked == [(('compare', 'combined_score', 'gt', 0.9, False), len(first))]
+    assert df.index[rows].tolist() == [13]
+
+    # the same query again, or its first clause, is not checked at all
+    checked.clear()
+    assert cache.filter_rows(df, '{keggPathways} contains biofilm && {combined_score} > 0.9', 'data').tolist() == rows.tolist()
+    assert cache.filter_rows(df, '{keggPathways} contains biofilm', 'data').tolist() == first.tolist()
+    assert checked == []
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # the rows of other data are not reused
+    cache.filter_rows(df.iloc[::-1], '{keggPathways} contains biofilm && {combined_score} > 0.9', 'other data')
+    assert [count for _, count in checked] == [len(df), len(first)]
+
+
+def test_shorter_contains_value_is_reused(df, checked):
+    cache = QueryCache(8)
+    shorter = cache.filter_rows(df, '{node1} contains acs', 'data')
+    checked.clear()
+
+    # typing more characters of the value: only the rows that contain the shorter value are checked
+    rows = cache.filter_rows(df, '{node1} contains acsA', 'data')
+    assert checked == [(('compare', 'node1', 'contains', 'acsA', False), len(shorter))]
+    assert df.index[rows].tolist() == [10, 14]
+
+    # also after an earlier clause, and the longest shorter value that was filtered is used
+    cache.filter_rows(df, '{combined_score} > 0.5 && {node1} contains a', 'data')
+    cache.filter_rows(df, '{combined_score} > 0.5 && {node1} contains acs', 'data')
+    checked.clear()
+    rows = cache.filter_rows(df, '{combined_score} > 0.5 && {node1} contains acsA', 'data')
+    assert checked == [(('compare', 'node1', 'contains', 'acsA', False), 2)]
+    assert df.index[rows].tolist() == [10]
@@ -0,0 +1,88 @@
+"""
+Test of the update_graph_elements callback of Visualisation/main.py, called through the test client of the Flask server of the app,
+as the browser calls it, and of the /cache-info page of the server (see the main fixture in conftest.py for the fixture network).
+"""
+
+import pytest
+
+GRAPH_OUTPUTS = ['graph_update.data', 'graph_view.data', 'unique_button.children']
+INTERACTION_FILTER = '{interaction} contains binding'
+
+
+@pytest.fixture(scope='module')
+def client(main):
+    app = main.create_app()
+    client = app.server.test_client()
+    client.get('/')
+    return client
+
+
+# Calls a callback with outputs (list of 'id.property'), inputs and state (lists of ('id.property', value)) and the inputs that changed,
+# returns the values of the outputs, or None when the callback does not update them (PreventUpdate)
+def call(client, outputs, inputs, state, changed):
+    ids = [dict(zip(['id', 'property'], name.split('.'))) for name in outputs]
+    values = lambda pairs: [dict(zip(['id', 'property'], name.split('.')), value=value) for name, value in pairs]
+    response = client.post('/_dash-update-component', json={'output': '..' + '...'.join(outputs) + '..', 'outputs': ids,
+                                                             'inputs': values(inputs), 'state': values(state), 'changedPropIds': changed})
+    if response.status_code == 204:
+        return None
+    assert response.status_code == 200, response.data
+    result = response.get_json()['response']
+    return [result[output['id']][output['property']] for output in ids]
+
+
+# Calls update_graph_elements for the graph with all proteins, at the default cut-off
+def update_graph(client, main, changed, pathname='/cytoscape', view=None, filter_state=None, graph_mode='all'):
+    inputs = [('unique_button.n_clicks', 0), ('cutoff_slider.value', main.NODE_CUTOFF_SCORE), ('graph_mode.value', graph_mode),
+              ('tapped_node.data', None), ('search_result.data', None), ('expand_focus.n_clicks', 0), ('graph_layout.data', None),
+              ('url.pathname', pathname)]
+    state = [('selectedNode-id.children', None), ('graph_view.data', view), ('filter_state.data', filter_state)]
+    return call(client, GRAPH_OUTPUTS, inputs, state, [changed])
+
+
+def filtered_state(main):
+    return dict(main.no_filters, interaction={'filter': INTERACTION_FILTER, 'sort_by': []})
+
+
+def edges(update):
+    return [element['data'] for element in update['elements'] if 'source' in element['data']]
+
+
+def test_graph_is_made_again_for_changed_filters(main, client):
+    update, view, _ = update_graph(client, main, 'cutoff_slider.value')
+    assert view == {'mode': 'all', 'filters': ['', '']}
+    assert any('binding' not in edge['interaction'] for edge in edges(update))
+
+    # a filter of the interaction table was changed, and the cytoscape page is opened again
+    update, view, _ = update_graph(client, main, 'url.pathname', view=view, filter_state=filtered_state(main))
+    assert view == {'mode': 'all', 'filters': [INTERACTION_FILTER, '']}
+    assert edges(update) and all('binding' in edge['interaction'] for edge in edges(update))
+    expected = main.get_session_nodeDf(filtered_state(main))
+    expected = expected[expected.combined_score >= main.NODE_CUTOFF_SCORE]
+    assert sorted(edge['id'] for edge in edges(update)) == sorted(expected['node1'] + expected['node2'])
+
+
+def test_graph_is_kept_when_filters_did_not_change(main, client):
+    view = {'mode': 'all', 'filters': [INTERACTION_FILTER, '']}
+    assert update_graph(client, main, 'url.pathname', view=view, filter_state=filtered_state(main)) is None
+    assert update_graph(client, main, 'url.pathname', pathname='/interaction_table', view={'mode': 'all', 'filters': ['', '']},
+                        filter_state=filtered_state(main)) is None
+
+
+def test_focus_is_kept_for_changed_filters(main, client):
+    df = main.nodeDf
+    center = df[df['interaction'].str.contains('binding') & (df.combined_score >= main.NODE_CUTOFF_SCORE)]['node1'].iloc[0]
+    view = {'mode': 'focus', 'centers': [center], 'hops': 1, 'filters': ['', '']}
+    update, view, _ = update_graph(client, main, 'url.pathname', view=view, filter_state=filtered_state(main), graph_mode='focus')
+    assert view == {'mode': 'focus', 'centers': [center], 'hops': 1, 'filters': [INTERACTION_FILTER, '']}
+    assert edges(update) and all('binding' in edge['interaction'] for edge in edges(update))
+    assert center in [element['data']['id'] for element in update['elements']]
+
+
+def test_cache_info_page(main, client):
+    update_graph(client, main, 'cutoff_slider.value')
+    response = client.get('/cache-info')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [line.split(':')[0] for line in lines] == ['element cache', 'score index cache', 'overview cache', 'layout cache', 'rows cache', 'query cache']
+    assert lines == main.cache_info().splitlines()
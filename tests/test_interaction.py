@@ -0,0 +1,138 @@
+"""
+Tests of the UniProt fetcher of Scripts/interaction.py, run against a local stub of the UniProt REST API.
+interaction.py is run as a script (as pipeline.py does), in a temporary copy of the folder layout (Scripts, Output, Cache).
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Scripts'))
+import seqcache
+from fastaindex import readIndex
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'Scripts', 'interaction.py')
+
+
+def record(accession):
+    return '>sp|{0}|PROT_{0} Protein {0}\nMKT{0}\n'.format(accession.replace('-', ''))
+
+
+class StubUniProt(BaseHTTPRequestHandler):
+    # records of the stub: accession --> record, secondary accession --> primary accession
+    entries = {x: record(x) for x in ['P00001', 'P00002', 'P00003', 'P00004', 'P00005', 'P00006', 'P00001-2']}
+    secondary = {'Q99999': 'P00005'}
+
+    def log_message(self, *args):
+        pass
+
+    def answer(self, status, text=''):
+        body = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/stream':
+            ids = [x.split(':', 1)[1] for x in params['query'][0].split(' OR ')]
+            isoforms = params.get('includeIsoform') == ['true']
+            with server.lock:
+                server.requests.append((tuple(ids), isoforms))
+                key = tuple(ids)
+                if any(x in server.alwaysFail for x in ids) or server.failures.get(key, 0) > 0:
+                    server.failures[key] = server.failures.get(key, 0) - 1
+                    return self.answer(503)
+            if any(x.startswith('BAD') for x in ids):
+                return self.answer(400, 'invalid accession')
+            found = []
+            for x in ids:
+                primary = self.secondary.get(x, x)
+                if primary in self.entries and ('-' not in primary or isoforms):
+                    found.append(self.entries[primary])
+            # the stream does not keep the order of the query
+            return self.answer(200, ''.join(reversed(found)))
+        x = url.path.rsplit('/', 1)[-1][:-len('.fasta')]
+        with server.lock:
+            server.requests.append(((x,), 'entry'))
+        primary = self.secondary.get(x, x)
+        if primary in self.entries:
+            return self.answer(200, self.entries[primary])
+        return self.answer(404)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubUniProt)
+    server.lock = threading.Lock()
+    server.requests, server.failures, server.alwaysFail = [], {}, set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run(tmp_path, server, ids, *options):
+    os.makedirs(tmp_path / 'Scripts', exist_ok=True)
+    os.makedirs(tmp_path / 'Output', exist_ok=True)
+    with open(tmp_path / 'Output' / 'filteredData.tsv', 'w') as f:
+        f.write('Protein\n' + '\n'.join(ids) + '\n')
+    url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    result = subprocess.run([sys.executable, os.path.abspath(SCRIPT), '--uniprot-url', url + '/stream', '--uniprot-entry-url', url,
+                             '--cache-dir', str(tmp_path / 'Cache'), '--retries', '1'] + list(options),
+                            cwd=str(tmp_path / 'Scripts'), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert result.returncode == 0, result.stdout
+    with open(tmp_path / 'Output' / 'filteredDataSeq.fasta') as f:
+        return f.read(), result.stdout
+
+
+def test_records_are_written_in_input_order(tmp_path, stub):
+    ids = ['P00004', 'P00002', 'P00006', 'P00001', 'P00005', 'P00003']
+    fasta, output = run(tmp_path, stub, ids, '--batch-size', '2', '--workers', '3')
+    assert fasta == ''.join(record(x) for x in ids)
+    assert list(readIndex(str(tmp_path / 'Output' / 'filteredDataSeq.fasta'))) == ids
+    assert sorted(ids for ids, kind in stub.requests) == [('P00004', 'P00002'), ('P00005', 'P00003'), ('P00006', 'P00001')]
+
+
+def test_invalid_accession_is_bisected_out(tmp_path, stub):
+    ids = ['P00001', 'P00002', 'BAD01', 'P00003']
+    fasta, output = run(tmp_path, stub, ids, '--batch-size', '4')
+    assert fasta == ''.join(record(x) for x in ['P00001', 'P00002', 'P00003'])
+    streamed = [ids for ids, kind in stub.requests if kind != 'entry']
+    assert streamed == [('P00001', 'P00002', 'BAD01', 'P00003'), ('P00001', 'P00002'), ('BAD01', 'P00003'), ('BAD01',), ('P00003',)]
+    assert 'UniProt IDs without a record (1): BAD01' in output
+
+
+def test_transient_failure_is_retried(tmp_path, stub):
+    stub.failures[('P00001', 'P00002')] = 1
+    fasta, output = run(tmp_path, stub, ['P00001', 'P00002'])
+    assert fasta == record('P00001') + record('P00002')
+    assert [ids for ids, kind in stub.requests] == [('P00001', 'P00002'), ('P00001', 'P00002')]
+
+
+def test_failed_batch_does_not_stop_the_other_batches(tmp_path, stub):
+    stub.alwaysFail.add('P00005')
+    fasta, output = run(tmp_path, stub, ['P00001', 'P00002', 'P00005', 'P00006'], '--batch-size', '2')
+    assert fasta == record('P00001') + record('P00002')
+    assert 'Fetching 2 UniProt IDs failed' in output and 'P00005 P00006' in output
+    records, misses = seqcache.lookup(str(tmp_path / 'Cache'), ['P00001', 'P00002', 'P00005', 'P00006'])
+    assert sorted(records) == ['P00001', 'P00002'] and misses == ['P00005', 'P00006']
+
+
+def test_secondary_accessions_and_isoforms_are_mapped_to_the_requested_id(tmp_path, stub):
+    ids = ['Q99999', 'P00001-2', 'P00001']
+    fasta, output = run(tmp_path, stub, ids)
+    assert fasta == record('P00005') + record('P00001-2') + record('P00001')
+    assert (('P00001-2',), True) in stub.requests and (('Q99999',), 'entry') in stub.requests
+    assert 'Q99999 (P00005)' in output
+    records, misses = seqcache.lookup(str(tmp_path / 'Cache'), ids)
+    assert records == {'Q99999': record('P00005'), 'P00001-2': record('P00001-2'), 'P00001': record('P00001')} and misses == []
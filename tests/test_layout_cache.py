@@ -0,0 +1,71 @@
+"""
+Test of the 'precomputed' layout of Visualisation/main.py (get_layout, get_positions and prune_layout_files):
+the layout of the whole graph is computed once and sliced for every cut-off, and its files are kept per dataset, with a size limit.
+"""
+
+import os
+
+import numpy as np
+
+
+def layout_files(main):
+    return sorted(os.path.join(folder, name) for folder, _, names in os.walk(main.LAYOUT_CACHE_FOLDER) for name in names)
+
+
+def test_positions_are_a_slice_of_one_layout(main):
+    layout = main.get_layout(main.nodeDf)
+    for annotated_only in (False, True):
+        for cutoff in (0.4, 0.7, 0.71, 0.85):
+            elements = main.get_elements(main.nodeDf, annotated_only, cutoff)
+            nodes = [element['data']['id'] for element in elements if 'source' not in element['data']]
+            assert main.get_positions(main.nodeDf, elements) == {node: layout[node] for node in nodes}
+    focus = main.get_score_index(main.nodeDf).focus_elements(False, 0.7, ['g1'], 1)
+    assert main.get_positions(main.nodeDf, focus) == {element['data']['id']: layout[element['data']['id']] for element in focus if 'source' not in element['data']}
+    # one file, in the folder of the dataset
+    assert len(layout_files(main)) == 1 and os.path.dirname(layout_files(main)[0]) == os.path.dirname(main.layout_file('key'))
+
+
+def test_layout_does_not_depend_on_the_sorting_of_the_rows(main):
+    layout = main.get_layout(main.nodeDf)
+    main.layout_cache.entries.clear()
+    file, = layout_files(main)
+    os.remove(file)
+    assert main.get_layout(main.nodeDf.sort_values('node2')) == layout
+    assert layout_files(main) == [file]
+
+
+def test_layout_is_read_from_its_file(main):
+    main.layout_cache.entries.clear()
+    file = layout_files(main)[0]
+    os.utime(file, (0, 0))
+    assert main.get_layout(main.nodeDf) == main.get_layout(main.nodeDf.iloc[::-1])
+    assert layout_files(main) == [file] and os.path.getmtime(file) > 0
+
+
+def test_overview_is_laid_out_by_itself(main):
+    elements = main.get_overview(main.nodeDf, False, 0.7, 'community').elements([])
+    positions = main.get_positions(main.nodeDf, elements)
+    assert sorted(positions) == sorted(element['data']['id'] for element in elements if 'source' not in element['data'])
+    assert all(node.startswith('group:') for node in positions)
+
+
+def test_least_recently_used_layouts_are_removed(main, monkeypatch):
+    folder = main.LAYOUT_CACHE_FOLDER
+    old = os.path.join(folder, 'old-dataset', 'force-old.json')
+    os.makedirs(os.path.dirname(old))
+    with open(old, 'w') as f:
+        f.write('{}' * 100000)
+    os.utime(old, (0, 0))
+    writing = os.path.join(folder, 'old-dataset', 'force-new.json.123')
+    open(writing, 'w').close()
+    monkeypatch.setattr(main, 'LAYOUT_CACHE_SIZE', 1e-6 * sum(os.path.getsize(file) for file in layout_files(main) if file.endswith('.json')) - 1e-3)
+
+    # a new layout (other filters of the tables) is written, the oldest file is removed, but not the file that is being written
+    main.get_layout(main.nodeDf.iloc[np.flatnonzero(main.nodeDf['interaction'] == 'binding')])
+    assert not os.path.exists(old) and os.path.exists(writing)
+
+    # with a smaller limit only the newest layouts are kept, and the folders without layouts are removed
+    os.remove(writing)
+    monkeypatch.setattr(main, 'LAYOUT_CACHE_SIZE', 1e-6)
+    main.prune_layout_files()
+    assert layout_files(main) == [] and os.listdir(folder) == []
@@ -0,0 +1,37 @@
+"""
+Test of the rows of the tables of Visualisation/main.py (get_filtered_rows): the tables show the interactions with a score
+of at least the cut-off of the slider, the graph gets all loaded interactions (see the main fixture in conftest.py for the fixture network).
+"""
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('cutoff', [0.4, 0.7, 0.71, 0.85])
+def test_interaction_table_follows_the_cutoff(main, cutoff):
+    rows = main.get_filtered_rows(main.no_filters, cutoff)[0]
+    assert sorted(main.nodeDf.index[rows]) == sorted(main.nodeDf.index[main.nodeDf.combined_score >= cutoff])
+
+
+def test_filters_and_cutoff(main):
+    filter_state = dict(main.no_filters, interaction={'filter': '{interaction} contains binding', 'sort_by': [{'column_id': 'combined_score', 'direction': 'asc'}]})
+    rows = main.get_filtered_rows(filter_state, 0.7)[0]
+    df = main.nodeDf.iloc[rows]
+    expected = main.nodeDf[main.nodeDf['interaction'].str.contains('binding') & (main.nodeDf.combined_score >= 0.7)]
+    assert sorted(df.index) == sorted(expected.index)
+    assert np.all(np.diff(df['combined_score'].to_numpy()) >= 0)
+
+    # the linked acetylation table only keeps the proteins of the interactions of the cut-off
+    proteins = set(df['node1_uniprot']) | set(df['node2_uniprot'])
+    assert set(main.acetylation['uniprotID'].iloc[main.get_filtered_rows(filter_state, 0.7)[1]]) == proteins & set(main.acetylation['uniprotID'])
+
+
+def test_graph_gets_all_loaded_interactions(main):
+    filter_state = dict(main.no_filters, interaction={'filter': '{interaction} contains binding', 'sort_by': []})
+    assert main.get_session_nodeDf(filter_state)['combined_score'].min() == main.MIN_CUTOFF_SCORE
+    assert main.get_session_nodeDf(main.no_filters) is main.nodeDf
+
+
+def test_interaction_table_count(main):
+    table = main.make_interaction_table(main.no_filters, 0.85)
+    assert table.children[-1].children == '{} interactions with a score of at least 0.85'.format((main.nodeDf.combined_score >= 0.85).sum())
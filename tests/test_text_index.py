@@ -0,0 +1,90 @@
+"""
+Tests of the index of the text columns (Visualisation/text_index.py): TextIndex.contains and TextIndex.mask
+have to find the same rows as pandas str.contains (regex=False), also for the values that the index can not be used for.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Visualisation'))
+from text_index import TextIndex
+
+PATHWAYS = ['pae00010:Glycolysis / Gluconeogenesis', 'pae00020:Citrate cycle (TCA cycle)', 'pae02024:Quorum sensing',
+            'pae02025:Biofilm formation - Pseudomonas aeruginosa', 'pae00630:Glyoxylate and dicarboxylate metabolism', 'No pathways',
+            'pae01100:Metabolic pathways', 'pae03070:Bacterial secretion system']
+
+VALUES = ['Glycolysis', 'glycolysis', 'GLYCO', 'Gluconeogenesis', 'pathways', 'Quorum sensing', 'quorum', 'cycle (TCA', 'pae0',
+          'not a pathway', 'é', '',
+          # values that cross the separator ' // ', or are part of it, and the ' / ' inside a pathway
+          'Gluconeogenesis // pae00020', ' // Q', ' // ', '// p', 's //', '/', '//', ' /', '/ ', 'Glycolysis / Glu', 'is / G',
+          # values of 1 or 2 characters (all tokens or the text of the rows are checked)
+          'a', 'A', 'Gl', 'gl', 'e:', ':', '0']
+
+
+# Keeps the pathways of every row, with ' // ' between them, and some empty (NaN) rows; the index labels are not in order, as in a filtered table
+@pytest.fixture(scope='module')
+def series():
+    random = np.random.RandomState(0)
+    rows = [' // '.join(random.choice(PATHWAYS, random.randint(1, 4), replace=False)) for _ in range(200)]
+    rows = [np.nan if i % 17 == 0 else row for i, row in enumerate(rows)]
+    return pd.Series(rows, index=random.permutation(len(rows)), dtype=object)
+
+
+def expected(series, value, case_insensitive):
+    if case_insensitive:
+        return series.str.lower().str.contains(value.lower(), regex=False, na=False)
+    return series.str.contains(value, regex=False, na=False)
+
+
+@pytest.mark.parametrize('separator', [' // ', None])
+@pytest.mark.parametrize('case_insensitive', [False, True])
+@pytest.mark.parametrize('value', VALUES)
+def test_contains_is_str_contains(series, separator, case_insensitive, value):
+    index = TextIndex(series, separator)
+    match = expected(series, value, case_insensitive)
+    assert index.contains(value, case_insensitive).tolist() == sorted(series.index[match.to_numpy()])
+
+
+@pytest.mark.parametrize('case_insensitive', [False, True])
+@pytest.mark.parametrize('value', VALUES)
+def test_mask_is_str_contains(series, case_insensitive, value):
+    index = TextIndex(series, ' // ')
+    labels = series.index.to_numpy()[::3]
+    mask = index.mask(value, case_insensitive, labels)
+    if mask is None:
+        # the index can not be used, the caller checks the text of the rows
+        assert index.crosses_separator(value) or len(value) < 3
+    else:
+        assert mask.tolist() == expected(series, value, case_insensitive).loc[labels].tolist()
+
+
+def test_values_crossing_the_separator_are_not_looked_up(series):
+    index = TextIndex(series, ' // ')
+    for value in ['Gluconeogenesis // pae00020', ' // Q', ' //', '/ p', 's /', '/']:
+        assert index.crosses_separator(value) and index.found(value, False) is None
+    for value in ['Glycolysis / Glu', 'is / G', 'cycle (TCA']:
+        assert not index.crosses_separator(value) and index.found(value, False) is not None
+
+
+def test_short_values_check_the_rows_when_there_are_more_tokens(series):
+    # more tokens (the words of a few rows) than rows: the text of the rows is checked
+    rows = series.dropna().iloc[:5]
+    many_tokens = TextIndex(rows, ' ')
+    assert many_tokens.found('Gl', False) is None
+    assert many_tokens.contains('Gl').tolist() == sorted(rows.index[expected(rows, 'Gl', False).to_numpy()])
+    assert many_tokens.mask('gl', True, rows.index.to_numpy()) is None
+
+    # fewer tokens (the pathways) than rows: all tokens are checked
+    pathways = TextIndex(series, ' // ')
+    assert pathways.found('Gl', False) is not None
+
+
+def test_only_nan():
+    series = pd.Series([np.nan, np.nan], dtype=object)
+    index = TextIndex(series, ' // ')
+    assert index.contains('pae').tolist() == [] and index.contains('a').tolist() == []
+    assert index.mask('pae', True, np.array([1])).tolist() == [False]